@@ -3,6 +3,14 @@
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The live dashboard stream (``/live/events/``, Server-Sent Events) is an async
+view and needs this entry point, e.g.::
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
+
+Under WSGI (``config.wsgi``, the default gunicorn setup) the stream answers
+204 and the dashboard polls ``/live/counters/`` instead.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
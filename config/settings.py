@@ -186,6 +186,12 @@
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Uploaded media is de-duplicated by content (see employees/storage.py)
+STORAGES = {
+    "default": {"BACKEND": "employees.storage.DedupFileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
 # Default URL on which Django application runs for specific environment
 BASE_URL = os.environ.get("BASE_URL", default="http://127.0.0.1:8000")
 
@@ -215,3 +221,80 @@
 # Face recognition settings
 # Default tolerance for face_recognition.compare_faces (lower is stricter)
 FACE_MATCH_TOLERANCE = float(os.environ.get("FACE_MATCH_TOLERANCE", 0.6))
+
+# Attendance settings
+# Local check-in time (HH:MM) after which a check-in is counted as late
+ATTENDANCE_LATE_AFTER = os.environ.get("ATTENDANCE_LATE_AFTER", "10:00")
+
+# Attendance log write-behind buffer (see employees/attendance_logger.py)
+# Set ATTENDANCE_LOG_SYNC=True to write every log entry immediately (tests)
+ATTENDANCE_LOG_SYNC = os.environ.get("ATTENDANCE_LOG_SYNC", "False").lower() in ("1", "true", "yes")
+ATTENDANCE_LOG_BATCH_SIZE = int(os.environ.get("ATTENDANCE_LOG_BATCH_SIZE", 50))
+ATTENDANCE_LOG_FLUSH_INTERVAL = float(os.environ.get("ATTENDANCE_LOG_FLUSH_INTERVAL", 2.0))
+ATTENDANCE_LOG_SPOOL_DIR = os.environ.get("ATTENDANCE_LOG_SPOOL_DIR", str(BASE_DIR / "var" / "attendance_log_spool"))
+ATTENDANCE_LOG_MAX_ATTEMPTS = int(os.environ.get("ATTENDANCE_LOG_MAX_ATTEMPTS", 3))
+
+# Attendance log retention (see employees/log_archive.py)
+ATTENDANCE_LOG_RETENTION_DAYS = int(os.environ.get("ATTENDANCE_LOG_RETENTION_DAYS", 180))
+ATTENDANCE_LOG_ARCHIVE_DIR = os.environ.get("ATTENDANCE_LOG_ARCHIVE_DIR", str(BASE_DIR / "var" / "attendance_log_archive"))
+
+# Live occupancy board cache lifetime in seconds (see employees/occupancy.py)
+ATTENDANCE_OCCUPANCY_TTL = int(os.environ.get("ATTENDANCE_OCCUPANCY_TTL", 300))
+
+# Domain event bus thread pool for deferred subscribers (see employees/domain_events.py)
+DOMAIN_EVENT_WORKERS = int(os.environ.get("DOMAIN_EVENT_WORKERS", 4))
+
+# Background task queue (see employees/task_queue.py, run with `manage.py run_workers`;
+# gunicorn-cfg.py starts one next to the app server unless BACKGROUND_TASKS_WORKER=external)
+# Set BACKGROUND_TASKS_EAGER=True to run tasks inline after commit instead of in a worker
+BACKGROUND_TASKS_EAGER = os.environ.get("BACKGROUND_TASKS_EAGER", "False").lower() in ("1", "true", "yes")
+BACKGROUND_TASKS_RETRY_BASE = int(os.environ.get("BACKGROUND_TASKS_RETRY_BASE", 10))
+BACKGROUND_TASKS_RETRY_CAP = int(os.environ.get("BACKGROUND_TASKS_RETRY_CAP", 3600))
+
+# Stored photo size (see employees/photo_pipeline.py)
+# Originals are recompressed to JPEG with the long side capped at ATTENDANCE_PHOTO_MAX_DIMENSION
+ATTENDANCE_PHOTO_MAX_DIMENSION = int(os.environ.get("ATTENDANCE_PHOTO_MAX_DIMENSION", 1280))
+ATTENDANCE_PHOTO_QUALITY = int(os.environ.get("ATTENDANCE_PHOTO_QUALITY", 82))
+ATTENDANCE_PHOTO_THUMBNAIL_SIZES = {"small": 96, "medium": 320}
+
+# Background check-in/check-out photo writer (see employees/photo_writer.py)
+# Set ATTENDANCE_PHOTO_SYNC=True to store photos before responding (tests)
+ATTENDANCE_PHOTO_SYNC = os.environ.get("ATTENDANCE_PHOTO_SYNC", "False").lower() in ("1", "true", "yes")
+ATTENDANCE_PHOTO_WRITERS = int(os.environ.get("ATTENDANCE_PHOTO_WRITERS", 2))
+
+# Protected media (see employees/media_access.py)
+# Internal nginx location for X-Accel-Redirect, e.g. "/protected-media/"; empty streams from Django
+MEDIA_ACCEL_REDIRECT = os.environ.get("MEDIA_ACCEL_REDIRECT", "")
+
+# On-demand resized media variants (see employees/image_resize.py)
+# MEDIA_THUMB_ACCEL_REDIRECT names the internal nginx location for the cache, e.g. "/protected-media-thumbs/"
+MEDIA_THUMB_CACHE_DIR = os.environ.get("MEDIA_THUMB_CACHE_DIR", str(BASE_DIR / "var" / "media_thumbs"))
+MEDIA_THUMB_CONCURRENCY = int(os.environ.get("MEDIA_THUMB_CONCURRENCY", 4))
+MEDIA_THUMB_WAIT = float(os.environ.get("MEDIA_THUMB_WAIT", 10))
+MEDIA_THUMB_ACCEL_REDIRECT = os.environ.get("MEDIA_THUMB_ACCEL_REDIRECT", "")
+# Variants not served for this many days are deleted by `manage.py gc_media`
+MEDIA_THUMB_MAX_AGE_DAYS = float(os.environ.get("MEDIA_THUMB_MAX_AGE_DAYS", 30))
+
+# Face capture uploads (see employees/image_decode.py)
+# Browser captures and picked photos are scaled to FACE_CAPTURE_MAX_DIMENSION and sent as raw JPEG bodies;
+# the upload limit still fits a full-size phone photo the browser cannot redraw (e.g. HEIC)
+FACE_UPLOAD_MAX_BYTES = int(os.environ.get("FACE_UPLOAD_MAX_BYTES", 15 * 1024 * 1024))
+FACE_CAPTURE_MAX_DIMENSION = int(os.environ.get("FACE_CAPTURE_MAX_DIMENSION", 960))
+FACE_CAPTURE_QUALITY = float(os.environ.get("FACE_CAPTURE_QUALITY", 0.85))
+
+# Location pre-check before photo upload (see employees/location_token.py)
+ATTENDANCE_LOCATION_TOKEN_MAX_AGE = int(os.environ.get("ATTENDANCE_LOCATION_TOKEN_MAX_AGE", 120))
+# Compatibility switch: False also accepts photo POSTs that carry raw coordinates instead of a token
+ATTENDANCE_LOCATION_TOKEN_REQUIRED = os.environ.get("ATTENDANCE_LOCATION_TOKEN_REQUIRED", "True").lower() in ("1", "true", "yes")
+
+# Office geofence index (see employees/office_index.py)
+OFFICE_INDEX_CELL_DEGREES = float(os.environ.get("OFFICE_INDEX_CELL_DEGREES", 0.01))
+OFFICE_INDEX_TTL = int(os.environ.get("OFFICE_INDEX_TTL", 300))
+# Use the built-in default office when no site is active even though OfficeLocation rows exist
+OFFICE_DEFAULT_FALLBACK = os.environ.get("OFFICE_DEFAULT_FALLBACK", "False").lower() in ("1", "true", "yes")
+
+# Location audit (see employees/location_audit.py)
+LOCATION_AUDIT_CHUNK_SIZE = int(os.environ.get("LOCATION_AUDIT_CHUNK_SIZE", 200000))
+
+# Dashboard counters polling interval when served over WSGI (no event stream)
+LIVE_COUNTERS_POLL_SECONDS = float(os.environ.get("LIVE_COUNTERS_POLL_SECONDS", 15))
@@ -18,7 +18,6 @@
 from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
-from django.conf.urls.static import static
 from django.views.generic import RedirectView
 
 urlpatterns = [
@@ -66,9 +65,14 @@
     # path("", include("apps.tables.urls")),
 ]
 
-# Serve media files during development
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+# Media is only served to its owner or a superadmin; with MEDIA_ACCEL_REDIRECT
+# set, nginx performs the transfer (see nginx/web-project-django.conf)
+from employees.views import media_thumbnail, protected_media
+
+urlpatterns += [
+    path(f"{settings.MEDIA_URL.lstrip('/')}<path:path>", protected_media, name="protected_media"),
+    path("media-thumb/<int:size>/<path:path>", media_thumbnail, name="media_thumbnail"),
+]
 
 # handler404 = SystemView.as_view(template_name="pages_misc_error.html", status=404)
 # handler400 = SystemView.as_view(template_name="pages_misc_error.html", status=400)
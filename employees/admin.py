@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import Employee, Attendance, AttendanceLog, Ticket, TicketComment
+from django.db.models import Count, Q
+
+from .models import (
+    Employee, Attendance, AttendanceLog, BackgroundTask, ClientFingerprint, OfficeLocation, Ticket, TicketComment,
+)
 
 
 @admin.register(Employee)
@@ -54,9 +58,11 @@ def get_date(self, obj):
 class AttendanceLogAdmin(admin.ModelAdmin):
     list_display = ('employee', 'action', 'success', 'timestamp', 'ip_address', 'confidence')
     list_filter = ('action', 'success', 'failure_reason', 'timestamp')
-    search_fields = ('employee__name', 'employee__email', 'ip_address', 'notes')
+    search_fields = ('employee__name', 'employee__email', 'client__ip_address', 'notes')
     ordering = ('-timestamp',)
     readonly_fields = ('timestamp',)
+    list_select_related = ('employee', 'client')
+    raw_id_fields = ('client',)
     
     fieldsets = (
         ('Log Information', {
@@ -66,12 +72,36 @@ class AttendanceLogAdmin(admin.ModelAdmin):
             'fields': ('failure_reason', 'confidence', 'attendance')
         }),
         ('Technical Information', {
-            'fields': ('ip_address', 'user_agent', 'notes'),
+            'fields': ('client', 'notes'),
             'classes': ('collapse',)
         }),
     )
 
 
+@admin.register(ClientFingerprint)
+class ClientFingerprintAdmin(admin.ModelAdmin):
+    list_display = ('browser', 'os', 'ip_address', 'first_seen', 'failed_attempts', 'total_attempts')
+    list_filter = ('browser', 'os')
+    search_fields = ('ip_address', 'user_agent')
+    readonly_fields = ('key', 'ua_hash', 'first_seen')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            total_attempts=Count('logs'),
+            failed_attempts=Count('logs', filter=Q(logs__success=False)),
+        )
+
+    def failed_attempts(self, obj):
+        return obj.failed_attempts
+    failed_attempts.short_description = 'Failed'
+    failed_attempts.admin_order_field = 'failed_attempts'
+
+    def total_attempts(self, obj):
+        return obj.total_attempts
+    total_attempts.short_description = 'Attempts'
+    total_attempts.admin_order_field = 'total_attempts'
+
+
 class TicketCommentInline(admin.TabularInline):
     model = TicketComment
     extra = 0
@@ -116,3 +146,43 @@ class TicketCommentAdmin(admin.ModelAdmin):
     def comment_preview(self, obj):
         return obj.comment[:50] + '...' if len(obj.comment) > 50 else obj.comment
     comment_preview.short_description = 'Comment'
+
+
+@admin.register(BackgroundTask)
+class BackgroundTaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'max_attempts', 'run_after', 'locked_by', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'locked_by', 'last_error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_until', 'last_error')
+    actions = ['retry_tasks']
+
+    def retry_tasks(self, request, queryset):
+        from django.utils import timezone
+        updated = queryset.exclude(status='running').update(
+            status='pending', attempts=0, run_after=timezone.now(), last_error=''
+        )
+        self.message_user(request, f'{updated} task(s) queued for retry.')
+    retry_tasks.short_description = 'Retry selected tasks'
+
+
+@admin.register(OfficeLocation)
+class OfficeLocationAdmin(admin.ModelAdmin):
+    list_display = ('name', 'shape', 'latitude', 'longitude', 'radius_meters', 'assigned_count', 'is_active')
+    list_filter = ('shape', 'is_active')
+    search_fields = ('name',)
+    filter_horizontal = ('employees',)
+    readonly_fields = ('created_at', 'updated_at')
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(assigned=Count('employees'))
+
+    def assigned_count(self, obj):
+        return obj.assigned or 'Everyone'
+    assigned_count.short_description = 'Employees'
+    assigned_count.admin_order_field = 'assigned'
+
+    def delete_queryset(self, request, queryset):
+        # Bulk deletes bypass OfficeLocation.delete(), which invalidates the index
+        from .office_index import invalidate_office_index
+        super().delete_queryset(request, queryset)
+        invalidate_office_index()
@@ -4,3 +4,7 @@
 class EmployeesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'employees'
+
+    def ready(self):
+        # Register domain event subscribers
+        from . import subscribers  # noqa: F401
@@ -0,0 +1,484 @@
+"""
+Write-behind logger for AttendanceLog entries.
+
+Check-in/check-out attempts are appended to a local spool file and buffered
+in-process, then written with a single ``bulk_create`` once the batch size or
+flush interval is reached, and again at interpreter shutdown. Spool segments
+are only deleted after their rows have been committed, so entries buffered
+by a worker that crashed are replayed by ``replay_orphaned_segments()`` (run
+on the next flush and by the ``flush_attendance_log_spool`` command).
+
+Every segment has a unique name (``attendance-logs-<pid>-<uuid>.jsonl``) and
+its writer holds an exclusive ``flock`` on it until the rows are committed,
+so a segment whose lock can be taken belongs to a dead process, whatever
+pid the current processes were given. A replaying process claims such a
+segment by renaming it to a name of its own while holding the lock; only one
+rename can succeed, so concurrent replays never write the same segment
+twice. Without ``fcntl`` (Windows) the pid in the name is checked instead.
+
+Records the database keeps refusing (``ATTENDANCE_LOG_MAX_ATTEMPTS`` failed
+flushes, or any failure during a replay) are retried one by one, and those
+that still fail are appended to ``attendance-logs-quarantine.jsonl`` in the
+spool directory instead of blocking later entries. The command's
+``--quarantine`` option writes them again.
+
+Delivery is at-least-once: a crash between the commit and the segment
+cleanup can replay a handful of entries.
+
+Set ``ATTENDANCE_LOG_SYNC = True`` to write every entry immediately, which is
+what tests should use.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to pid liveness checks
+    fcntl = None
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
+
+LOG_FIELDS = (
+    'employee_id', 'action', 'success', 'failure_reason', 'confidence',
+    'ip_address', 'user_agent', 'notes', 'attendance_id', 'timestamp',
+)
+
+SEGMENT_PATTERN = 'attendance-logs-*.jsonl'
+QUARANTINE_NAME = 'attendance-logs-quarantine.jsonl'
+
+
+def get_spool_dir():
+    """Directory holding the append-only spool segments."""
+    return str(getattr(settings, 'ATTENDANCE_LOG_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'var', 'attendance_log_spool')))
+
+
+def is_sync_mode():
+    """Whether log entries should be written synchronously (tests, debugging)."""
+    return bool(getattr(settings, 'ATTENDANCE_LOG_SYNC', False))
+
+
+def build_log_record(employee=None, attendance=None, **fields):
+    """
+    Normalise ``AttendanceLog`` keyword arguments into a JSON-serialisable record.
+
+    Accepts the same arguments as ``AttendanceLog.objects.create`` (model
+    instances for ``employee``/``attendance`` or their ``*_id`` values) and
+    stamps the entry with the current time so buffering does not shift it.
+    """
+    record = {field: None for field in LOG_FIELDS}
+    record['success'] = True
+    record.update(fields)
+    if employee is not None:
+        record['employee_id'] = employee.pk
+    if attendance is not None:
+        record['attendance_id'] = attendance.pk
+    if record['timestamp'] is None:
+        record['timestamp'] = timezone.now()
+    unknown = set(record) - set(LOG_FIELDS)
+    if unknown:
+        raise TypeError(f'Unexpected attendance log fields: {", ".join(sorted(unknown))}')
+    return record
+
+
+def _encode_record(record):
+    data = dict(record)
+    data['timestamp'] = data['timestamp'].isoformat()
+    return json.dumps(data, separators=(',', ':'))
+
+
+def _decode_record(line):
+    data = json.loads(line)
+    data['timestamp'] = parse_datetime(data['timestamp'])
+    return data
+
+
+def _model_kwargs(record):
+    """Swap the raw user agent / IP address of a record for its ClientFingerprint id."""
+    from .client_fingerprints import get_client_fingerprint_id
+
+    kwargs = dict(record)
+    kwargs['client_id'] = get_client_fingerprint_id(kwargs.pop('user_agent') or '', kwargs.pop('ip_address') or None)
+    return kwargs
+
+
+def _insert(records):
+    """
+    Insert records as AttendanceLog rows, returning them.
+
+    Fingerprint ids are cached per process, so one may name a ClientFingerprint
+    that was deleted or merged since; on an IntegrityError the cache is cleared
+    and the insert retried once.
+    """
+    from .client_fingerprints import get_client_fingerprint_id
+    from .models import AttendanceLog
+
+    try:
+        with transaction.atomic():
+            return AttendanceLog.objects.bulk_create([AttendanceLog(**_model_kwargs(record)) for record in records])
+    except IntegrityError:
+        get_client_fingerprint_id.cache_clear()
+        with transaction.atomic():
+            return AttendanceLog.objects.bulk_create([AttendanceLog(**_model_kwargs(record)) for record in records])
+
+
+def write_records(records):
+    """Insert buffered records with a single ``bulk_create``."""
+    if not records:
+        return 0
+    _insert(records)
+    return len(records)
+
+
+def _write_each(records, spool_dir):
+    """
+    Write records one by one, quarantining those the database refuses.
+
+    Returns:
+        Number of entries written
+    """
+    written = 0
+    refused = []
+    for record in records:
+        try:
+            written += write_records([record])
+        except Exception:
+            refused.append(record)
+    if refused:
+        logger.error('Quarantining %d attendance log entries that could not be written', len(refused))
+        quarantine_records(refused, spool_dir)
+    return written
+
+
+def quarantine_records(records, spool_dir=None):
+    """Append records to the quarantine file of the spool directory."""
+    spool_dir = spool_dir or get_spool_dir()
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, QUARANTINE_NAME)
+    while True:
+        handle = open(path, 'a', encoding='utf-8')
+        if fcntl is None:
+            break
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        # replay_quarantine() may have claimed the file while we waited for the lock
+        if _same_file(path, handle):
+            break
+        handle.close()
+    with handle:
+        handle.write(''.join(_encode_record(record) + '\n' for record in records))
+
+
+def _segment_name(spool_dir):
+    return os.path.join(spool_dir, f'attendance-logs-{os.getpid()}-{uuid.uuid4().hex}.jsonl')
+
+
+def _segment_owner(path):
+    """PID encoded in a segment name (``attendance-logs-<pid>-<uuid>.jsonl``)."""
+    try:
+        return int(os.path.basename(path).split('-')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _same_file(path, handle):
+    """Whether ``path`` still names the file ``handle`` has open."""
+    try:
+        return os.stat(path).st_ino == os.fstat(handle.fileno()).st_ino
+    except FileNotFoundError:
+        return False
+
+
+def _try_lock(handle):
+    """Take the segment lock without waiting; False if another open file holds it."""
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    return True
+
+
+def _claim_segment(path, spool_dir, include_live=False):
+    """
+    Take over an orphaned segment by renaming it to a fresh name of this process.
+
+    Returns:
+        (claimed path, open locked handle), or None if its writer is alive or
+        another process claimed it first
+    """
+    if fcntl is None and not include_live:
+        owner = _segment_owner(path)
+        if owner is None or _pid_alive(owner):
+            return None
+    try:
+        handle = open(path, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        return None
+    # A stopped process holds no lock, so include_live only matters without fcntl
+    if fcntl is not None and not (_try_lock(handle) and _same_file(path, handle)):
+        handle.close()
+        return None
+    claimed = _segment_name(spool_dir)
+    try:
+        os.rename(path, claimed)
+    except FileNotFoundError:
+        handle.close()
+        return None
+    return claimed, handle
+
+
+def read_segment(path):
+    """Read the records of a spool segment, skipping a torn trailing line."""
+    records = []
+    with open(path, 'r', encoding='utf-8') as handle:
+        for line in handle:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(_decode_record(line))
+            except (ValueError, TypeError, KeyError):
+                logger.warning('Skipping malformed attendance log spool line in %s', path)
+    return records
+
+
+def replay_orphaned_segments(spool_dir=None, include_live=False):
+    """
+    Write the contents of spool segments left behind by dead processes.
+
+    Args:
+        spool_dir: spool directory (defaults to ATTENDANCE_LOG_SPOOL_DIR)
+        include_live: also replay segments of running processes (only safe when they are stopped)
+
+    Returns:
+        tuple of (segments replayed, records written)
+    """
+    spool_dir = spool_dir or get_spool_dir()
+    segments = replayed = 0
+    for path in sorted(glob.glob(os.path.join(spool_dir, SEGMENT_PATTERN))):
+        if os.path.basename(path) == QUARANTINE_NAME:
+            continue
+        claim = _claim_segment(path, spool_dir, include_live)
+        if claim is None:
+            continue
+        claimed, handle = claim
+        try:
+            records = read_segment(claimed)
+            try:
+                replayed += write_records(records)
+            except Exception:
+                logger.exception('Failed to replay attendance log spool segment %s', claimed)
+                replayed += _write_each(records, spool_dir)
+            os.remove(claimed)
+        finally:
+            handle.close()
+        segments += 1
+    return segments, replayed
+
+
+def replay_quarantine(spool_dir=None):
+    """
+    Write quarantined records again; the ones still refused stay quarantined.
+
+    Returns:
+        tuple of (records written, records still quarantined)
+    """
+    spool_dir = spool_dir or get_spool_dir()
+    # Claimed like an orphan, so records quarantined meanwhile start a new file
+    # and a crash here leaves an ordinary segment for the next replay
+    claim = _claim_segment(os.path.join(spool_dir, QUARANTINE_NAME), spool_dir, include_live=True)
+    if claim is None:
+        return 0, 0
+    claimed, handle = claim
+    try:
+        records = read_segment(claimed)
+        written = _write_each(records, spool_dir)
+        os.remove(claimed)
+    finally:
+        handle.close()
+    return written, len(records) - written
+
+
+class AttendanceEventLogger:
+    """
+    In-process write-behind buffer for attendance log entries.
+
+    Args:
+        batch_size: flush as soon as this many entries are buffered
+        flush_interval: maximum number of seconds an entry stays buffered
+        spool_dir: directory for the append-only spool segments
+        max_attempts: failed flushes after which the buffered entries are
+            written one by one and the refused ones quarantined
+    """
+
+    def __init__(self, batch_size=50, flush_interval=2.0, spool_dir=None, max_attempts=3):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_dir = spool_dir or get_spool_dir()
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._pending = []
+        # (path, open handle): handles stay open, and locked, until the rows are committed
+        self._closed_segments = []
+        self._segment_path = None
+        self._segment = None
+        self._thread = None
+        self._replayed = False
+        self._failures = 0
+
+    def _ensure_process(self):
+        # A forked worker inherits the parent's buffer but not its flush thread;
+        # it drops its copies of the parent's segment handles, the parent keeps the locks
+        if self._pid != os.getpid():
+            for _path, handle in self._closed_segments + [(self._segment_path, self._segment)]:
+                if handle is not None:
+                    handle.close()
+            self._reset()
+
+    def _open_segment(self):
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._segment_path = _segment_name(self.spool_dir)
+        self._segment = open(self._segment_path, 'a', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(self._segment, fcntl.LOCK_EX)
+
+    def _close_segment(self):
+        if self._segment is not None:
+            self._segment.flush()
+            self._closed_segments.append((self._segment_path, self._segment))
+            self._segment = None
+            self._segment_path = None
+
+    def _start_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='attendance-log-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                connection.close()
+
+    def log(self, record):
+        """Spool and buffer one record built by ``build_log_record``."""
+        with self._lock:
+            self._ensure_process()
+            if self._segment is None:
+                self._open_segment()
+            self._segment.write(_encode_record(record) + '\n')
+            self._segment.flush()
+            self._pending.append(record)
+            full = len(self._pending) >= self.batch_size
+            self._start_thread()
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """
+        Write all buffered entries now.
+
+        Returns:
+            Number of entries written
+        """
+        with self._flush_lock:
+            with self._lock:
+                self._ensure_process()
+                replay = not self._replayed
+                self._replayed = True
+                records, self._pending = self._pending, []
+                self._close_segment()
+                segments, self._closed_segments = self._closed_segments, []
+
+            if replay:
+                try:
+                    replay_orphaned_segments(self.spool_dir)
+                except Exception:
+                    logger.exception('Failed to replay orphaned attendance log spool segments')
+
+            try:
+                written = write_records(records)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.max_attempts:
+                    logger.exception('Failed to flush %d attendance log entries; keeping them spooled', len(records))
+                    with self._lock:
+                        self._pending[:0] = records
+                        self._closed_segments[:0] = segments
+                    return 0
+                # Do not let entries the database keeps refusing block every later one
+                logger.exception('Failed to flush %d attendance log entries %d times; writing them one by one',
+                                 len(records), self._failures)
+                written = _write_each(records, self.spool_dir)
+            self._failures = 0
+
+            for path, handle in segments:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                handle.close()
+            return written
+
+
+_logger_instance = None
+_logger_lock = threading.Lock()
+
+
+def get_attendance_logger():
+    """Return the process-wide logger, created from settings on first use."""
+    global _logger_instance
+    if _logger_instance is None:
+        with _logger_lock:
+            if _logger_instance is None:
+                _logger_instance = AttendanceEventLogger(
+                    batch_size=getattr(settings, 'ATTENDANCE_LOG_BATCH_SIZE', 50),
+                    flush_interval=getattr(settings, 'ATTENDANCE_LOG_FLUSH_INTERVAL', 2.0),
+                    max_attempts=getattr(settings, 'ATTENDANCE_LOG_MAX_ATTEMPTS', 3),
+                )
+                atexit.register(_logger_instance.flush)
+    return _logger_instance
+
+
+def log_attendance_event(**fields):
+    """
+    Record an attendance log entry.
+
+    Takes the same keyword arguments as ``AttendanceLog.objects.create``.
+    In sync mode the row is inserted immediately and returned; otherwise it is
+    spooled and buffered for the next batch and None is returned.
+    """
+    record = build_log_record(**fields)
+    if is_sync_mode():
+        return _insert([record])[0]
+    get_attendance_logger().log(record)
+    return None
@@ -0,0 +1,172 @@
+"""
+Matrix-based attendance engine for the admin calendar.
+
+Builds an employees x days status matrix from a single ``values_list`` query so
+day totals and per-employee totals become plain numpy reductions instead of
+per-day Python loops over model instances.
+"""
+from calendar import monthrange
+from datetime import date, timedelta
+
+import numpy as np
+
+from .models import Attendance, Employee
+
+# Cell status codes (stored as int8)
+STATUS_NONE = 0        # Future day, or today without a check-in yet
+STATUS_PRESENT = 1     # Checked out with a full day worked
+STATUS_HALF_DAY = 2    # Checked out below the half-day threshold
+STATUS_CHECKED_IN = 3  # Checked in but not checked out
+STATUS_ABSENT = 4      # Past working day without an attendance record
+STATUS_HOLIDAY = 5     # Sunday or 1st/3rd/5th Saturday without a record
+
+STATUS_LABELS = {
+    STATUS_NONE: 'none',
+    STATUS_PRESENT: 'present',
+    STATUS_HALF_DAY: 'halfday',
+    STATUS_CHECKED_IN: 'checked-in',
+    STATUS_ABSENT: 'absent',
+    STATUS_HOLIDAY: 'holiday',
+}
+
+HALF_DAY_THRESHOLD_SECONDS = int(4.5 * 60 * 60)
+
+
+def is_holiday(date_obj):
+    """Check if date is a holiday (Sunday or 1st, 3rd, 5th Saturday)"""
+    weekday = date_obj.weekday()
+    if weekday == 6:
+        return True
+    if weekday == 5:
+        # The n-th Saturday of the month is ((day - 1) // 7) + 1
+        return ((date_obj.day - 1) // 7) + 1 in {1, 3, 5}
+    return False
+
+
+def month_days(year, month):
+    """Return the list of dates in the given month."""
+    first_day = date(year, month, 1)
+    return [first_day + timedelta(days=i) for i in range(monthrange(year, month)[1])]
+
+
+def holiday_mask(days):
+    """Return a boolean array marking holidays for the provided dates."""
+    return np.fromiter((is_holiday(d) for d in days), dtype=bool, count=len(days))
+
+
+class AttendanceMatrix:
+    """Employees x days attendance status matrix for one month."""
+
+    def __init__(self, employee_ids, days, matrix, today):
+        self.employee_ids = employee_ids
+        self.days = days
+        self.matrix = matrix
+        self.today = today
+
+    @property
+    def holidays(self):
+        return holiday_mask(self.days)
+
+    @property
+    def working_days(self):
+        """Working days elapsed so far in the month (today included)."""
+        elapsed = np.fromiter((d <= self.today for d in self.days), dtype=bool, count=len(self.days))
+        return int((elapsed & ~self.holidays).sum())
+
+    def count(self, status, axis=None):
+        """Count cells with the given status, optionally reduced along an axis."""
+        return (self.matrix == status).sum(axis=axis)
+
+    def day_totals(self):
+        """Per-day (column) counts for every status."""
+        return {
+            label: self.count(code, axis=0).astype(int).tolist()
+            for code, label in STATUS_LABELS.items()
+        }
+
+    def employee_totals(self):
+        """Per-employee (row) counts for every status."""
+        return {
+            label: self.count(code, axis=1).astype(int).tolist()
+            for code, label in STATUS_LABELS.items()
+        }
+
+    def records_count(self):
+        """Number of cells backed by an attendance record."""
+        return int(np.isin(self.matrix, (STATUS_PRESENT, STATUS_HALF_DAY, STATUS_CHECKED_IN)).sum())
+
+    def row_strings(self):
+        """Encode each employee row as a compact digit string (one char per day)."""
+        digits = (self.matrix + ord('0')).astype(np.uint8)
+        return [row.tobytes().decode('ascii') for row in digits]
+
+
+def build_attendance_matrix(year, month, employee_ids=None, today=None):
+    """
+    Build the attendance status matrix for a month.
+
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        employee_ids: optional iterable of employee ids (defaults to all employees, ordered by name)
+        today: optional date used to decide past/future days (defaults to today)
+
+    Returns:
+        AttendanceMatrix instance
+    """
+    from django.utils import timezone
+
+    if today is None:
+        today = timezone.now().date()
+
+    days = month_days(year, month)
+    first_day, last_day = days[0], days[-1]
+
+    records = Attendance.objects.filter(date__gte=first_day, date__lte=last_day)
+    if employee_ids is None:
+        employee_ids = Employee.objects.order_by('name').values_list('id', flat=True)
+    else:
+        employee_ids = list(employee_ids)
+        records = records.filter(employee_id__in=employee_ids)
+    employee_ids = np.fromiter(employee_ids, dtype=np.int64)
+
+    n_employees, n_days = len(employee_ids), len(days)
+    matrix = np.full((n_employees, n_days), STATUS_NONE, dtype=np.int8)
+
+    # Baseline: holidays everywhere they apply, absent on past working days
+    holidays = holiday_mask(days)
+    past = np.fromiter((d < today for d in days), dtype=bool, count=n_days)
+    matrix[:, holidays] = STATUS_HOLIDAY
+    matrix[:, past & ~holidays] = STATUS_ABSENT
+
+    if not n_employees:
+        return AttendanceMatrix(employee_ids, days, matrix, today)
+
+    rows = list(records.values_list('employee_id', 'date', 'check_in_time', 'check_out_time', 'half_day'))
+
+    if rows:
+        emp_col = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        day_col = np.fromiter((r[1].day - 1 for r in rows), dtype=np.int64, count=len(rows))
+        checked_out = np.fromiter((r[3] is not None for r in rows), dtype=bool, count=len(rows))
+        half_flag = np.fromiter((r[4] for r in rows), dtype=bool, count=len(rows))
+        worked = np.fromiter(
+            ((r[3] - r[2]).total_seconds() if r[3] is not None else 0.0 for r in rows),
+            dtype=np.float64,
+            count=len(rows),
+        )
+
+        # Map employee ids to matrix rows
+        order = np.argsort(employee_ids)
+        positions = np.searchsorted(employee_ids, emp_col, sorter=order)
+        positions = np.clip(positions, 0, n_employees - 1)
+        row_idx = order[positions]
+        known = employee_ids[row_idx] == emp_col
+
+        status = np.where(
+            checked_out,
+            np.where(half_flag | (worked < HALF_DAY_THRESHOLD_SECONDS), STATUS_HALF_DAY, STATUS_PRESENT),
+            STATUS_CHECKED_IN,
+        ).astype(np.int8)
+        matrix[row_idx[known], day_col[known]] = status[known]
+
+    return AttendanceMatrix(employee_ids, days, matrix, today)
@@ -0,0 +1,79 @@
+"""
+Background task functions run by ``manage.py run_workers``.
+
+Each function is registered with ``@task`` and receives its JSON payload as
+keyword arguments. Tasks must be safe to run more than once: a worker that
+dies mid-task leaves its lease to expire and another worker retries it.
+"""
+import logging
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Attendance, AttendanceLog, Employee, Ticket
+from .photo_pipeline import delete_thumbnails
+from .task_queue import task
+
+logger = logging.getLogger(__name__)
+
+DELETE_CHUNK_SIZE = 1000
+
+
+def _delete_in_chunks(queryset, chunk_size=DELETE_CHUNK_SIZE):
+    """Delete rows in short transactions so the write lock is never held for long."""
+    deleted = 0
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        with transaction.atomic():
+            deleted += queryset.model.objects.filter(pk__in=ids).delete()[0]
+
+
+def _delete_file(storage, name):
+    if not name:
+        return
+    try:
+        storage.delete(name)
+    except OSError:
+        logger.warning('Could not delete file %s', name)
+
+
+def _delete_photo(storage, name):
+    """Delete a photo and its ``thumbs/<size>/`` variants."""
+    _delete_file(storage, name)
+    if not name:
+        return
+    try:
+        delete_thumbnails(name, storage)
+    except OSError:
+        logger.warning('Could not delete thumbnails of %s', name)
+
+
+@task('employees.delete_employee')
+def delete_employee(employee_id, user_id=None):
+    """
+    Delete an employee, their attendance history and uploaded files, then
+    their user account.
+    """
+    employee = Employee.objects.filter(pk=employee_id).first()
+    if employee is not None:
+        user_id = employee.user_id
+
+        _delete_in_chunks(AttendanceLog.objects.filter(employee_id=employee_id))
+
+        attendance = Attendance.objects.filter(employee_id=employee_id)
+        storage = Attendance._meta.get_field('check_in_photo').storage
+        for names in attendance.values_list('check_in_photo', 'check_out_photo').iterator():
+            for name in names:
+                _delete_photo(storage, name)
+        _delete_in_chunks(attendance)
+
+        _delete_photo(employee.profile_picture.storage, employee.profile_picture.name)
+        storage = Ticket._meta.get_field('attachment').storage
+        for name in Ticket.objects.filter(employee_id=employee_id).values_list('attachment', flat=True):
+            _delete_file(storage, name)
+
+    if user_id is not None:
+        # Cascades to the employee row, tickets and remaining related rows
+        User.objects.filter(pk=user_id).delete()
@@ -0,0 +1,98 @@
+"""
+Interning of attendance log client details (user agent + IP address).
+
+Each distinct user agent / IP pair is stored once in ``ClientFingerprint`` and
+attendance logs reference it by id. Lookups go through a small in-process LRU
+so repeat attempts from the same device do not hit the database.
+"""
+import hashlib
+import re
+from functools import lru_cache
+
+from django.db import IntegrityError, transaction
+
+_BROWSERS = (
+    ('Edge', re.compile(r'Edg(e|A|iOS)?/')),
+    ('Opera', re.compile(r'OPR/|Opera')),
+    ('Samsung Internet', re.compile(r'SamsungBrowser/')),
+    ('Firefox', re.compile(r'Firefox/|FxiOS/')),
+    ('Chrome', re.compile(r'Chrome/|CriOS/')),
+    ('Safari', re.compile(r'Safari/')),
+    ('Internet Explorer', re.compile(r'MSIE |Trident/')),
+)
+
+_OPERATING_SYSTEMS = (
+    ('Android', re.compile(r'Android')),
+    ('iOS', re.compile(r'iPhone|iPad|iPod')),
+    ('Windows', re.compile(r'Windows')),
+    ('macOS', re.compile(r'Mac OS X|Macintosh')),
+    ('ChromeOS', re.compile(r'CrOS')),
+    ('Linux', re.compile(r'Linux')),
+)
+
+
+def _match(patterns, user_agent):
+    for name, pattern in patterns:
+        if pattern.search(user_agent):
+            return name
+    return 'Other' if user_agent else ''
+
+
+def parse_user_agent(user_agent):
+    """
+    Extract the browser and operating system families from a user agent string.
+
+    Returns:
+        tuple of (browser, os); 'Other' when unrecognised, empty strings for an empty user agent
+    """
+    user_agent = user_agent or ''
+    return _match(_BROWSERS, user_agent), _match(_OPERATING_SYSTEMS, user_agent)
+
+
+def hash_user_agent(user_agent):
+    return hashlib.sha256((user_agent or '').encode('utf-8')).hexdigest()
+
+
+def fingerprint_key(user_agent, ip_address):
+    """Unique key of a user agent / IP address pair."""
+    return hashlib.sha256(f"{user_agent or ''}\x00{ip_address or ''}".encode('utf-8')).hexdigest()
+
+
+def fingerprint_fields(user_agent, ip_address):
+    """Field values of the ClientFingerprint row for a user agent / IP address pair."""
+    user_agent = user_agent or ''
+    browser, os_name = parse_user_agent(user_agent)
+    return {
+        'key': fingerprint_key(user_agent, ip_address),
+        'ua_hash': hash_user_agent(user_agent),
+        'user_agent': user_agent,
+        'browser': browser,
+        'os': os_name,
+        'ip_address': ip_address or None,
+    }
+
+
+@lru_cache(maxsize=4096)
+def get_client_fingerprint_id(user_agent, ip_address):
+    """
+    Return the ClientFingerprint id for a user agent / IP address pair, creating it if needed.
+
+    Returns None when neither value is known. Ids are cached per process, so
+    call ``get_client_fingerprint_id.cache_clear()`` after rolling back a
+    transaction that created fingerprints; the attendance logger clears it
+    itself when a cached id no longer exists (IntegrityError on insert).
+    """
+    from .models import ClientFingerprint
+
+    if not user_agent and not ip_address:
+        return None
+    fields = fingerprint_fields(user_agent, ip_address)
+    existing = ClientFingerprint.objects.filter(key=fields['key']).values_list('id', flat=True).first()
+    if existing is not None:
+        return existing
+    try:
+        with transaction.atomic():
+            return ClientFingerprint.objects.create(**fields).id
+    except IntegrityError:
+        # Another worker created it concurrently
+        return ClientFingerprint.objects.values_list('id', flat=True).get(key=fields['key'])
@@ -0,0 +1,277 @@
+"""
+In-process domain event bus for attendance, ticket, face-data and office site changes.
+
+Models emit typed events from ``save()``; the bus dispatches them once the
+surrounding transaction commits (``transaction.on_commit``), so subscribers
+never see rolled-back state. Subscribers are either synchronous (run in the
+committing thread) or deferred (run on a small thread pool), and every call
+is timed per subscriber.
+
+Subscribers are registered in ``employees/subscribers.py``. In tests, wrap the
+code under test in ``capture_events()`` to collect emitted events and run
+deferred subscribers inline; Django's ``TestCase`` additionally needs
+``captureOnCommitCallbacks(execute=True)`` for on-commit dispatch to happen.
+
+Bulk operations (``bulk_create``, ``QuerySet.update``) bypass ``save()`` and
+emit nothing.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DomainEvent:
+    """Base class for all domain events."""
+
+
+@dataclass(frozen=True)
+class AttendanceCheckedIn(DomainEvent):
+    attendance_id: int
+    employee_id: int
+    employee_name: str
+    date: date
+    check_in_time: datetime
+
+
+@dataclass(frozen=True)
+class AttendanceCheckedOut(DomainEvent):
+    attendance_id: int
+    employee_id: int
+    employee_name: str
+    date: date
+    check_out_time: datetime
+    half_day: bool
+
+
+@dataclass(frozen=True)
+class TicketCreated(DomainEvent):
+    ticket_id: int
+    ticket_number: str
+    employee_id: int
+    status: str
+    priority: str
+
+
+@dataclass(frozen=True)
+class TicketStatusChanged(DomainEvent):
+    ticket_id: int
+    ticket_number: str
+    old_status: str
+    status: str
+    old_priority: str
+    priority: str
+
+
+@dataclass(frozen=True)
+class TicketCommentAdded(DomainEvent):
+    comment_id: int
+    ticket_id: int
+    user_id: int
+    is_internal: bool
+
+
+@dataclass(frozen=True)
+class FaceEncodingChanged(DomainEvent):
+    employee_id: int
+    registered: bool
+
+
+@dataclass(frozen=True)
+class OfficeLocationsChanged(DomainEvent):
+    office_location_id: int | None
+
+
+class TrackedFieldsMixin:
+    """
+    Remember the database values of ``tracked_fields`` so ``save()`` can tell
+    what changed without re-reading the row.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _snapshot_tracked_fields(self):
+        self._tracked_values = {
+            field: getattr(self, field) for field in self.tracked_fields if field in self.__dict__
+        }
+
+    def tracked_changes(self):
+        """{field: (old, new)} for tracked fields that differ from the loaded values."""
+        loaded = getattr(self, '_tracked_values', {})
+        return {
+            field: (old, getattr(self, field))
+            for field, old in loaded.items()
+            if old != getattr(self, field)
+        }
+
+
+@dataclass
+class SubscriberStats:
+    calls: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'total_ms': round(self.total_seconds * 1e3, 3),
+            'mean_ms': round(self.total_seconds * 1e3 / self.calls, 3) if self.calls else 0.0,
+            'max_ms': round(self.max_seconds * 1e3, 3),
+        }
+
+
+@dataclass
+class Subscriber:
+    name: str
+    event_type: type
+    handler: object
+    deferred: bool = False
+
+
+class EventBus:
+    """
+    Publish/subscribe registry with after-commit dispatch.
+
+    Args:
+        max_workers: thread pool size for deferred subscribers
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._subscribers = []
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._inline = False
+        self._captured = None
+
+    def subscribe(self, event_type, handler=None, deferred=False, name=None):
+        """
+        Register ``handler(event)`` for ``event_type`` (and its subclasses).
+
+        Usable directly or as a decorator::
+
+            @domain_bus.subscribe(AttendanceCheckedIn)
+            def update_something(event): ...
+        """
+        def register(func):
+            subscriber = Subscriber(
+                name=name or f'{func.__module__}.{func.__qualname__}',
+                event_type=event_type,
+                handler=func,
+                deferred=deferred,
+            )
+            with self._lock:
+                if any(s.name == subscriber.name for s in self._subscribers):
+                    raise ValueError(f'Subscriber {subscriber.name} is already registered')
+                self._subscribers.append(subscriber)
+                self._stats[subscriber.name] = SubscriberStats()
+            return func
+
+        return register(handler) if handler is not None else register
+
+    def unsubscribe(self, name):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s.name != name]
+            self._stats.pop(name, None)
+
+    def emit(self, event):
+        """Dispatch ``event`` after the current transaction commits (immediately in autocommit)."""
+        transaction.on_commit(lambda: self.dispatch(event))
+
+    def dispatch(self, event):
+        """Deliver ``event`` to every matching subscriber now."""
+        if self._captured is not None:
+            self._captured.append(event)
+        for subscriber in [s for s in self._subscribers if isinstance(event, s.event_type)]:
+            if subscriber.deferred and not self._inline:
+                self._get_executor().submit(self._call_deferred, subscriber, event)
+            else:
+                self._call(subscriber, event)
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='domain-events'
+                    )
+        return self._executor
+
+    def _call(self, subscriber, event):
+        started = time.perf_counter()
+        failed = False
+        try:
+            subscriber.handler(event)
+        except Exception:
+            failed = True
+            logger.exception('Domain event subscriber %s failed on %s', subscriber.name, type(event).__name__)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._stats.setdefault(subscriber.name, SubscriberStats())
+                stats.calls += 1
+                stats.errors += failed
+                stats.total_seconds += elapsed
+                stats.max_seconds = max(stats.max_seconds, elapsed)
+
+    def _call_deferred(self, subscriber, event):
+        try:
+            self._call(subscriber, event)
+        finally:
+            connection.close()
+
+    def metrics(self):
+        """Per-subscriber call counts, errors and timings."""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+    def reset_metrics(self):
+        with self._lock:
+            self._stats = {s.name: SubscriberStats() for s in self._subscribers}
+
+
+domain_bus = EventBus(max_workers=getattr(settings, 'DOMAIN_EVENT_WORKERS', 4))
+
+
+def emit(event):
+    """Emit a domain event on the process-wide bus."""
+    domain_bus.emit(event)
+
+
+@contextmanager
+def capture_events(bus=None):
+    """
+    Test helper: collect dispatched events and run deferred subscribers inline.
+
+    Usage::
+
+        with capture_events() as events:
+            ...
+        assert any(isinstance(e, AttendanceCheckedIn) for e in events)
+    """
+    bus = bus or domain_bus
+    previous_captured, previous_inline = bus._captured, bus._inline
+    events = []
+    bus._captured, bus._inline = events, True
+    try:
+        yield events
+    finally:
+        bus._captured, bus._inline = previous_captured, previous_inline
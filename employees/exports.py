@@ -0,0 +1,246 @@
+"""
+Streaming CSV/XLSX export of attendance records and attendance logs.
+
+Rows are pulled with ``QuerySet.iterator(chunk_size=...)`` over ``values_list``
+tuples and written out incrementally, so memory stays flat regardless of the
+size of the exported range.
+"""
+import csv
+import re
+import zipfile
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+from .models import AttendanceLog
+
+DEFAULT_CHUNK_SIZE = 2000
+
+# Characters XML 1.0 does not allow, even escaped; one of them corrupts the workbook
+_XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+ATTENDANCE_HEADER = [
+    'Employee ID', 'Employee', 'Full Name', 'Date', 'Check-in', 'Check-out',
+    'Worked Hours', 'Half Day', 'Check-in Latitude', 'Check-in Longitude',
+    'Check-out Latitude', 'Check-out Longitude',
+]
+
+ATTENDANCE_LOG_HEADER = [
+    'Timestamp', 'Employee ID', 'Employee', 'Action', 'Success', 'Failure Reason',
+    'Confidence', 'IP Address', 'User Agent', 'Notes', 'Attendance ID',
+]
+
+
+def _format_datetime(value):
+    if value is None:
+        return ''
+    return timezone.localtime(value).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _format_value(value):
+    return '' if value is None else value
+
+
+def attendance_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the header and one tuple per attendance record."""
+    yield ATTENDANCE_HEADER
+    values = queryset.order_by('-check_in_time', '-id').values_list(
+        'employee_id', 'employee__name', 'employee__full_name', 'date',
+        'check_in_time', 'check_out_time', 'half_day',
+        'check_in_latitude', 'check_in_longitude',
+        'check_out_latitude', 'check_out_longitude',
+    )
+    for (employee_id, name, full_name, day, check_in, check_out, half_day,
+         in_lat, in_lon, out_lat, out_lon) in values.iterator(chunk_size=chunk_size):
+        worked = round((check_out - check_in).total_seconds() / 3600, 2) if check_out else ''
+        yield (
+            employee_id, name, full_name, day.isoformat(),
+            _format_datetime(check_in), _format_datetime(check_out),
+            worked, 'Yes' if half_day else 'No',
+            _format_value(in_lat), _format_value(in_lon),
+            _format_value(out_lat), _format_value(out_lon),
+        )
+
+
+def attendance_log_rows(queryset, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield the header and one tuple per attendance log entry."""
+    yield ATTENDANCE_LOG_HEADER
+    actions = dict(AttendanceLog.ACTION_CHOICES)
+    reasons = dict(AttendanceLog.FAILURE_REASONS)
+    values = queryset.order_by('-timestamp', '-id').values_list(
+        'timestamp', 'employee_id', 'employee__name', 'action', 'success',
+        'failure_reason', 'confidence', 'client__ip_address', 'client__user_agent', 'notes',
+        'attendance_id',
+    )
+    for (timestamp, employee_id, name, action, success, reason, confidence,
+         ip_address, user_agent, notes, attendance_id) in values.iterator(chunk_size=chunk_size):
+        yield (
+            _format_datetime(timestamp), employee_id, name,
+            actions.get(action, action), 'Yes' if success else 'No',
+            reasons.get(reason, reason or ''),
+            round(confidence, 1) if confidence is not None else '',
+            _format_value(ip_address), _format_value(user_agent),
+            _format_value(notes), _format_value(attendance_id),
+        )
+
+
+def archived_log_rows(records):
+    """Yield the header and one tuple per archived attendance log record."""
+    yield ATTENDANCE_LOG_HEADER
+    actions = dict(AttendanceLog.ACTION_CHOICES)
+    reasons = dict(AttendanceLog.FAILURE_REASONS)
+    for record in records:
+        confidence = record['confidence']
+        reason = record['failure_reason']
+        yield (
+            _format_datetime(record['timestamp']), record['employee_id'], record['employee_name'],
+            actions.get(record['action'], record['action']), 'Yes' if record['success'] else 'No',
+            reasons.get(reason, reason or ''),
+            round(confidence, 1) if confidence is not None else '',
+            _format_value(record['ip_address']), _format_value(record['user_agent']),
+            _format_value(record['notes']), _format_value(record['attendance_id']),
+        )
+
+
+class Echo:
+    """File-like object that returns written values instead of buffering them."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield CSV-encoded lines for the provided rows."""
+    writer = csv.writer(Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _DrainableBuffer:
+    """Unseekable write target for ZipFile whose contents can be drained between rows."""
+
+    def __init__(self):
+        self._chunks = []
+        self._size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self._size = 0
+        return data
+
+    def __len__(self):
+        return self._size
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_cell(ref, value):
+    if value is None:
+        return f'<c r="{ref}"/>'
+    if isinstance(value, bool):
+        value = 'Yes' if value else 'No'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_XML_INVALID_CHARS.sub('', str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+
+_XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def stream_xlsx(rows, sheet_name='Sheet1', flush_bytes=64 * 1024):
+    """
+    Yield an XLSX workbook for the provided rows in constant memory.
+
+    Cells are written as inline strings (no shared string table) into a
+    deflated zip entry, and the compressed output is handed out whenever
+    roughly ``flush_bytes`` have accumulated.
+    """
+    buffer = _DrainableBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', _XLSX_WORKBOOK.replace('{name}', escape(sheet_name[:31])))
+        archive.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                b'<sheetData>'
+            )
+            for row_number, row in enumerate(rows, start=1):
+                cells = ''.join(
+                    _xlsx_cell(f'{_column_letter(col)}{row_number}', value)
+                    for col, value in enumerate(row)
+                )
+                sheet.write(f'<row r="{row_number}">{cells}</row>'.encode('utf-8'))
+                if len(buffer) >= flush_bytes:
+                    yield buffer.drain()
+            sheet.write(b'</sheetData></worksheet>')
+
+    yield buffer.drain()
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', stream_csv),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', stream_xlsx),
+}
+
+
+def export_filename(prefix, export_format):
+    """Build a timestamped download filename."""
+    return f"{prefix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
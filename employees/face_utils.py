@@ -3,9 +3,8 @@
 """
 import face_recognition
 import numpy as np
-from PIL import Image
-import io
 from django.conf import settings
+from .image_decode import decode_image, decode_upload
 from .models import Employee
 
 
@@ -20,17 +19,7 @@ def extract_face_encoding(image_path):
         numpy array of face encoding or None if no face found
     """
     try:
-        # Load image
-        image = face_recognition.load_image_file(image_path)
-        
-        # Get face encodings
-        face_encodings = face_recognition.face_encodings(image)
-        
-        if face_encodings:
-            # Return the first face encoding found
-            return face_encodings[0]
-        else:
-            return None
+        return extract_face_encoding_from_array(decode_image(image_path))
             
     except Exception as e:
         print(f"Error extracting face encoding: {str(e)}")
@@ -48,29 +37,33 @@ def extract_face_encoding_from_file(uploaded_file):
         numpy array of face encoding or None if no face found
     """
     try:
-        # Read the uploaded file
-        image = Image.open(uploaded_file)
-        
-        # Convert to RGB if necessary
-        if image.mode != 'RGB':
-            image = image.convert('RGB')
-        
-        # Convert PIL Image to numpy array
-        image_array = np.array(image)
-        
-        # Get face encodings
-        face_encodings = face_recognition.face_encodings(image_array)
-        
-        if face_encodings:
-            return face_encodings[0]
-        else:
+        image = decode_upload(uploaded_file)
+        if image is None:
             return None
+        return extract_face_encoding_from_array(image)
             
     except Exception as e:
         print(f"Error extracting face encoding from file: {str(e)}")
         return None
 
 
+def extract_face_encoding_from_array(image_array):
+    """
+    Extract face encoding from an already decoded RGB image
+    
+    Args:
+        image_array: numpy array (height, width, 3) in RGB order
+        
+    Returns:
+        numpy array of face encoding or None if no face found
+    """
+    face_encodings = face_recognition.face_encodings(image_array)
+    
+    if face_encodings:
+        return face_encodings[0]
+    return None
+
+
 def compare_faces(known_encoding, unknown_encoding, tolerance=0.6):
     """
     Compare two face encodings
@@ -207,14 +200,14 @@ def validate_face_image(image_path):
     Validate that an image contains exactly one detectable face
     
     Args:
-        image_path: Path to the image file
+        image_path: Path to the image file, or an already decoded RGB array
         
     Returns:
-        dict with 'valid' (bool), 'face_count' (int), and 'message' (str)
+        dict with 'valid' (bool), 'face_count' (int), 'message' (str) and
+        'face_locations' (list of boxes, reusable for encoding)
     """
     try:
-        # Load image
-        image = face_recognition.load_image_file(image_path)
+        image = image_path if isinstance(image_path, np.ndarray) else decode_image(image_path)
         
         # Detect faces
         face_locations = face_recognition.face_locations(image)
@@ -224,26 +217,30 @@ def validate_face_image(image_path):
             return {
                 'valid': False,
                 'face_count': 0,
-                'message': 'No face detected in the image. Please upload a clear photo of your face.'
+                'message': 'No face detected in the image. Please upload a clear photo of your face.',
+                'face_locations': face_locations,
             }
         elif face_count > 1:
             return {
                 'valid': False,
                 'face_count': face_count,
-                'message': f'Multiple faces detected ({face_count}). Please upload a photo with only one person.'
+                'message': f'Multiple faces detected ({face_count}). Please upload a photo with only one person.',
+                'face_locations': face_locations,
             }
         else:
             return {
                 'valid': True,
                 'face_count': 1,
-                'message': 'Face detected successfully.'
+                'message': 'Face detected successfully.',
+                'face_locations': face_locations,
             }
             
     except Exception as e:
         return {
             'valid': False,
             'face_count': 0,
-            'message': f'Error validating image: {str(e)}'
+            'message': f'Error validating image: {str(e)}',
+            'face_locations': [],
         }
 
 
@@ -259,8 +256,9 @@ def process_and_store_face_encoding(employee, image_path):
         dict with 'success' (bool) and 'message' (str)
     """
     try:
-        # Validate the image
-        validation = validate_face_image(image_path)
+        # Decode once; detection and encoding share the array and face boxes
+        image = decode_image(image_path)
+        validation = validate_face_image(image)
         
         if not validation['valid']:
             return {
@@ -269,7 +267,8 @@ def process_and_store_face_encoding(employee, image_path):
             }
         
         # Extract face encoding
-        encoding = extract_face_encoding(image_path)
+        encodings = face_recognition.face_encodings(image, validation['face_locations'])
+        encoding = encodings[0] if encodings else None
         
         if encoding is None:
             return {
@@ -0,0 +1,74 @@
+"""
+Shared query filters for attendance list views, exports and management commands
+"""
+from datetime import datetime
+
+
+def parse_date_param(value):
+    """Parse a YYYY-MM-DD string, returning None for empty or invalid values."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def filter_attendance(queryset, params):
+    """
+    Apply the attendance list filters to a queryset.
+
+    Args:
+        queryset: Attendance queryset
+        params: mapping with optional 'date' (YYYY-MM-DD) and 'employee' (id) keys
+
+    Returns:
+        filtered queryset
+    """
+    date_filter = params.get('date')
+    employee_filter = params.get('employee')
+
+    if date_filter:
+        queryset = queryset.filter(date=date_filter)
+    if employee_filter:
+        queryset = queryset.filter(employee_id=employee_filter)
+
+    return queryset
+
+
+def filter_attendance_logs(queryset, params):
+    """
+    Apply the attendance log filters to a queryset.
+
+    Args:
+        queryset: AttendanceLog queryset
+        params: mapping with optional 'employee', 'action', 'status' ('success' or 'failed'),
+            'date_from' and 'date_to' (YYYY-MM-DD) keys
+
+    Returns:
+        filtered queryset
+    """
+    employee_id = params.get('employee')
+    action = params.get('action')
+    status = params.get('status')
+    date_from = parse_date_param(params.get('date_from'))
+    date_to = parse_date_param(params.get('date_to'))
+
+    if employee_id:
+        queryset = queryset.filter(employee_id=employee_id)
+
+    if action:
+        queryset = queryset.filter(action=action)
+
+    if status == 'success':
+        queryset = queryset.filter(success=True)
+    elif status == 'failed':
+        queryset = queryset.filter(success=False)
+
+    if date_from:
+        queryset = queryset.filter(timestamp__date__gte=date_from)
+
+    if date_to:
+        queryset = queryset.filter(timestamp__date__lte=date_to)
+
+    return queryset
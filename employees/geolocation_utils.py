@@ -1,9 +1,13 @@
 """
 Geolocation utilities for attendance check-in/check-out
+
+Office sites are ``OfficeLocation`` rows matched through the spatial index in
+``employees/office_index.py``. Until one is configured, the single office
+below is used; once sites exist but none is active, every location is refused.
 """
 import math
 
-# Office coordinates (manually configured)
+# Fallback office coordinates when no OfficeLocation exists (or OFFICE_DEFAULT_FALLBACK is on)
 OFFICE_LATITUDE = 26.875401
 OFFICE_LONGITUDE = 75.753071
 ALLOWED_RADIUS_METERS = 50  # 50 meters
@@ -38,13 +42,28 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     return distance
 
 
-def is_within_office_premises(user_latitude, user_longitude):
+def haversine_distances(lat1, lon1, lat2, lon2):
+    """
+    Vectorized ``haversine_distance`` over numpy arrays (broadcasting like any
+    ufunc expression). NaN coordinates give NaN distances.
+    
+    Returns distances in meters.
+    """
+    import numpy as np
+
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(value, dtype=np.float64)) for value in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371000 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def is_within_office_premises(user_latitude, user_longitude, employee_id=None):
     """
-    Check if the user's location is within the allowed radius of the office.
+    Check if the user's location is within the allowed area of an office.
     
     Args:
         user_latitude (float): User's current latitude
         user_longitude (float): User's current longitude
+        employee_id (int): Only match sites open to this employee (None: any site)
     
     Returns:
         tuple: (is_valid, distance, message)
@@ -53,24 +72,45 @@ def is_within_office_premises(user_latitude, user_longitude):
             - message (str): Success or error message
     """
     try:
-        # Calculate distance from office
-        distance = haversine_distance(
-            OFFICE_LATITUDE, 
-            OFFICE_LONGITUDE, 
-            user_latitude, 
-            user_longitude
-        )
-        
-        # Check if within allowed radius
-        if distance <= ALLOWED_RADIUS_METERS:
-            return True, distance, f"Location verified. You are {distance:.1f}m from office."
-        else:
-            return False, distance, f"You are not within office premises. You are {distance:.1f}m away from office (allowed: {ALLOWED_RADIUS_METERS}m)."
+        from employees.office_index import get_office_index
+
+        index = get_office_index()
+        if index.use_default_office:
+            return _within_default_office(user_latitude, user_longitude)
+        if not index.sites:
+            return False, None, "No office location is active. Please contact your administrator."
+
+        site, distance = index.match(user_latitude, user_longitude, employee_id)
+        if site is not None:
+            return True, distance, f"Location verified. You are {distance:.1f}m from {site.name}."
+
+        site, distance = index.nearest(user_latitude, user_longitude, employee_id)
+        if site is None:
+            return False, None, "No office location is assigned to you. Please contact your administrator."
+        allowed = 'inside the site boundary' if site.shape == 'polygon' else f'{site.radius_meters:.0f}m'
+        return False, distance, f"You are not within office premises. You are {distance:.1f}m away from {site.name} (allowed: {allowed})."
     
     except Exception as e:
         return False, None, f"Error validating location: {str(e)}"
 
 
+def _within_default_office(user_latitude, user_longitude):
+    """(is_valid, distance, message) for the single configured office."""
+    # Calculate distance from office
+    distance = haversine_distance(
+        OFFICE_LATITUDE, 
+        OFFICE_LONGITUDE, 
+        user_latitude, 
+        user_longitude
+    )
+    
+    # Check if within allowed radius
+    if distance <= ALLOWED_RADIUS_METERS:
+        return True, distance, f"Location verified. You are {distance:.1f}m from office."
+    else:
+        return False, distance, f"You are not within office premises. You are {distance:.1f}m away from office (allowed: {ALLOWED_RADIUS_METERS}m)."
+
+
 def validate_coordinates(latitude, longitude):
     """
     Validate that latitude and longitude are valid values.
@@ -0,0 +1,170 @@
+"""
+Single decode path for uploaded and captured images.
+
+Check-in/check-out uploads, webcam captures and face registration photos
+all go through ``decode_image``, which returns one RGB
+``uint8`` array shared by face detection, face encoding and the photo
+pipeline (``employees.photo_pipeline``). The source is read once: uploaded
+files are handed to Pillow as they are (in memory or on disk), raw request
+bodies and base64 payloads end up in a single ``bytes`` buffer that
+``BytesIO`` wraps without copying.
+
+``read_image_upload`` takes the image from a request: a raw ``image/*`` or
+``application/octet-stream`` body (what the face capture pages send from
+``canvas.toBlob``; Pillow sniffs the actual format), a multipart
+file, or, for older clients, a base64 data-URL form field. Bodies larger
+than ``FACE_UPLOAD_MAX_BYTES`` are refused before they are read.
+
+JPEGs larger than ``max_dimension`` are decoded at 1/2, 1/4 or 1/8 scale by
+libjpeg (DCT scaling via ``Image.draft()``), which is both faster and
+lighter than a full decode followed by a resize; the result is never smaller
+than ``max_dimension`` on its shorter side. EXIF orientation is applied in
+place. The returned array is read-only because several consumers share it.
+"""
+import base64
+import binascii
+import logging
+import os
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_MAX_BYTES = 15 * 1024 * 1024
+
+
+class ImageDecodeError(ValueError):
+    """The payload is not an image Pillow can decode."""
+
+
+class ImageTooLarge(ImageDecodeError):
+    """The upload is larger than ``FACE_UPLOAD_MAX_BYTES``."""
+
+
+def get_upload_max_bytes():
+    return int(getattr(settings, 'FACE_UPLOAD_MAX_BYTES', DEFAULT_UPLOAD_MAX_BYTES))
+
+
+def get_capture_options():
+    """Resolution cap and JPEG quality for browser captures (``canvas.toBlob``)."""
+    return {
+        'capture_max_dimension': int(getattr(settings, 'FACE_CAPTURE_MAX_DIMENSION', 960)),
+        'capture_quality': float(getattr(settings, 'FACE_CAPTURE_QUALITY', 0.85)),
+    }
+
+
+def _open(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return Image.open(BytesIO(source))
+    if isinstance(source, (str, os.PathLike)):
+        return Image.open(source)
+    # Django UploadedFile: decode from the temporary file on disk when there is one
+    if hasattr(source, 'temporary_file_path'):
+        return Image.open(source.temporary_file_path())
+    source.seek(0)
+    return Image.open(getattr(source, 'file', source))
+
+
+def decode_image(source, max_dimension=None):
+    """
+    Decode ``source`` to an RGB ``uint8`` array with EXIF orientation applied.
+
+    Args:
+        source: bytes-like, a filesystem path, or a file object / UploadedFile
+        max_dimension: if given, JPEGs may be decoded at a reduced scale whose
+            shorter side is still at least this many pixels
+
+    Returns:
+        read-only numpy array (height, width, 3)
+
+    Raises:
+        ImageDecodeError: the data is not a decodable image
+    """
+    try:
+        image = _open(source)
+        if max_dimension:
+            image.draft('RGB', (max_dimension, max_dimension))
+        ImageOps.exif_transpose(image, in_place=True)
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+    except (OSError, ValueError, SyntaxError, Image.DecompressionBombError) as exc:
+        raise ImageDecodeError(str(exc)) from exc
+
+
+def decode_data_url(payload):
+    """
+    Raw bytes of a base64 image, with or without a ``data:image/...;base64,`` prefix.
+
+    Raises:
+        ImageDecodeError: the payload is not valid base64
+    """
+    marker = payload.find('base64,')
+    if marker != -1:
+        payload = payload[marker + len('base64,'):]
+    try:
+        return base64.b64decode(payload)
+    except (binascii.Error, ValueError) as exc:
+        raise ImageDecodeError(str(exc)) from exc
+
+
+def decode_upload(uploaded_file):
+    """
+    Decode an uploaded photo at the resolution it will be stored at.
+
+    Returns:
+        numpy array (height, width, 3), or None if the file is not an image
+    """
+    from .photo_pipeline import get_max_dimension
+
+    try:
+        return decode_image(uploaded_file, get_max_dimension())
+    except ImageDecodeError as exc:
+        logger.warning('Could not decode uploaded image: %s', exc)
+        return None
+
+
+def read_image_upload(request, file_fields=('image_file',), data_url_fields=('image',)):
+    """
+    The image sent with ``request``: raw body bytes, an UploadedFile or
+    decoded data-URL bytes, whichever ``decode_image`` should read.
+
+    Returns:
+        bytes or UploadedFile, or None if the request carries no image
+
+    Raises:
+        ImageTooLarge: the image exceeds ``FACE_UPLOAD_MAX_BYTES``
+        ImageDecodeError: a data-URL field is not valid base64
+    """
+    limit = get_upload_max_bytes()
+    if request.content_type.startswith('image/') or request.content_type == 'application/octet-stream':
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > limit:
+            raise ImageTooLarge(f'{length} bytes')
+        # Read the stream directly: request.body would apply
+        # DATA_UPLOAD_MAX_MEMORY_SIZE and keep a second reference
+        data = request.read(limit + 1)
+        if len(data) > limit:
+            raise ImageTooLarge(f'more than {limit} bytes')
+        return data or None
+
+    for field in file_fields:
+        uploaded = request.FILES.get(field)
+        if uploaded is not None:
+            if uploaded.size > limit:
+                raise ImageTooLarge(f'{uploaded.size} bytes')
+            return uploaded
+
+    for field in data_url_fields:
+        payload = request.POST.get(field)
+        if payload:
+            if len(payload) * 3 // 4 > limit:
+                raise ImageTooLarge(f'about {len(payload) * 3 // 4} bytes')
+            return decode_data_url(payload)
+    return None
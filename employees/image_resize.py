@@ -0,0 +1,167 @@
+"""
+On-demand resized variants of media images, cached on disk.
+
+``/media-thumb/<size>/<path>`` (``employees.views.media_thumbnail``) returns
+``path`` scaled so its shorter side is ``size`` pixels (never upscaled), as
+WebP when the browser accepts it and JPEG otherwise. Variants are rendered
+once and kept in ``MEDIA_THUMB_CACHE_DIR`` under a key built from the path,
+the source modification time, the size and the format, so a replaced file
+gets fresh variants and stale ones are simply never read again.
+
+Decoding is the expensive part: JPEG sources are decoded at 1/2, 1/4 or 1/8
+scale with ``Image.draft()``, then shrunk by integer factors with
+``Image.reduce()`` before the final filtered resize. At most
+``MEDIA_THUMB_CONCURRENCY`` variants are rendered at once.
+
+Serving a cached variant refreshes its modification time (at most once a
+day), so variants of replaced or deleted sources are the ones left
+untouched; ``manage.py gc_media`` deletes variants unused for
+``MEDIA_THUMB_MAX_AGE_DAYS`` days.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+DEFAULT_SIZES = (32, 40, 48, 64, 80, 96, 128, 160, 240, 320, 480, 640)
+
+# Seconds between modification time refreshes of a served variant
+TOUCH_INTERVAL = 24 * 3600
+
+_render_slots = None
+_slots_lock = threading.Lock()
+_key_locks = {}
+
+
+class ResizeBusy(Exception):
+    """Every render slot stayed busy for longer than ``MEDIA_THUMB_WAIT`` seconds."""
+
+
+def get_allowed_sizes():
+    return tuple(getattr(settings, 'MEDIA_THUMB_SIZES', DEFAULT_SIZES))
+
+
+def get_cache_dir():
+    return str(getattr(settings, 'MEDIA_THUMB_CACHE_DIR', settings.BASE_DIR / 'var' / 'media_thumbs'))
+
+
+def get_max_age_days():
+    return float(getattr(settings, 'MEDIA_THUMB_MAX_AGE_DAYS', 30))
+
+
+def _get_render_slots():
+    global _render_slots
+    if _render_slots is None:
+        with _slots_lock:
+            if _render_slots is None:
+                _render_slots = threading.BoundedSemaphore(int(getattr(settings, 'MEDIA_THUMB_CONCURRENCY', 4)))
+    return _render_slots
+
+
+def _key_lock(key):
+    with _slots_lock:
+        return _key_locks.setdefault(key, threading.Lock())
+
+
+def variant_key(name, size, image_format):
+    """Cache key for one variant; changes when the source file is replaced."""
+    version = default_storage.get_modified_time(name).timestamp()
+    return hashlib.sha1(f'{name}\0{version}\0{size}\0{image_format}'.encode()).hexdigest()
+
+
+def variant_path(key, image_format):
+    return os.path.join(get_cache_dir(), key[:2], f'{key}.{image_format}')
+
+
+def _cached(path):
+    """Whether the variant exists; marks it as recently used."""
+    try:
+        modified = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return False
+    if time.time() - modified > TOUCH_INTERVAL:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return True
+
+
+def render_variant(source, size, image_format):
+    """Encode ``source`` (a binary file) with its shorter side scaled down to ``size``."""
+    image = Image.open(source)
+    # JPEG: let libjpeg decode at the smallest DCT scale still >= size
+    image.draft('RGB', (size, size))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+
+    scale = size / min(image.size)
+    if scale < 1:
+        # Integer box reduction down to ~2x the target, then a proper filter
+        factor = int(1 / scale) // 2
+        if factor >= 2:
+            image = image.reduce(factor)
+        target = (max(1, round(image.width * size / min(image.size))),
+                  max(1, round(image.height * size / min(image.size))))
+        image = image.resize(target, Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if image_format == 'webp':
+        image.save(buffer, format='WEBP', quality=80, method=4)
+    else:
+        image.convert('RGB').save(buffer, format='JPEG', quality=82, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def get_variant(name, size, image_format):
+    """
+    Path of the cached variant, rendering it first if needed.
+
+    Raises:
+        ResizeBusy: no render slot became free in time
+    """
+    key = variant_key(name, size, image_format)
+    path = variant_path(key, image_format)
+    if _cached(path):
+        return path, key
+
+    # One render per variant; concurrent requests for it wait for the first
+    lock = _key_lock(key)
+    try:
+        with lock:
+            if os.path.exists(path):
+                return path, key
+            slots = _get_render_slots()
+            if not slots.acquire(timeout=float(getattr(settings, 'MEDIA_THUMB_WAIT', 10))):
+                raise ResizeBusy()
+            try:
+                with default_storage.open(name, 'rb') as source:
+                    data = render_variant(source, size, image_format)
+            finally:
+                slots.release()
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as temp:
+                temp.write(data)
+            os.replace(temp.name, path)
+    finally:
+        # Also on ResizeBusy and decode errors, or the lock map grows per failed key
+        with _slots_lock:
+            if _key_locks.get(key) is lock:
+                del _key_locks[key]
+    return path, key
+
+
+def srcset_sizes(size):
+    """(1x, 2x) sizes from the allowed list for an image displayed at ``size`` CSS pixels."""
+    allowed = sorted(get_allowed_sizes())
+    one = next((s for s in allowed if s >= size), allowed[-1])
+    two = next((s for s in allowed if s >= 2 * size), allowed[-1])
+    return one, two
@@ -0,0 +1,152 @@
+"""
+In-process fan-out of live dashboard events over Server-Sent Events.
+
+Compact events (``check_in``, ``check_out``, ``ticket_created``,
+``ticket_status``) are published by domain event subscribers
+(``employees/subscribers.py``) after the change commits. Each event is encoded
+to an SSE frame once and handed to every connected subscriber's bounded
+``asyncio.Queue`` on that subscriber's event loop, so publishing from a sync
+view thread never blocks on slow clients; a subscriber that falls behind loses
+its oldest frames instead.
+
+The bus lives in the process that serves the ASGI application (see
+``config/asgi.py``); events published by other worker processes are not seen.
+Under WSGI nothing subscribes and the dashboard polls its counters instead.
+"""
+import asyncio
+import json
+import threading
+
+DEFAULT_QUEUE_SIZE = 100
+
+
+def encode_event(event_type, data):
+    """Encode one SSE frame."""
+    payload = json.dumps(data, separators=(',', ':'), default=str)
+    return f'event: {event_type}\ndata: {payload}\n\n'
+
+
+class Subscription:
+    """One connected stream: a bounded queue bound to the event loop that reads it."""
+
+    def __init__(self, loop, maxsize=DEFAULT_QUEUE_SIZE):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, frame):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(frame)
+
+
+def _fan_out(subscriptions, frame):
+    for subscription in subscriptions:
+        subscription._put(frame)
+
+
+class LiveEventBus:
+    """Thread-safe registry of SSE subscriptions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self.published = 0
+
+    def subscribe(self, maxsize=DEFAULT_QUEUE_SIZE):
+        """Register a subscription on the running event loop."""
+        subscription = Subscription(asyncio.get_running_loop(), maxsize=maxsize)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+    def publish(self, event_type, data):
+        """
+        Encode an event once and deliver it to every subscriber.
+
+        Subscriptions are grouped by event loop so a publish from another
+        thread wakes each loop once, not once per subscriber.
+        """
+        frame = encode_event(event_type, data)
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+
+        by_loop = {}
+        for subscription in subscriptions:
+            by_loop.setdefault(subscription.loop, []).append(subscription)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        for loop, group in by_loop.items():
+            if loop is running:
+                _fan_out(group, frame)
+                continue
+            try:
+                loop.call_soon_threadsafe(_fan_out, group, frame)
+            except RuntimeError:
+                # Event loop already closed; those streams are gone
+                with self._lock:
+                    self._subscriptions.difference_update(group)
+        self.published += 1
+        return len(subscriptions)
+
+
+bus = LiveEventBus()
+
+
+async def event_stream(subscription, heartbeat=15.0, retry_ms=5000, event_bus=None):
+    """
+    Async generator of SSE frames for one subscription.
+
+    Sends a ``retry`` hint first and a comment line every ``heartbeat``
+    seconds so proxies keep the connection open. Frames that queued up while
+    the client was busy are sent together in one chunk.
+    """
+    event_bus = event_bus or bus
+    queue = subscription.queue
+    try:
+        yield f'retry: {retry_ms}\n\n'
+        while True:
+            try:
+                async with asyncio.timeout(heartbeat):
+                    frames = [await queue.get()]
+            except TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            while not queue.empty():
+                frames.append(queue.get_nowait())
+            yield ''.join(frames)
+    finally:
+        event_bus.unsubscribe(subscription)
+
+
+class EventStream:
+    """
+    Streaming response body for one subscription.
+
+    Django calls ``close()`` on the response content when the response is
+    closed, which unsubscribes even if the generator is never finalised.
+    """
+
+    def __init__(self, subscription, event_bus=None, **options):
+        self.subscription = subscription
+        self.event_bus = event_bus or bus
+        self.options = options
+
+    def __aiter__(self):
+        return event_stream(self.subscription, event_bus=self.event_bus, **self.options)
+
+    def close(self):
+        self.event_bus.unsubscribe(self.subscription)
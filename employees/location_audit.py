@@ -0,0 +1,318 @@
+"""
+Vectorized audit of the coordinates stored with check-ins and check-outs.
+
+Attendance rows are read in id-ordered chunks straight into numpy arrays
+(coordinates are cast to float in SQL, so no ``Decimal`` objects are built)
+and every check runs on whole arrays:
+
+- outliers: points more than ``outlier_meters`` outside the allowed area of
+  the closest office (``OfficeLocation`` sites, or the default office in
+  ``geolocation_utils`` when none is configured);
+- impossible travel: check-in to check-out pairs further apart than
+  ``min_travel_meters`` whose implied speed exceeds ``max_speed_kmh``;
+- shared coordinates: the exact same point, to the stored 7 decimals,
+  reported by ``min_employees`` or more employees, which independent GPS
+  fixes practically never do.
+
+Between chunks only the flagged rows are kept, plus one int64 point key and
+employee id per coordinate for the shared-coordinate check. Check-in and
+check-out times are only loaded for pairs far enough apart to be candidates
+for impossible travel, since converting datetimes costs more than all the
+arithmetic.
+"""
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .geolocation_utils import ALLOWED_RADIUS_METERS, OFFICE_LATITUDE, OFFICE_LONGITUDE, haversine_distances
+from .models import Attendance, Employee
+
+# Distance matrix elements (rows x sites) computed at once
+MATRIX_BUDGET = 4_000_000
+
+# Ids per query when loading times for travel candidates
+ID_BATCH = 5_000
+
+# Point keys: latitude/longitude in 1e-7 degree steps, offset to be non-negative
+KEY_SCALE = 10_000_000
+LAT_OFFSET = 90 * KEY_SCALE
+LON_OFFSET = 180 * KEY_SCALE
+LON_SPAN = 360 * KEY_SCALE + 1
+
+KINDS = ('check_in', 'check_out')
+
+
+def get_chunk_size():
+    return int(getattr(settings, 'LOCATION_AUDIT_CHUNK_SIZE', 200_000))
+
+
+def _epoch(value):
+    return value.timestamp() if value is not None else np.nan
+
+
+@dataclass
+class LocationAuditReport:
+    rows: int = 0
+    points: int = 0
+    outlier_count: int = 0
+    travel_count: int = 0
+    shared_count: int = 0
+    seconds: float = 0.0
+    outliers: list = field(default_factory=list)
+    impossible_travel: list = field(default_factory=list)
+    shared_coordinates: list = field(default_factory=list)
+
+
+def office_sites():
+    """
+    Office centres and allowed radii as arrays. A polygon site is approximated
+    by the circle through its farthest point.
+
+    Returns:
+        dict with 'name' (list), 'latitude', 'longitude', 'radius' (float64 arrays)
+    """
+    from .office_index import load_sites
+
+    sites = load_sites()
+    if not sites:
+        return {
+            'name': ['Office'],
+            'latitude': np.array([OFFICE_LATITUDE]),
+            'longitude': np.array([OFFICE_LONGITUDE]),
+            'radius': np.array([float(ALLOWED_RADIUS_METERS)]),
+        }
+    radius = []
+    for site in sites:
+        if site.shape == 'polygon':
+            points = np.array(site.polygon)
+            radius.append(float(haversine_distances(site.latitude, site.longitude, points[:, 0], points[:, 1]).max()))
+        else:
+            radius.append(site.radius_meters)
+    return {
+        'name': [site.name for site in sites],
+        'latitude': np.array([site.latitude for site in sites]),
+        'longitude': np.array([site.longitude for site in sites]),
+        'radius': np.array(radius),
+    }
+
+
+def fetch_chunks(start=None, end=None, chunk_size=None):
+    """
+    Yield attendance coordinates as dicts of parallel arrays, ``chunk_size`` rows at a time.
+
+    Keys: id, employee_id (int64); check_in_lat/lon, check_out_lat/lon
+    (float64, NaN when missing)
+    """
+    chunk_size = chunk_size or get_chunk_size()
+    queryset = Attendance.objects.all()
+    if start:
+        queryset = queryset.filter(date__gte=start)
+    if end:
+        queryset = queryset.filter(date__lte=end)
+    queryset = queryset.annotate(
+        in_lat=Cast('check_in_latitude', FloatField()),
+        in_lon=Cast('check_in_longitude', FloatField()),
+        out_lat=Cast('check_out_latitude', FloatField()),
+        out_lon=Cast('check_out_longitude', FloatField()),
+    ).order_by('id')
+
+    last_id = 0
+    while True:
+        rows = list(queryset.filter(id__gt=last_id).values_list(
+            'id', 'employee_id', 'in_lat', 'in_lon', 'out_lat', 'out_lon',
+        )[:chunk_size])
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        count = len(rows)
+        ids, employee_ids, in_lat, in_lon, out_lat, out_lon = zip(*rows)
+        yield {
+            'id': np.fromiter(ids, dtype=np.int64, count=count),
+            'employee_id': np.fromiter(employee_ids, dtype=np.int64, count=count),
+            # None -> NaN
+            'check_in_lat': np.array(in_lat, dtype=np.float64),
+            'check_in_lon': np.array(in_lon, dtype=np.float64),
+            'check_out_lat': np.array(out_lat, dtype=np.float64),
+            'check_out_lon': np.array(out_lon, dtype=np.float64),
+        }
+
+
+def visit_hours(ids):
+    """Hours between check-in and check-out for each attendance id (NaN when either is missing)."""
+    seconds = {}
+    for begin in range(0, len(ids), ID_BATCH):
+        batch = ids[begin:begin + ID_BATCH].tolist()
+        for pk, check_in, check_out in Attendance.objects.filter(id__in=batch).values_list(
+            'id', 'check_in_time', 'check_out_time',
+        ):
+            seconds[pk] = _epoch(check_out) - _epoch(check_in)
+    hours = np.fromiter((seconds.get(pk, np.nan) for pk in ids.tolist()), dtype=np.float64, count=len(ids))
+    # At least one second, so zero-length visits still get a (huge) finite speed
+    return np.maximum(hours, 1.0) / 3600
+
+
+def nearest_office(latitude, longitude, sites):
+    """
+    Metres outside the closest office's allowed area (negative: inside) and
+    that office's index, computed in row blocks of at most MATRIX_BUDGET distances.
+    """
+    count = len(latitude)
+    excess = np.empty(count)
+    site_index = np.empty(count, dtype=np.int64)
+    block = max(1, MATRIX_BUDGET // len(sites['radius']))
+    for begin in range(0, count, block):
+        rows = slice(begin, begin + block)
+        distances = haversine_distances(
+            latitude[rows, None], longitude[rows, None], sites['latitude'][None, :], sites['longitude'][None, :],
+        )
+        distances -= sites['radius'][None, :]
+        site_index[rows] = distances.argmin(axis=1)
+        excess[rows] = distances[np.arange(len(site_index[rows])), site_index[rows]]
+    return excess, site_index
+
+
+def point_keys(latitude, longitude):
+    """One int64 per coordinate, equal exactly when both values agree to 7 decimals."""
+    lat = np.rint(latitude * KEY_SCALE).astype(np.int64) + LAT_OFFSET
+    lon = np.rint(longitude * KEY_SCALE).astype(np.int64) + LON_OFFSET
+    return lat * LON_SPAN + lon
+
+
+def decode_point_key(key):
+    lat, lon = divmod(int(key), LON_SPAN)
+    return (lat - LAT_OFFSET) / KEY_SCALE, (lon - LON_OFFSET) / KEY_SCALE
+
+
+def shared_points(keys, employee_ids, min_employees):
+    """
+    Point keys reported by at least ``min_employees`` distinct employees.
+
+    Returns:
+        (keys, employee counts, {key: sorted employee ids}) ordered by count, descending
+    """
+    if not len(keys):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {}
+    order = np.lexsort((employee_ids, keys))
+    keys, employee_ids = keys[order], employee_ids[order]
+    # Distinct (key, employee) pairs, still sorted by key
+    distinct = np.ones(len(keys), dtype=bool)
+    distinct[1:] = (keys[1:] != keys[:-1]) | (employee_ids[1:] != employee_ids[:-1])
+    keys, employee_ids = keys[distinct], employee_ids[distinct]
+
+    unique_keys, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+    shared = counts >= min_employees
+    unique_keys, starts, counts = unique_keys[shared], starts[shared], counts[shared]
+    ranking = np.argsort(-counts, kind='stable')
+    members = {
+        int(unique_keys[i]): employee_ids[starts[i]:starts[i] + counts[i]].tolist() for i in ranking
+    }
+    return unique_keys[ranking], counts[ranking], members
+
+
+def audit_locations(start=None, end=None, outlier_meters=100.0, max_speed_kmh=200.0, min_travel_meters=1000.0,
+                    min_employees=2, chunk_size=None, limit=100):
+    """
+    Run every check over attendance between ``start`` and ``end`` (inclusive dates).
+
+    Returns:
+        LocationAuditReport; the flagged lists hold the worst ``limit`` entries
+        of each kind, the counts cover all of them
+    """
+    started = time.monotonic()
+    report = LocationAuditReport()
+    sites = office_sites()
+
+    outliers = {name: [] for name in ('id', 'employee_id', 'kind', 'excess', 'site')}
+    travel = {name: [] for name in ('id', 'employee_id', 'distance', 'speed')}
+    keys, owners = [], []
+
+    for chunk in fetch_chunks(start, end, chunk_size):
+        report.rows += len(chunk['id'])
+        for kind_index, kind in enumerate(KINDS):
+            lat, lon = chunk[f'{kind}_lat'], chunk[f'{kind}_lon']
+            valid = ~(np.isnan(lat) | np.isnan(lon))
+            lat, lon = lat[valid], lon[valid]
+            report.points += len(lat)
+
+            excess, site_index = nearest_office(lat, lon, sites)
+            bad = excess > outlier_meters
+            rows = np.flatnonzero(valid)[bad]
+            outliers['id'].append(chunk['id'][rows])
+            outliers['employee_id'].append(chunk['employee_id'][rows])
+            outliers['kind'].append(np.full(len(rows), kind_index))
+            outliers['excess'].append(excess[bad])
+            outliers['site'].append(site_index[bad])
+
+            keys.append(point_keys(lat, lon))
+            owners.append(chunk['employee_id'][valid])
+
+        distance = haversine_distances(
+            chunk['check_in_lat'], chunk['check_in_lon'], chunk['check_out_lat'], chunk['check_out_lon'],
+        )
+        with np.errstate(invalid='ignore'):
+            far = np.flatnonzero(distance > min_travel_meters)
+        speed = distance[far] / 1000 / visit_hours(chunk['id'][far])
+        with np.errstate(invalid='ignore'):
+            bad = far[speed > max_speed_kmh]
+            speed = speed[speed > max_speed_kmh]
+        travel['id'].append(chunk['id'][bad])
+        travel['employee_id'].append(chunk['employee_id'][bad])
+        travel['distance'].append(distance[bad])
+        travel['speed'].append(speed)
+
+    outliers = {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in outliers.items()}
+    travel = {name: np.concatenate(parts) if parts else np.empty(0) for name, parts in travel.items()}
+    report.outlier_count = len(outliers['id'])
+    report.travel_count = len(travel['id'])
+
+    shared_keys, shared_counts, members = shared_points(
+        np.concatenate(keys) if keys else np.empty(0, dtype=np.int64),
+        np.concatenate(owners) if owners else np.empty(0, dtype=np.int64),
+        min_employees,
+    )
+    report.shared_count = len(shared_keys)
+
+    # Worst first, then only the reported rows are looked up
+    worst_outliers = np.argsort(-outliers['excess'], kind='stable')[:limit]
+    worst_travel = np.argsort(-travel['speed'], kind='stable')[:limit]
+    records = Attendance.objects.select_related('employee').in_bulk(
+        set(outliers['id'][worst_outliers].astype(int).tolist()) | set(travel['id'][worst_travel].astype(int).tolist())
+    )
+    report.outliers = [
+        {
+            'attendance': records.get(int(outliers['id'][i])),
+            'kind': KINDS[int(outliers['kind'][i])],
+            'meters_outside': float(outliers['excess'][i]),
+            'office': sites['name'][int(outliers['site'][i])],
+        }
+        for i in worst_outliers
+    ]
+    report.impossible_travel = [
+        {
+            'attendance': records.get(int(travel['id'][i])),
+            'distance_meters': float(travel['distance'][i]),
+            'speed_kmh': float(travel['speed'][i]),
+        }
+        for i in worst_travel
+    ]
+
+    shown = shared_keys[:limit]
+    names = dict(Employee.objects.filter(
+        pk__in={employee_id for key in shown for employee_id in members[int(key)]}
+    ).values_list('pk', 'name'))
+    report.shared_coordinates = []
+    for key, count in zip(shown, shared_counts[:limit]):
+        latitude, longitude = decode_point_key(key)
+        report.shared_coordinates.append({
+            'latitude': latitude,
+            'longitude': longitude,
+            'employee_count': int(count),
+            'employees': [names.get(employee_id, f'#{employee_id}') for employee_id in members[int(key)]],
+        })
+
+    report.seconds = time.monotonic() - started
+    return report
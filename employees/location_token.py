@@ -0,0 +1,55 @@
+"""
+Signed location tokens for check-in/check-out.
+
+The browser first posts its coordinates to ``employees.views.location_precheck``
+(a few hundred bytes); only when they are inside the office premises does it
+receive a token and upload the photo. The token is signed with
+``SECRET_KEY``, binds the employee, the action and the coordinates, and
+expires after ``ATTENDANCE_LOCATION_TOKEN_MAX_AGE`` seconds, so the photo
+POST is not validated again and cannot swap in other coordinates.
+
+Check-in/check-out POSTs without a token are refused. Setting
+``ATTENDANCE_LOCATION_TOKEN_REQUIRED = False`` re-enables the older flow
+(coordinates posted together with the photo) for clients that predate the
+pre-check.
+"""
+from django.conf import settings
+from django.core import signing
+
+SALT = 'employees.location_token'
+ACTIONS = ('check_in', 'check_out')
+
+
+def get_max_age():
+    return int(getattr(settings, 'ATTENDANCE_LOCATION_TOKEN_MAX_AGE', 120))
+
+
+def token_required():
+    return bool(getattr(settings, 'ATTENDANCE_LOCATION_TOKEN_REQUIRED', True))
+
+
+def issue_token(employee_id, action, latitude, longitude):
+    """Token vouching that ``employee_id`` was at (latitude, longitude) for ``action``."""
+    return signing.dumps(
+        {'e': employee_id, 'a': action, 'lat': str(latitude), 'lon': str(longitude)},
+        salt=SALT,
+        compress=True,
+    )
+
+
+def read_token(token, employee_id, action):
+    """
+    Coordinates carried by a valid token.
+
+    Returns:
+        (latitude, longitude) as the strings that were validated
+
+    Raises:
+        signing.SignatureExpired: the token is older than ``get_max_age()``
+        signing.BadSignature: the token is forged, malformed or for another
+            employee or action
+    """
+    payload = signing.loads(token, salt=SALT, max_age=get_max_age())
+    if not isinstance(payload, dict) or payload.get('e') != employee_id or payload.get('a') != action:
+        raise signing.BadSignature('Location token does not match this request')
+    return payload['lat'], payload['lon']
@@ -0,0 +1,173 @@
+"""
+Retention and archival for AttendanceLog.
+
+Rows older than the retention window are moved, in chunked transactions, into
+yearly gzip-compressed JSONL files (``attendance-logs-<year>.jsonl.gz``, by
+year in the local time zone, like the date filters) so the hot table and its
+``-timestamp`` indexes stay small. Each chunk is appended as its own gzip
+member before the rows are deleted, so a crash can at worst leave a chunk
+both archived and live; the next run appends it again and
+``iter_archived_logs`` drops the repeat.
+"""
+import glob
+import gzip
+import json
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .filters import parse_date_param
+from .models import AttendanceLog
+
+DEFAULT_CHUNK_SIZE = 5000
+
+ARCHIVE_FIELDS = (
+    'id', 'timestamp', 'employee_id', 'employee__name', 'action', 'success',
+    'failure_reason', 'confidence', 'client__ip_address', 'client__user_agent', 'notes', 'attendance_id',
+)
+
+# Archive record keys for the related lookups above
+_ARCHIVE_KEYS = {
+    'employee__name': 'employee_name',
+    'client__ip_address': 'ip_address',
+    'client__user_agent': 'user_agent',
+}
+
+_ARCHIVE_NAME = re.compile(r'attendance-logs-(\d{4})\.jsonl\.gz$')
+
+
+def get_archive_dir():
+    """Directory holding the yearly archive files."""
+    return str(getattr(settings, 'ATTENDANCE_LOG_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'var', 'attendance_log_archive')))
+
+
+def get_retention_days():
+    """Number of days AttendanceLog rows stay in the live table."""
+    return int(getattr(settings, 'ATTENDANCE_LOG_RETENTION_DAYS', 180))
+
+
+def archive_path(year, archive_dir=None):
+    return os.path.join(archive_dir or get_archive_dir(), f'attendance-logs-{year}.jsonl.gz')
+
+
+def archived_years(archive_dir=None):
+    """Sorted list of years that have an archive file."""
+    years = []
+    for path in glob.glob(os.path.join(archive_dir or get_archive_dir(), 'attendance-logs-*.jsonl.gz')):
+        match = _ARCHIVE_NAME.search(path)
+        if match:
+            years.append(int(match.group(1)))
+    return sorted(years)
+
+
+def _serialize(row):
+    record = {_ARCHIVE_KEYS.get(field, field): value for field, value in zip(ARCHIVE_FIELDS, row)}
+    record['timestamp'] = record['timestamp'].isoformat()
+    return json.dumps(record, separators=(',', ':'))
+
+
+def _append_chunk(rows, archive_dir):
+    """Append a chunk of rows to their yearly archives as new gzip members."""
+    by_year = {}
+    for row in rows:
+        by_year.setdefault(timezone.localtime(row[1]).year, []).append(_serialize(row))
+    os.makedirs(archive_dir, exist_ok=True)
+    for year, lines in by_year.items():
+        with open(archive_path(year, archive_dir), 'ab') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='ab') as handle:
+                handle.write(('\n'.join(lines) + '\n').encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def archive_attendance_logs(cutoff, chunk_size=DEFAULT_CHUNK_SIZE, archive_dir=None, dry_run=False):
+    """
+    Move AttendanceLog rows with ``timestamp < cutoff`` into the yearly archives.
+
+    Args:
+        cutoff: aware datetime; older rows are archived
+        chunk_size: rows archived and deleted per transaction
+        archive_dir: target directory (defaults to ATTENDANCE_LOG_ARCHIVE_DIR)
+        dry_run: only count the rows that would be archived
+
+    Returns:
+        Number of rows archived (or eligible, for a dry run)
+    """
+    archive_dir = archive_dir or get_archive_dir()
+    old_logs = AttendanceLog.objects.filter(timestamp__lt=cutoff)
+    if dry_run:
+        return old_logs.count()
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                old_logs.order_by('timestamp', 'id').values_list(*ARCHIVE_FIELDS)[:chunk_size]
+            )
+            if not rows:
+                break
+            _append_chunk(rows, archive_dir)
+            AttendanceLog.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+    return archived
+
+
+def default_cutoff(days=None):
+    """Start of the retention window, ``days`` ago (defaults to ATTENDANCE_LOG_RETENTION_DAYS)."""
+    return timezone.now() - timedelta(days=get_retention_days() if days is None else days)
+
+
+def iter_archived_logs(params=None, archive_dir=None):
+    """
+    Yield archived log records (dicts) matching the attendance log filters.
+
+    Only the yearly files overlapping ``date_from``/``date_to`` are read.
+
+    Args:
+        params: mapping with optional 'employee', 'action', 'status', 'date_from', 'date_to' keys
+        archive_dir: archive directory (defaults to ATTENDANCE_LOG_ARCHIVE_DIR)
+    """
+    params = params or {}
+    employee_id = params.get('employee')
+    action = params.get('action')
+    status = params.get('status')
+    date_from = parse_date_param(params.get('date_from'))
+    date_to = parse_date_param(params.get('date_to'))
+
+    for year in archived_years(archive_dir):
+        if (date_from and year < date_from.year) or (date_to and year > date_to.year):
+            continue
+        # Chunks are appended in (timestamp, id) order, so a repeated chunk is a
+        # run going back to keys already read; rows inserted late keep a new id
+        last_key = None
+        max_id = 0
+        with gzip.open(archive_path(year, archive_dir), 'rt', encoding='utf-8') as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                record['timestamp'] = parse_datetime(record['timestamp'])
+                key = (record['timestamp'], record['id'])
+                if last_key is not None and key <= last_key and record['id'] <= max_id:
+                    continue
+                last_key = key if last_key is None else max(last_key, key)
+                max_id = max(max_id, record['id'])
+                day = timezone.localtime(record['timestamp']).date()
+                if employee_id and str(record['employee_id']) != str(employee_id):
+                    continue
+                if action and record['action'] != action:
+                    continue
+                if status == 'success' and not record['success']:
+                    continue
+                if status == 'failed' and record['success']:
+                    continue
+                if date_from and day < date_from:
+                    continue
+                if date_to and day > date_to:
+                    continue
+                yield record
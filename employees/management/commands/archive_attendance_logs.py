@@ -0,0 +1,45 @@
+"""
+Management command to move old attendance logs into yearly compressed archives
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.log_archive import (
+    DEFAULT_CHUNK_SIZE,
+    archive_attendance_logs,
+    default_cutoff,
+    get_archive_dir,
+)
+
+
+class Command(BaseCommand):
+    help = 'Archive attendance logs older than the retention window into yearly gzip JSONL files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int,
+                            help='Archive logs older than this many days (defaults to ATTENDANCE_LOG_RETENTION_DAYS)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows archived and deleted per transaction')
+        parser.add_argument('--archive-dir', help='Archive directory (defaults to ATTENDANCE_LOG_ARCHIVE_DIR)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be archived')
+
+    def handle(self, *args, **options):
+        if options['older_than'] is not None and options['older_than'] < 0:
+            raise CommandError('--older-than must be zero or positive')
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive')
+
+        cutoff = default_cutoff(options['older_than'])
+        archive_dir = options['archive_dir'] or get_archive_dir()
+        count = archive_attendance_logs(
+            cutoff,
+            chunk_size=options['chunk_size'],
+            archive_dir=archive_dir,
+            dry_run=options['dry_run'],
+        )
+
+        if options['dry_run']:
+            self.stdout.write(f'{count} attendance logs older than {cutoff:%Y-%m-%d %H:%M} would be archived')
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Archived {count} attendance logs older than {cutoff:%Y-%m-%d %H:%M} to {archive_dir}'
+            ))
@@ -0,0 +1,56 @@
+"""
+Management command to compute monthly payroll attendance for all employees
+"""
+import csv
+import sys
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.payroll import PAYROLL_COLUMNS, compute_payroll_parallel, get_late_after
+
+
+class Command(BaseCommand):
+    help = 'Compute per-employee payroll attendance metrics for a month and write them as CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', required=True, help='Month to compute (YYYY-MM)')
+        parser.add_argument('--output', '-o', help='Output CSV path (defaults to stdout)')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Number of processes, each handling a contiguous employee id range')
+        parser.add_argument('--late-after', help='Local check-in time (HH:MM) after which a check-in is late')
+
+    def handle(self, *args, **options):
+        try:
+            month_start = datetime.strptime(options['month'], '%Y-%m')
+        except ValueError:
+            raise CommandError('--month must be in YYYY-MM format')
+
+        late_after = get_late_after()
+        if options['late_after']:
+            try:
+                late_after = datetime.strptime(options['late_after'], '%H:%M').time()
+            except ValueError:
+                raise CommandError('--late-after must be in HH:MM format')
+
+        results = compute_payroll_parallel(
+            month_start.year,
+            month_start.month,
+            workers=options['workers'],
+            late_after=late_after,
+        )
+
+        output = options['output']
+        handle = open(output, 'w', newline='', encoding='utf-8') if output else sys.stdout
+        try:
+            writer = csv.DictWriter(handle, fieldnames=PAYROLL_COLUMNS)
+            writer.writeheader()
+            writer.writerows(results)
+        finally:
+            if output:
+                handle.close()
+
+        if output:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Wrote payroll attendance for {len(results)} employees ({options["month"]}) to {output}'
+            ))
@@ -0,0 +1,96 @@
+"""
+Management command to benchmark live event fan-out to many SSE subscribers
+"""
+import asyncio
+import statistics
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.live_events import LiveEventBus, encode_event, event_stream
+
+
+class Command(BaseCommand):
+    help = 'Measure publish cost and delivery latency of the live event bus with many concurrent subscribers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subscribers', type=int, default=500, help='Concurrent subscribers')
+        parser.add_argument('--events', type=int, default=200, help='Events to publish')
+        parser.add_argument('--interval', type=float, default=0.005,
+                            help='Seconds between published events')
+        parser.add_argument('--queue-size', type=int, default=100, help='Per-subscriber queue size')
+
+    def handle(self, *args, **options):
+        if options['subscribers'] < 1 or options['events'] < 1:
+            raise CommandError('--subscribers and --events must be positive')
+        result = asyncio.run(self._run(**{k: options[k] for k in ('subscribers', 'events', 'interval', 'queue_size')}))
+
+        latencies = sorted(result['latencies'])
+        publish = sorted(result['publish'])
+
+        def pct(values, q):
+            return values[min(int(len(values) * q), len(values) - 1)] * 1e3 if values else 0.0
+
+        self.stdout.write(f"Subscribers: {options['subscribers']}, events: {options['events']}")
+        self.stdout.write(f"Deliveries: {len(latencies)} (dropped {result['dropped']})")
+        self.stdout.write(
+            f'Publish call: mean {statistics.mean(publish) * 1e3:.3f} ms, p99 {pct(publish, 0.99):.3f} ms'
+        )
+        self.stdout.write(
+            f'Delivery latency: p50 {pct(latencies, 0.5):.3f} ms, p99 {pct(latencies, 0.99):.3f} ms, '
+            f'max {pct(latencies, 1):.3f} ms'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {len(latencies) / result['elapsed']:.0f} deliveries/s over {result['elapsed']:.2f}s"
+        ))
+
+    async def _run(self, subscribers, events, interval, queue_size):
+        bus = LiveEventBus()
+        sent_at = {}
+        latencies = []
+        subscriptions = [bus.subscribe(maxsize=queue_size) for _ in range(subscribers)]
+
+        async def consume(subscription):
+            # Read through the same generator the SSE view streams to clients
+            stream = event_stream(subscription, heartbeat=2.0, event_bus=bus)
+            await anext(stream)  # retry hint
+            received = 0
+            try:
+                while received < events:
+                    chunk = await anext(stream)
+                    if chunk.startswith(':'):
+                        return  # heartbeat: the publisher has stopped
+                    now = time.perf_counter()
+                    for frame in chunk.split('\n\n')[:-1]:
+                        latencies.append(now - sent_at[frame + '\n\n'])
+                        received += 1
+            finally:
+                await stream.aclose()
+
+        publish_times = []
+
+        def publisher():
+            # Publishes from a plain thread, like a sync view after commit
+            for i in range(events):
+                started = time.perf_counter()
+                frame_data = {'employee': i, 'name': f'Employee {i}'}
+                sent_at[encode_event('check_in', frame_data)] = started
+                bus.publish('check_in', frame_data)
+                publish_times.append(time.perf_counter() - started)
+                time.sleep(interval)
+
+        started = time.perf_counter()
+        consumers = [asyncio.create_task(consume(subscription)) for subscription in subscriptions]
+        thread = threading.Thread(target=publisher)
+        thread.start()
+        await asyncio.gather(*consumers)
+        await asyncio.to_thread(thread.join)
+        elapsed = time.perf_counter() - started
+
+        return {
+            'latencies': latencies,
+            'publish': publish_times,
+            'dropped': sum(subscription.dropped for subscription in subscriptions),
+            'elapsed': elapsed,
+        }
@@ -0,0 +1,112 @@
+"""
+Management command to move the existing media tree into de-duplicated blob storage
+"""
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from employees.models import MediaBlob, StoredFile
+from employees.storage import BLOB_DIR, DedupFileSystemStorage, hash_file
+
+
+def legacy_files(root):
+    """Storage names of the plain files under ``root``, skipping the blob store."""
+    for directory, subdirectories, files in os.walk(root):
+        if directory == root and BLOB_DIR in subdirectories:
+            subdirectories.remove(BLOB_DIR)
+        for filename in files:
+            yield os.path.relpath(os.path.join(directory, filename), root).replace(os.sep, '/')
+
+
+def _hash(args):
+    name, path = args
+    sha256, size = hash_file(path)
+    return name, sha256, size
+
+
+class Command(BaseCommand):
+    help = 'Hash the media tree in parallel, store each distinct file once and report the bytes saved (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='Hashing threads')
+        parser.add_argument('--batch-size', type=int, default=200, help='Files imported per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only hash and report potential savings')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+        storage = default_storage
+        if not isinstance(storage, DedupFileSystemStorage):
+            raise CommandError('The default storage is not employees.storage.DedupFileSystemStorage')
+
+        root = str(storage.location)
+        started = time.monotonic()
+        mapped = set(StoredFile.objects.values_list('name', flat=True))
+        pending, leftovers = [], 0
+        for name in legacy_files(root):
+            if name in mapped:
+                # Imported by an earlier run that stopped before removing the original
+                if not options['dry_run']:
+                    os.remove(os.path.join(root, name))
+                leftovers += 1
+            else:
+                pending.append((name, os.path.join(root, name)))
+        self.stdout.write(f'{len(pending)} files to import ({leftovers} leftovers from an earlier run)')
+
+        known = set(MediaBlob.objects.values_list('sha256', flat=True))
+        totals = {'files': 0, 'duplicates': 0, 'bytes': 0, 'saved': 0}
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            batch = []
+            for result in pool.map(_hash, pending):
+                batch.append(result)
+                if len(batch) >= options['batch_size']:
+                    self._import(storage, root, batch, known, totals, options['dry_run'])
+                    batch = []
+            self._import(storage, root, batch, known, totals, options['dry_run'])
+
+        elapsed = time.monotonic() - started
+        verb = 'Would save' if options['dry_run'] else 'Saved'
+        self.stdout.write(
+            f"{totals['files']} files, {totals['bytes'] / 1e6:.1f} MB, "
+            f"{totals['duplicates']} duplicates; {len(known)} distinct blobs"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ {verb} {totals['saved'] / 1e6:.2f} MB "
+            f"({100 * totals['saved'] / max(totals['bytes'], 1):.1f}%) in {elapsed:.1f}s"
+        ))
+
+    def _import(self, storage, root, batch, known, totals, dry_run):
+        imported = []
+        for name, sha256, size in batch:
+            totals['files'] += 1
+            totals['bytes'] += size
+            duplicate = sha256 in known
+            known.add(sha256)
+            if duplicate:
+                totals['duplicates'] += 1
+                totals['saved'] += size
+            if dry_run:
+                continue
+
+            path = os.path.join(root, name)
+            with transaction.atomic():
+                target = storage.blob_path(sha256)
+                if not os.path.exists(target):
+                    # Link (or copy) first; the original is only removed once the mapping commits
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    try:
+                        os.link(path, target)
+                    except OSError:
+                        shutil.copy2(path, target)
+                    # Fresh mtime: gc_media must not take it for an unreferenced blob before the commit
+                    os.utime(target)
+                storage.add_blob_reference(name, sha256, size, original_name=os.path.basename(name))
+            imported.append(path)
+
+        for path in imported:
+            os.remove(path)
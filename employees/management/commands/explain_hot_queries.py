@@ -0,0 +1,132 @@
+"""
+Management command to print query plans for the hot Attendance queries
+
+The scaled dataset is generated in a throwaway database built like the test
+database (``test_<name>``; in memory on SQLite) and dropped afterwards, so
+the configured database is never written or locked.
+"""
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from employees.models import Attendance, Employee
+
+
+def hot_queries(today):
+    """
+    (label, queryset) pairs mirroring the Attendance query shapes used in views.py.
+
+    Count queries are expressed as unordered ``values()`` over the filtered
+    columns, which is what ``.count()`` / ``.distinct().count()`` compile to.
+    """
+    month_ago = today - timedelta(days=30)
+    some_employee = Employee.objects.order_by('id').values_list('id', flat=True).first() or 0
+    return [
+        ("today's check-ins (count)",
+         Attendance.objects.filter(date=today).order_by().values('date')),
+        ("today's check-outs (count)",
+         Attendance.objects.filter(date=today, check_out_time__isnull=False).order_by().values('check_out_time')),
+        ('unique employees today',
+         Attendance.objects.filter(date=today).order_by().values('employee').distinct()),
+        ('monthly check-ins (count)',
+         Attendance.objects.filter(date__gte=month_ago).order_by().values('date')),
+        ('present / half days in range (count)',
+         Attendance.objects.filter(date__gte=month_ago, date__lte=today,
+                                   check_out_time__isnull=False, half_day=False).order_by().values('half_day')),
+        ("today's attendance, newest first",
+         Attendance.objects.filter(date=today).order_by('-check_in_time')[:10]),
+        ('open rows today (not checked out)',
+         Attendance.objects.filter(date=today, check_out_time__isnull=True).order_by().values('employee')),
+        ('attendance list page',
+         Attendance.objects.order_by('-check_in_time', '-id')[:21]),
+        ('employee history page',
+         Attendance.objects.filter(employee_id=some_employee).order_by('-check_in_time', '-id')[:21]),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print the database query plan for each hot Attendance query, optionally against a scaled dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=500,
+                            help='Employees to generate for the scaled dataset')
+        parser.add_argument('--days', type=int, default=180,
+                            help='Days of attendance to generate per employee')
+        parser.add_argument('--no-seed', action='store_true',
+                            help='Explain against the existing data (read only) instead of a generated dataset')
+
+    def handle(self, *args, **options):
+        if options['employees'] < 1 or options['days'] < 1:
+            raise CommandError('--employees and --days must be positive')
+
+        today = timezone.now().date()
+        if options['no_seed']:
+            self._explain(today)
+            return
+
+        old_name = connection.settings_dict['NAME']
+        self.stdout.write('Creating a scratch database...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._seed(options['employees'], options['days'], today)
+            self._explain(today)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        self.stdout.write(self.style.SUCCESS('✓ Scratch database dropped'))
+
+    def _seed(self, n_employees, n_days, today):
+        self.stdout.write(f'Generating {n_employees} employees x {n_days} days of attendance...')
+        users = User.objects.bulk_create([
+            User(username=f'explain-{i}', email=f'explain-{i}@example.com') for i in range(n_employees)
+        ])
+        employees = Employee.objects.bulk_create([
+            Employee(
+                name=f'Explain {i}', full_name=f'Explain Employee {i}', contact='9999999999',
+                email=f'explain-{i}@example.com', aadhar_card_number='000000000000',
+                account_number='000000000', ifsc_code='ABCD0000000', pan_card='ABCDE0000F',
+                current_address='-', permanent_address='-', relative_name='-',
+                relative_contact='9999999999', relation_with_employee='-', user=user,
+            )
+            for i, user in enumerate(users)
+        ])
+
+        rng = random.Random(0)
+        batch = []
+        for offset in range(n_days):
+            day = today - timedelta(days=offset)
+            start = timezone.make_aware(datetime.combine(day, time.min))
+            for employee in employees:
+                if rng.random() < 0.15:
+                    continue
+                check_in = start + timedelta(hours=9, minutes=rng.randint(0, 90))
+                check_out = None if offset == 0 and rng.random() < 0.5 else check_in + timedelta(hours=rng.choice([4, 8, 9]))
+                batch.append(Attendance(
+                    employee=employee, date=day, check_in_time=check_in, check_out_time=check_out,
+                    half_day=bool(check_out and check_out - check_in < timedelta(hours=4.5)),
+                ))
+                if len(batch) >= 5000:
+                    self._insert(batch)
+                    batch = []
+        self._insert(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _insert(self, batch):
+        # check_in_time is auto_now_add, so bulk_create stamps every row with now()
+        check_ins = [attendance.check_in_time for attendance in batch]
+        Attendance.objects.bulk_create(batch)
+        for attendance, check_in in zip(batch, check_ins):
+            attendance.check_in_time = check_in
+        Attendance.objects.bulk_update(batch, ['check_in_time'], batch_size=1000)
+
+    def _explain(self, today):
+        self.stdout.write(f'Database backend: {connection.vendor}, {Attendance.objects.count()} attendance rows\n')
+        for label, queryset in hot_queries(today):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(queryset.explain())
+            self.stdout.write('')
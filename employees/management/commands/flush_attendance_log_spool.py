@@ -0,0 +1,29 @@
+"""
+Management command to replay attendance log spool segments left by crashed workers
+and, on request, the quarantined entries
+"""
+from django.core.management.base import BaseCommand
+
+from employees.attendance_logger import get_spool_dir, replay_orphaned_segments, replay_quarantine
+
+
+class Command(BaseCommand):
+    help = 'Write attendance log entries left in the local spool by workers that exited before flushing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--spool-dir', help='Spool directory (defaults to ATTENDANCE_LOG_SPOOL_DIR)')
+        parser.add_argument('--include-live', action='store_true',
+                            help='Also replay segments of processes that still appear to be running '
+                                 '(only use when the app servers are stopped; ignored where segments are locked)')
+        parser.add_argument('--quarantine', action='store_true',
+                            help='Also retry the entries quarantined after repeated write failures')
+
+    def handle(self, *args, **options):
+        spool_dir = options['spool_dir'] or get_spool_dir()
+        segments, records = replay_orphaned_segments(spool_dir, include_live=options['include_live'])
+        if options['quarantine']:
+            written, remaining = replay_quarantine(spool_dir)
+            self.stdout.write(f'Quarantine: {written} entries written, {remaining} still refused')
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Replayed {records} attendance log entries from {segments} spool segments in {spool_dir}'
+        ))
@@ -0,0 +1,197 @@
+"""
+Management command to find and delete media files no database row refers to,
+and resized variants (MEDIA_THUMB_CACHE_DIR) that have not been served for a while
+"""
+import os
+import posixpath
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import partial
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models
+from django.utils import timezone
+
+from employees.image_resize import get_cache_dir, get_max_age_days
+from employees.models import MediaBlob, StoredFile
+from employees.storage import BLOB_DIR
+
+CHUNK_SIZE = 5000
+THUMBS_DIR = 'thumbs'
+
+
+def file_fields():
+    """(model, field name) for every FileField / ImageField in the project."""
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, models.FileField):
+                yield model, field.name
+
+
+def referenced_names():
+    """Stream every non-empty file name stored in a file field, chunk by chunk."""
+    for model, field in file_fields():
+        queryset = model._default_manager.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+        yield from queryset.order_by().values_list(field, flat=True).iterator(chunk_size=CHUNK_SIZE)
+
+
+def thumbnail_key(name):
+    """Key shared by a photo and its thumbnails: directory + stem."""
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, posixpath.splitext(filename)[0])
+
+
+def thumbnail_source_key(name):
+    """For ``<dir>/thumbs/<size>/<stem>.jpg`` return the key of its photo, else None."""
+    parts = name.split('/')
+    if len(parts) >= 3 and parts[-3] == THUMBS_DIR:
+        return thumbnail_key('/'.join(parts[:-3] + [parts[-1]]))
+    return None
+
+
+def scan_files(root, skip=()):
+    """Yield (storage name, DirEntry) for every file under ``root``, depth first, via os.scandir."""
+    stack = ['']
+    while stack:
+        relative = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, relative)) as entries:
+                for entry in entries:
+                    name = posixpath.join(relative, entry.name) if relative else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if name not in skip:
+                            stack.append(name)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield name, entry
+        except FileNotFoundError:
+            continue
+
+
+def _remove(path, size):
+    os.remove(path)
+    return size
+
+
+def _delete_mapped(name, sha256, size):
+    default_storage.delete(name)
+    # Only the last reference to a blob frees its bytes
+    return 0 if MediaBlob.objects.filter(pk=sha256).exists() else size
+
+
+class Command(BaseCommand):
+    help = 'Report or delete media files (and de-duplicated blobs) that no database row refers to'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=24,
+                            help='Leave files younger than this alone (uploads may not be linked yet)')
+        parser.add_argument('--thumb-days', type=float, default=None,
+                            help='Delete resized variants not served for this many days '
+                                 '(defaults to MEDIA_THUMB_MAX_AGE_DAYS)')
+        parser.add_argument('--dry-run', action='store_true', help='Report orphans without deleting them')
+
+    def handle(self, *args, **options):
+        if options['grace_hours'] < 0:
+            raise CommandError('--grace-hours must not be negative')
+        thumb_days = get_max_age_days() if options['thumb_days'] is None else options['thumb_days']
+        if thumb_days < 0:
+            raise CommandError('--thumb-days must not be negative')
+        started = time.monotonic()
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        self.stats = {'scanned': 0, 'orphans': 0, 'bytes': 0}
+
+        names, keys = set(), set()
+        for name in referenced_names():
+            names.add(name)
+            keys.add(thumbnail_key(name))
+        self.stdout.write(f'{len(names)} referenced files')
+
+        self._collect_plain_files(str(default_storage.location), names, keys)
+        self._collect_mapped_files(names, keys)
+        self._collect_blobs(str(default_storage.location))
+        self._collect_thumb_variants(get_cache_dir(), time.time() - thumb_days * 86400)
+
+        verb = 'Would reclaim' if self.dry_run else 'Reclaimed'
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Scanned {self.stats['scanned']} entries, {self.stats['orphans']} orphans; "
+            f"{verb} {self.stats['bytes'] / 1e6:.2f} MB in {time.monotonic() - started:.1f}s"
+        ))
+
+    def _is_referenced(self, name, names, keys):
+        if name in names:
+            return True
+        source = thumbnail_source_key(name)
+        return source is not None and source in keys
+
+    def _orphan(self, label, size, delete):
+        self.stats['orphans'] += 1
+        if self.verbosity >= 2:
+            self.stdout.write(f'  orphan: {label} ({size} bytes)')
+        if not self.dry_run:
+            size = delete()
+        self.stats['bytes'] += size
+
+    def _collect_plain_files(self, root, names, keys):
+        """Files stored directly under MEDIA_ROOT (not yet de-duplicated)."""
+        cutoff = self.cutoff.timestamp()
+        for name, entry in scan_files(root, skip={BLOB_DIR}):
+            self.stats['scanned'] += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime >= cutoff or self._is_referenced(name, names, keys):
+                continue
+            self._orphan(name, stat.st_size, partial(_remove, entry.path, stat.st_size))
+
+    def _collect_mapped_files(self, names, keys):
+        """Names in the de-duplicated store; deleting one frees its blob with the last reference."""
+        mapped = StoredFile.objects.filter(created_at__lt=self.cutoff).order_by().values_list(
+            'name', 'blob_id', 'blob__size', 'blob__ref_count'
+        )
+        orphans = []
+        for name, sha256, size, ref_count in mapped.iterator(chunk_size=CHUNK_SIZE):
+            self.stats['scanned'] += 1
+            if not self._is_referenced(name, names, keys):
+                orphans.append((name, sha256, size, ref_count))
+        # Deleted after the scan so the iterator never reads its own changes. A
+        # blob's bytes are freed with its last reference, so only count those
+        orphan_refs = Counter(sha256 for _, sha256, _, _ in orphans)
+        remaining = orphan_refs.copy()
+        for name, sha256, size, ref_count in orphans:
+            remaining[sha256] -= 1
+            frees = remaining[sha256] == 0 and orphan_refs[sha256] >= ref_count
+            self._orphan(name, size if frees else 0, partial(_delete_mapped, name, sha256, size))
+
+    def _collect_blobs(self, root):
+        """Blob files without a MediaBlob row (writes that rolled back) and stale temp files."""
+        cutoff = self.cutoff.timestamp()
+        batch = []
+        for name, entry in scan_files(os.path.join(root, BLOB_DIR)):
+            self.stats['scanned'] += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime >= cutoff:
+                continue
+            if name.startswith('tmp/'):
+                self._orphan(f'{BLOB_DIR}/{name}', stat.st_size, partial(_remove, entry.path, stat.st_size))
+                continue
+            batch.append((entry.name, name, entry.path, stat.st_size))
+            if len(batch) >= CHUNK_SIZE:
+                self._delete_unknown_blobs(batch)
+                batch = []
+        self._delete_unknown_blobs(batch)
+
+    def _collect_thumb_variants(self, root, cutoff):
+        """Resized variants (and leftover temp files) not served since ``cutoff``; see image_resize."""
+        for name, entry in scan_files(root):
+            self.stats['scanned'] += 1
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < cutoff:
+                self._orphan(f'thumb cache/{name}', stat.st_size, partial(_remove, entry.path, stat.st_size))
+
+    def _delete_unknown_blobs(self, batch):
+        known = set(MediaBlob.objects.filter(pk__in=[item[0] for item in batch]).values_list('pk', flat=True))
+        for sha256, name, path, size in batch:
+            if sha256 not in known:
+                self._orphan(f'{BLOB_DIR}/{name}', size, partial(_remove, path, size))
@@ -0,0 +1,104 @@
+"""
+Management command to audit check-in/check-out coordinates for outliers,
+impossible travel and coordinates shared between employees
+"""
+import csv
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from employees.location_audit import audit_locations
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        raise CommandError(f'{option} must be in YYYY-MM-DD format')
+
+
+class Command(BaseCommand):
+    help = 'Flag suspicious attendance coordinates with vectorized distance checks against every office'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', help='First attendance date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', help='Last attendance date (YYYY-MM-DD)')
+        parser.add_argument('--outlier-meters', type=float, default=100,
+                            help='Flag points this far outside the closest office area')
+        parser.add_argument('--max-speed', type=float, default=200,
+                            help='Flag check-in to check-out travel faster than this (km/h)')
+        parser.add_argument('--min-travel', type=float, default=1000,
+                            help='Ignore check-in to check-out distances below this (metres, GPS noise)')
+        parser.add_argument('--min-employees', type=int, default=2,
+                            help='Flag identical coordinates reported by this many employees')
+        parser.add_argument('--chunk-size', type=int, help='Attendance rows loaded per query')
+        parser.add_argument('--limit', type=int, default=20, help='Flagged entries listed per check')
+        parser.add_argument('--output', '-o', help='Also write the listed entries to this CSV file')
+
+    def handle(self, *args, **options):
+        if options['min_employees'] < 2 or options['limit'] < 0 or (options['chunk_size'] or 1) < 1:
+            raise CommandError('--min-employees must be at least 2; --limit and --chunk-size must be positive')
+
+        report = audit_locations(
+            start=_parse_date(options['date_from'], '--from'),
+            end=_parse_date(options['date_to'], '--to'),
+            outlier_meters=options['outlier_meters'],
+            max_speed_kmh=options['max_speed'],
+            min_travel_meters=options['min_travel'],
+            min_employees=options['min_employees'],
+            chunk_size=options['chunk_size'],
+            limit=options['limit'],
+        )
+        rows = self._rows(report)
+
+        self.stdout.write(f'{report.rows} attendance rows, {report.points} coordinates')
+        for kind, title, count in (
+            ('outlier', 'Outside office area', report.outlier_count),
+            ('impossible_travel', 'Impossible travel', report.travel_count),
+            ('shared_coordinates', 'Shared coordinates', report.shared_count),
+        ):
+            self.stdout.write(f'\n{title}: {count}')
+            for row in rows:
+                if row['check'] == kind:
+                    self.stdout.write(f"  {row['date']}  {row['employee']:<24} {row['detail']}")
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                writer = csv.DictWriter(handle, fieldnames=['check', 'attendance_id', 'date', 'employee', 'detail'])
+                writer.writeheader()
+                writer.writerows(rows)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✓ Audited {report.rows} rows in {report.seconds:.2f}s: {report.outlier_count} outliers, '
+            f'{report.travel_count} impossible trips, {report.shared_count} shared coordinates'
+        ))
+
+    def _rows(self, report):
+        rows = []
+        for item in report.outliers:
+            attendance = item['attendance']
+            rows.append({
+                'check': 'outlier',
+                'attendance_id': attendance.pk if attendance else '',
+                'date': attendance.date if attendance else '',
+                'employee': attendance.employee.name if attendance else '',
+                'detail': f"{item['kind']} {item['meters_outside']:.0f}m outside {item['office']}",
+            })
+        for item in report.impossible_travel:
+            attendance = item['attendance']
+            rows.append({
+                'check': 'impossible_travel',
+                'attendance_id': attendance.pk if attendance else '',
+                'date': attendance.date if attendance else '',
+                'employee': attendance.employee.name if attendance else '',
+                'detail': f"{item['distance_meters'] / 1000:.1f} km at {item['speed_kmh']:.0f} km/h",
+            })
+        for item in report.shared_coordinates:
+            rows.append({
+                'check': 'shared_coordinates',
+                'attendance_id': '',
+                'date': '',
+                'employee': f"{item['employee_count']} employees",
+                'detail': f"{item['latitude']:.7f}, {item['longitude']:.7f}: {', '.join(item['employees'])}",
+            })
+        return rows
@@ -0,0 +1,105 @@
+"""
+Management command to recompress stored photos and backfill their thumbnails
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+
+from employees.models import Attendance, Employee
+from employees.photo_pipeline import delete_thumbnails, process_stored_photo, thumbnail_name
+
+PHOTO_FIELDS = {
+    'check_in_photo': Attendance,
+    'check_out_photo': Attendance,
+    'profile_picture': Employee,
+}
+
+
+def _process(args):
+    name, recompress, force = args
+    try:
+        return process_stored_photo(name, recompress=recompress, force=force)
+    except Exception as exc:
+        return {'name': name, 'error': str(exc)}
+
+
+class Command(BaseCommand):
+    help = 'Recompress oversized photos and generate missing thumbnails, in parallel'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field', action='append', choices=sorted(PHOTO_FIELDS),
+                            help='Photo field to process (repeatable; default: all)')
+        parser.add_argument('--workers', type=int, default=4, help='Worker processes')
+        parser.add_argument('--batch-size', type=int, default=200,
+                            help='Photos handed to the pool per batch')
+        parser.add_argument('--no-recompress', action='store_true',
+                            help='Only write missing thumbnails; leave originals untouched')
+        parser.add_argument('--force', action='store_true',
+                            help='Rewrite thumbnails and recompress every original')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--workers and --batch-size must be positive')
+
+        totals = {'photos': 0, 'recompressed': 0, 'thumbnails': 0, 'errors': 0, 'before': 0, 'after': 0}
+        started = time.monotonic()
+        # Forked workers only touch storage; don't hand them open connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+            for field in options['field'] or sorted(PHOTO_FIELDS):
+                self._process_field(pool, field, options, totals)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"Recompressed {totals['recompressed']} originals "
+            f"({totals['before'] / 1e6:.1f} MB -> {totals['after'] / 1e6:.1f} MB), "
+            f"wrote {totals['thumbnails']} thumbnails, {totals['errors']} errors"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Processed {totals['photos']} photos in {elapsed:.1f}s "
+            f"({totals['photos'] / max(elapsed, 1e-9):.1f}/s)"
+        ))
+
+    def _process_field(self, pool, field, options, totals):
+        model = PHOTO_FIELDS[field]
+        names = list(
+            model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            .order_by().values_list(field, flat=True).distinct()
+        )
+        self.stdout.write(f'{field}: {len(names)} photos')
+        recompress, force = not options['no_recompress'], options['force']
+        batch_size = options['batch_size']
+
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            renamed = {}
+            for result in pool.map(_process, [(name, recompress, force) for name in batch], chunksize=8):
+                totals['photos'] += 1
+                if 'error' in result:
+                    totals['errors'] += 1
+                    self.stderr.write(f"  {result['name']}: {result['error']}")
+                    continue
+                totals['thumbnails'] += result['thumbnails']
+                if result['new_name']:
+                    renamed[result['name']] = result['new_name']
+                    totals['recompressed'] += 1
+                    totals['before'] += result['bytes_before']
+                    totals['after'] += result['bytes_after']
+            if renamed:
+                self._apply_renames(model, field, renamed)
+
+    def _apply_renames(self, model, field, renamed):
+        """Point rows at the recompressed files, then delete the old ones."""
+        with transaction.atomic():
+            rows = list(model.objects.filter(**{f'{field}__in': list(renamed)}).only('pk', field))
+            for row in rows:
+                setattr(row, field, renamed[getattr(row, field).name])
+            model.objects.bulk_update(rows, [field], batch_size=500)
+        for old_name, new_name in renamed.items():
+            default_storage.delete(old_name)
+            # x.png -> x.jpg keeps the same thumbnail names, already rewritten
+            if thumbnail_name(old_name, 'small') != thumbnail_name(new_name, 'small'):
+                delete_thumbnails(old_name)
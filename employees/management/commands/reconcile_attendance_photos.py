@@ -0,0 +1,89 @@
+"""
+Management command to settle attendance photos whose background write never finished
+"""
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from employees.models import Attendance
+from employees.photo_pipeline import process_stored_photo
+from employees.photo_writer import PHOTO_KINDS, pending_field, photo_name
+
+# photo field -> timestamp the photo was taken at
+PHOTO_TIMES = {
+    'check_in_photo': 'check_in_time',
+    'check_out_photo': 'check_out_time',
+}
+
+
+def find_written_photo(attendance, field):
+    """
+    Newest stored file named for this attendance row's photo, or None.
+
+    The writer names photos ``<kind>_<id>.jpg``; storage may have appended a
+    suffix if that name was taken.
+    """
+    expected = getattr(attendance, field).field.generate_filename(attendance, photo_name(field, attendance.pk))
+    directory, filename = posixpath.split(expected)
+    stem = posixpath.splitext(filename)[0]
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return None
+    candidates = [
+        posixpath.join(directory, name) for name in files
+        if name == filename or (name.startswith(f'{stem}_') and name.endswith('.jpg'))
+    ]
+    if not candidates:
+        return None
+    return max(candidates, key=default_storage.get_modified_time)
+
+
+class Command(BaseCommand):
+    help = 'Link or clear attendance photos still marked pending after the background writer should have finished'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=10,
+                            help='Only touch rows pending for at least this many minutes')
+        parser.add_argument('--batch-size', type=int, default=500, help='Rows updated per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Report without changing anything')
+
+    def handle(self, *args, **options):
+        if options['older_than'] < 0 or options['batch_size'] < 1:
+            raise CommandError('--older-than must be >= 0 and --batch-size positive')
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+
+        for field in PHOTO_KINDS:
+            flag = pending_field(field)
+            rows = list(
+                Attendance.objects.filter(**{flag: True, f'{PHOTO_TIMES[field]}__lt': cutoff})
+                .only('id', 'employee_id', 'date', field, flag)
+            )
+            linked = lost = 0
+            for row in rows:
+                name = find_written_photo(row, field)
+                if name:
+                    linked += 1
+                    if not options['dry_run']:
+                        # The writer may have died before the thumbnails
+                        process_stored_photo(name, recompress=False)
+                        setattr(row, field, name)
+                else:
+                    lost += 1
+                setattr(row, flag, False)
+
+            if not options['dry_run']:
+                for start in range(0, len(rows), options['batch_size']):
+                    with transaction.atomic():
+                        Attendance.objects.bulk_update(
+                            rows[start:start + options['batch_size']], [field, flag]
+                        )
+
+            verb = 'would link' if options['dry_run'] else 'linked'
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {field}: {len(rows)} pending, {verb} {linked} stored files, {lost} photos lost'
+            ))
@@ -0,0 +1,123 @@
+"""
+Management command to run background task workers
+"""
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from employees.task_queue import TaskStats, default_worker_id, work
+
+
+def _run_threads(process_index, options, stop_event, stats, report):
+    """Run ``--threads`` worker loops in this process until stopped or drained."""
+    threads = []
+    for index in range(options['threads']):
+        worker_id = default_worker_id(f'{process_index}.{index}')
+        thread = threading.Thread(
+            target=work,
+            name=f'task-worker-{process_index}.{index}',
+            args=(worker_id, stop_event, stats),
+            kwargs={
+                'batch_size': options['batch'],
+                'poll_interval': options['poll_interval'],
+                'lease_seconds': options['lease'],
+                'max_tasks': options['max_tasks'],
+            },
+            daemon=True,
+        )
+        thread.start()
+        threads.append(thread)
+
+    while any(thread.is_alive() for thread in threads):
+        stopped = stop_event.wait(options['report_every'] or 1.0)
+        if options['report_every'] and not stopped:
+            report(stats)
+    for thread in threads:
+        thread.join()
+
+
+def _process_main(process_index, options, results):
+    stop_event = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *args: stop_event.set())
+    stats = TaskStats()
+    _run_threads(process_index, options, stop_event, stats, report=lambda stats: None)
+    results.put(stats.by_name)
+
+
+class Command(BaseCommand):
+    help = 'Run background task workers with retries, and report per-task latency and throughput'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=2, help='Worker threads per process')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+        parser.add_argument('--batch', type=int, default=10, help='Tasks claimed per poll')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--lease', type=int, default=300,
+                            help='Seconds a claimed task stays locked before another worker may retry it')
+        parser.add_argument('--max-tasks', type=int, default=None,
+                            help='Stop each worker after this many tasks (or when the queue is empty)')
+        parser.add_argument('--once', action='store_true',
+                            help='Drain the runnable tasks and exit')
+        parser.add_argument('--report-every', type=float, default=60.0,
+                            help='Seconds between throughput reports (0 to report only on exit)')
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['processes'] < 1 or options['batch'] < 1:
+            raise CommandError('--threads, --processes and --batch must be positive')
+        if options['once'] and options['max_tasks'] is None:
+            # Workers stop once a poll comes back empty
+            options['max_tasks'] = float('inf')
+
+        self.stdout.write(
+            f"Starting {options['processes']} process(es) x {options['threads']} thread(s); Ctrl+C to stop"
+        )
+        stats = TaskStats()
+        stop_event = threading.Event()
+
+        if options['processes'] == 1:
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *args: stop_event.set())
+            _run_threads(0, options, stop_event, stats, report=self._report)
+        else:
+            self._run_processes(options, stats)
+
+        self._report(stats)
+        self.stdout.write(self.style.SUCCESS('✓ Workers stopped'))
+
+    def _run_processes(self, options, stats):
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=_process_main, args=(index, options, results), name=f'task-worker-{index}')
+            for index in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for _ in processes:
+                stats.merge(results.get())
+        except KeyboardInterrupt:
+            # Children received the same SIGINT; collect what they report
+            for _ in processes:
+                stats.merge(results.get())
+        for process in processes:
+            process.join()
+
+    def _report(self, stats):
+        rows = stats.report()
+        if not rows:
+            self.stdout.write('No tasks processed')
+            return
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{'task':<32} {'ok':>6} {'failed':>6} {'tasks/s':>8} {'queue s':>9} {'run ms':>9} {'p95 ms':>9}"
+        ))
+        for name, ok, failed, rate, queued, mean_run, p95_run in rows:
+            self.stdout.write(
+                f'{name:<32} {ok:>6} {failed:>6} {rate:>8.2f} {queued:>9.2f} {mean_run:>9.1f} {p95_run:>9.1f}'
+            )
@@ -0,0 +1,116 @@
+"""
+Management command to move photos from the flat media directories into the
+date/employee sharded layout
+"""
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from employees.media_paths import (
+    CHECKIN_PREFIX, CHECKOUT_PREFIX, PROFILE_PREFIX, is_sharded, sharded_name,
+)
+from employees.models import Attendance, Employee
+from employees.photo_pipeline import get_thumbnail_sizes, thumbnail_name
+
+
+def _attendance_target(prefix):
+    return lambda row, name: sharded_name(prefix, row.employee_id, row.date, name)
+
+
+def _profile_target(row, name):
+    uploaded = row.face_registered_at or row.created_at
+    return sharded_name(PROFILE_PREFIX, row.pk, uploaded.date(), name)
+
+
+# field -> (model, extra columns needed for the target path, target function)
+SHARDED_FIELDS = {
+    'check_in_photo': (Attendance, ('employee_id', 'date'), _attendance_target(CHECKIN_PREFIX)),
+    'check_out_photo': (Attendance, ('employee_id', 'date'), _attendance_target(CHECKOUT_PREFIX)),
+    'profile_picture': (Employee, ('face_registered_at', 'created_at'), _profile_target),
+}
+
+
+def move_file(storage, old_name, new_name):
+    """
+    Move a stored file, resuming cleanly if it was already moved.
+
+    Returns:
+        the name the file now has, or None if it exists under neither name
+    """
+    old_exists = storage.exists(old_name)
+    if not old_exists:
+        return new_name if storage.exists(new_name) else None
+    if hasattr(storage, 'rename'):
+        # De-duplicating storage: only the name mapping moves
+        return storage.rename(old_name, new_name)
+    if storage.exists(new_name):
+        new_name = storage.get_available_name(new_name)
+
+    try:
+        old_path, new_path = storage.path(old_name), storage.path(new_name)
+    except NotImplementedError:
+        # Remote storage: copy, then delete
+        with storage.open(old_name, 'rb') as handle:
+            new_name = storage.save(new_name, handle)
+        storage.delete(old_name)
+    else:
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        os.replace(old_path, new_path)
+    return new_name
+
+
+class Command(BaseCommand):
+    help = 'Move photos into YYYY/MM/DD/<employee hash> directories and rewrite the file fields (resumable)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--field', action='append', choices=sorted(SHARDED_FIELDS),
+                            help='Photo field to migrate (repeatable; default: all)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows moved and updated per transaction')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report how many files would move without changing anything')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        for field in options['field'] or sorted(SHARDED_FIELDS):
+            moved, missing = self._migrate_field(field, options['batch_size'], options['dry_run'])
+            verb = 'would move' if options['dry_run'] else 'moved'
+            self.stdout.write(self.style.SUCCESS(f'✓ {field}: {verb} {moved} files, {missing} missing on disk'))
+
+    def _migrate_field(self, field, batch_size, dry_run):
+        model, columns, target = SHARDED_FIELDS[field]
+        pending = (
+            model.objects.exclude(**{f'{field}__isnull': True}).exclude(**{field: ''})
+            .only('pk', field, *columns).order_by('pk')
+        )
+        moved = missing = 0
+        last_pk = 0
+        while True:
+            # Rows already in the sharded layout are skipped, so a rerun resumes
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return moved, missing
+            last_pk = batch[-1].pk
+            rows = [row for row in batch if not is_sharded(getattr(row, field).name)]
+            if dry_run:
+                moved += len(rows)
+                continue
+
+            changed = []
+            for row in rows:
+                old_name = getattr(row, field).name
+                new_name = move_file(default_storage, old_name, target(row, old_name))
+                if new_name is None:
+                    missing += 1
+                    continue
+                for size in get_thumbnail_sizes():
+                    move_file(default_storage, thumbnail_name(old_name, size), thumbnail_name(new_name, size))
+                setattr(row, field, new_name)
+                changed.append(row)
+            with transaction.atomic():
+                model.objects.bulk_update(changed, [field], batch_size=batch_size)
+            moved += len(changed)
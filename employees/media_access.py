@@ -0,0 +1,167 @@
+"""
+Permission checks and responses for protected media.
+
+Every ``/media/...`` request goes through ``employees.views.protected_media``:
+the file must belong to the requesting employee (their photos, profile
+picture and ticket attachments) or the user must be a superadmin. The
+transfer itself is handed to nginx with ``X-Accel-Redirect`` when
+``MEDIA_ACCEL_REDIRECT`` names the internal location (see
+``nginx/web-project-django.conf``); otherwise Django streams the file,
+honouring single byte ranges.
+
+Responses are cached privately and revalidated on every use: URLs are
+storage names, and a name can be given new content (``process_photos
+--force`` rewrites thumbnails in place). De-duplicated files carry their
+blob SHA-256 as ``ETag``, so revalidation costs one lookup and a 304.
+"""
+import mimetypes
+import posixpath
+import re
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.http import content_disposition_header
+
+from .models import Attendance, Employee, StoredFile, Ticket
+from .storage import blob_name
+
+REVALIDATE_CACHE = 'private, no-cache'
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+# Storage prefix -> (model, field, path to the owning user id)
+OWNED_PREFIXES = {
+    'checkin_photos': (Attendance, 'check_in_photo', 'employee__user_id'),
+    'checkout_photos': (Attendance, 'check_out_photo', 'employee__user_id'),
+    'profile_pics': (Employee, 'profile_picture', 'user_id'),
+    'ticket_attachments': (Ticket, 'attachment', 'employee__user_id'),
+}
+
+
+def _source_lookup(field, name):
+    """Filter matching the row that stores ``name``, or the photo a thumbnail was made from."""
+    parts = name.split('/')
+    if len(parts) >= 4 and parts[-3] == 'thumbs':
+        stem = posixpath.splitext(parts[-1])[0]
+        return {f'{field}__startswith': '/'.join(parts[:-3] + [f'{stem}.'])}
+    return {field: name}
+
+
+def owner_user_id(name):
+    """
+    User id that owns the media file ``name``.
+
+    Returns:
+        user id, or None if no row refers to the file
+    """
+    prefix = name.split('/', 1)[0]
+    if prefix not in OWNED_PREFIXES:
+        return None
+    model, field, owner = OWNED_PREFIXES[prefix]
+    return model.objects.filter(**_source_lookup(field, name)).values_list(owner, flat=True).first()
+
+
+def can_access(user, name):
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    return owner_user_id(name) == user.pk
+
+
+def get_accel_prefix():
+    return getattr(settings, 'MEDIA_ACCEL_REDIRECT', '')
+
+
+def media_response(request, name):
+    """
+    Response sending the media file ``name`` (already permission checked).
+
+    Returns:
+        HttpResponse, or None if the file does not exist
+    """
+    mapping = StoredFile.objects.select_related('blob').filter(name=name).first()
+    if mapping is None and not default_storage.exists(name):
+        return None
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    if mapping is not None:
+        etag = f'"{mapping.blob_id}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            response['Cache-Control'] = REVALIDATE_CACHE
+            return response
+        stored_name, filename = blob_name(mapping.blob_id), mapping.original_name
+    else:
+        etag, stored_name, filename = None, name, posixpath.basename(name)
+
+    accel_prefix = get_accel_prefix()
+    if accel_prefix:
+        # nginx serves the file (ranges, sendfile); these headers are kept
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{stored_name}"
+    else:
+        response = _stream(request, name, content_type)
+    response['Cache-Control'] = REVALIDATE_CACHE
+    response['Content-Disposition'] = content_disposition_header(False, filename or posixpath.basename(name))
+    if etag:
+        response['ETag'] = etag
+    return response
+
+
+def _stream(request, name, content_type):
+    """Stream through the storage, answering a single ``Range: bytes=a-b`` with 206."""
+    handle = default_storage.open(name, 'rb')
+    size = default_storage.size(name)
+
+    byte_range = _parse_range(request.headers.get('Range', ''), size)
+    if byte_range is None:
+        response = FileResponse(handle, content_type=content_type)
+        response['Accept-Ranges'] = 'bytes'
+        return response
+    if byte_range == 'unsatisfiable':
+        handle.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range
+    handle.seek(start)
+    response = FileResponse(_read_range(handle, end - start + 1), status=206, content_type=content_type)
+    response['Content-Length'] = str(end - start + 1)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _parse_range(header, size):
+    """(start, end) inclusive for one satisfiable range, 'unsatisfiable', or None to send everything."""
+    match = _RANGE_RE.match(header.strip())
+    if not match or size == 0:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return 'unsatisfiable'
+    return start, end
+
+
+def _read_range(handle, length, chunk_size=64 * 1024):
+    try:
+        while length > 0:
+            chunk = handle.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        handle.close()
@@ -0,0 +1,49 @@
+"""
+Sharded upload paths for photos.
+
+Files are stored as ``<prefix>/YYYY/MM/DD/<hh>/<filename>``, where ``hh`` is a
+two-character hash of the employee id, so no directory grows beyond one
+day's uploads for 1/256th of the staff. Attendance photos are sharded by the
+attendance date, profile pictures by upload date.
+
+``manage.py shard_media`` moves files stored under the old flat layout.
+"""
+import hashlib
+import posixpath
+import re
+
+from django.utils import timezone
+
+CHECKIN_PREFIX = 'checkin_photos'
+CHECKOUT_PREFIX = 'checkout_photos'
+PROFILE_PREFIX = 'profile_pics'
+
+_SHARDED_RE = re.compile(r'^[^/]+/\d{4}/\d{2}/\d{2}/[0-9a-f]{2}/[^/]+$')
+
+
+def employee_shard(employee_id):
+    """Two hex characters spreading employees over 256 directories."""
+    return hashlib.sha1(str(employee_id).encode()).hexdigest()[:2]
+
+
+def sharded_name(prefix, employee_id, day, filename):
+    return posixpath.join(
+        prefix, f'{day:%Y}', f'{day:%m}', f'{day:%d}', employee_shard(employee_id),
+        posixpath.basename(filename),
+    )
+
+
+def is_sharded(name):
+    return bool(_SHARDED_RE.match(name or ''))
+
+
+def checkin_photo_path(instance, filename):
+    return sharded_name(CHECKIN_PREFIX, instance.employee_id, instance.date or timezone.localdate(), filename)
+
+
+def checkout_photo_path(instance, filename):
+    return sharded_name(CHECKOUT_PREFIX, instance.employee_id, instance.date or timezone.localdate(), filename)
+
+
+def profile_picture_path(instance, filename):
+    return sharded_name(PROFILE_PREFIX, instance.pk or 'new', timezone.localdate(), filename)
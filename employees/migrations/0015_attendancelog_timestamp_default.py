@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-19 07:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0014_alter_attendance_half_day'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancelog',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False, help_text='When the action was attempted'),
+        ),
+    ]
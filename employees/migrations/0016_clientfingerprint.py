@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0015_attendancelog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClientFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='SHA-256 of the user agent and IP address', max_length=64, unique=True)),
+                ('ua_hash', models.CharField(db_index=True, help_text='SHA-256 of the user agent (same device across IP addresses)', max_length=64)),
+                ('user_agent', models.TextField(blank=True, default='', help_text='Browser user agent')),
+                ('browser', models.CharField(blank=True, default='', help_text='Parsed browser family', max_length=50)),
+                ('os', models.CharField(blank=True, default='', help_text='Parsed operating system family', max_length=50)),
+                ('ip_address', models.GenericIPAddressField(blank=True, help_text='IP address of the request', null=True)),
+                ('first_seen', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Client Fingerprint',
+                'verbose_name_plural': 'Client Fingerprints',
+            },
+        ),
+        migrations.AddField(
+            model_name='attendancelog',
+            name='client',
+            field=models.ForeignKey(blank=True, help_text='Browser user agent and IP address of the request', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='logs', to='employees.clientfingerprint'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Move AttendanceLog user agents / IP addresses into ClientFingerprint rows
+
+from django.db import migrations
+
+from employees.client_fingerprints import fingerprint_fields
+
+BATCH_SIZE = 2000
+
+
+def forwards(apps, schema_editor):
+    AttendanceLog = apps.get_model('employees', 'AttendanceLog')
+    ClientFingerprint = apps.get_model('employees', 'ClientFingerprint')
+
+    known = dict(ClientFingerprint.objects.values_list('key', 'id'))
+    last_id = 0
+    while True:
+        batch = list(
+            AttendanceLog.objects.filter(id__gt=last_id, client__isnull=True)
+            .order_by('id')
+            .only('id', 'user_agent', 'ip_address')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        fields_by_log = {}
+        new_clients = {}
+        for log in batch:
+            if not log.user_agent and not log.ip_address:
+                continue
+            fields = fingerprint_fields(log.user_agent, log.ip_address)
+            fields_by_log[log.id] = fields['key']
+            if fields['key'] not in known:
+                new_clients[fields['key']] = ClientFingerprint(**fields)
+
+        if new_clients:
+            ClientFingerprint.objects.bulk_create(new_clients.values())
+            known.update(
+                ClientFingerprint.objects.filter(key__in=list(new_clients)).values_list('key', 'id')
+            )
+
+        changed = []
+        for log in batch:
+            key = fields_by_log.get(log.id)
+            if key:
+                log.client_id = known[key]
+                changed.append(log)
+        AttendanceLog.objects.bulk_update(changed, ['client'], batch_size=BATCH_SIZE)
+
+
+def backwards(apps, schema_editor):
+    AttendanceLog = apps.get_model('employees', 'AttendanceLog')
+
+    last_id = 0
+    while True:
+        batch = list(
+            AttendanceLog.objects.filter(id__gt=last_id, client__isnull=False)
+            .select_related('client')
+            .order_by('id')[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for log in batch:
+            log.user_agent = log.client.user_agent
+            log.ip_address = log.client.ip_address
+        AttendanceLog.objects.bulk_update(batch, ['user_agent', 'ip_address'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0016_clientfingerprint'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0017_dedupe_attendancelog_clients'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='attendancelog',
+            name='ip_address',
+        ),
+        migrations.RemoveField(
+            model_name='attendancelog',
+            name='user_agent',
+        ),
+    ]
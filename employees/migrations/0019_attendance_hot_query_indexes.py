@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0018_remove_attendancelog_ip_address_user_agent'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'check_out_time', 'half_day', 'employee'], name='att_date_cover_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', '-check_in_time'], name='att_date_checkin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-check_in_time', '-id'], name='att_checkin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['employee', '-check_in_time', '-id'], name='att_emp_checkin_idx'),
+        ),
+    ]
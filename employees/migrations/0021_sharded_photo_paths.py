@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:13
+
+import employees.media_paths
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0020_backgroundtask'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='check_in_photo',
+            field=models.ImageField(blank=True, help_text='Photo taken during check-in for verification', null=True, upload_to=employees.media_paths.checkin_photo_path),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='check_out_photo',
+            field=models.ImageField(blank=True, help_text='Photo taken during check-out for verification', null=True, upload_to=employees.media_paths.checkout_photo_path),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='profile_picture',
+            field=models.ImageField(blank=True, help_text="Employee's profile picture", null=True, upload_to=employees.media_paths.profile_picture_path),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0021_sharded_photo_paths'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='check_in_photo_pending',
+            field=models.BooleanField(default=False, help_text='Check-in photo is still being written by the background photo writer'),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='check_out_photo_pending',
+            field=models.BooleanField(default=False, help_text='Check-out photo is still being written by the background photo writer'),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(condition=models.Q(('check_in_photo_pending', True), ('check_out_photo_pending', True), _connector='OR'), fields=['id'], name='att_photo_pending_idx'),
+        ),
+    ]
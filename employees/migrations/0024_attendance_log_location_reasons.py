@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0023_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendancelog',
+            name='failure_reason',
+            field=models.CharField(blank=True, choices=[('no_face_detected', 'No Face Detected'), ('multiple_faces', 'Multiple Faces Detected'), ('face_not_matched', 'Face Not Matched'), ('already_checked_in', 'Already Checked In'), ('not_checked_in', 'Not Checked In Yet'), ('already_checked_out', 'Already Checked Out'), ('no_face_registered', 'Face Not Registered'), ('photo_required', 'Photo Required'), ('location_not_provided', 'Location Not Provided'), ('invalid_coordinates', 'Invalid Coordinates'), ('outside_office_premises', 'Outside Office Premises'), ('location_token_invalid', 'Location Check Expired or Invalid'), ('other', 'Other Error')], help_text='Reason for failure if unsuccessful', max_length=30, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-19 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0024_attendance_log_location_reasons'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficeLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('shape', models.CharField(choices=[('circle', 'Circle'), ('polygon', 'Polygon')], default='circle', max_length=10)),
+                ('latitude', models.DecimalField(decimal_places=7, help_text='Latitude of the site centre', max_digits=10)),
+                ('longitude', models.DecimalField(decimal_places=7, help_text='Longitude of the site centre', max_digits=10)),
+                ('radius_meters', models.PositiveIntegerField(default=50, help_text='Allowed distance from the centre (circle sites)')),
+                ('polygon', models.JSONField(blank=True, default=list, help_text='Polygon sites: boundary as [[latitude, longitude], ...] (at least 3 points)')),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employees', models.ManyToManyField(blank=True, help_text='Employees allowed to check in here; leave empty to allow everyone', related_name='office_locations', to='employees.employee')),
+            ],
+            options={
+                'verbose_name': 'Office Location',
+                'verbose_name_plural': 'Office Locations',
+                'ordering': ['name'],
+            },
+        ),
+    ]
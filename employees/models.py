@@ -1,12 +1,18 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.core.validators import RegexValidator
 import json
 
+from .domain_events import TrackedFieldsMixin
+from .media_paths import checkin_photo_path, checkout_photo_path, profile_picture_path
 
-class Employee(models.Model):
+
+class Employee(TrackedFieldsMixin, models.Model):
     """Employee model representing an employee in the system"""
 
+    tracked_fields = ('face_encoding',)
+
     # Basic Information
     name = models.CharField(max_length=100, help_text="Employee's first name")
     full_name = models.CharField(max_length=200, help_text="Employee's full name")
@@ -78,7 +84,7 @@ class Employee(models.Model):
     
     # Profile Picture
     profile_picture = models.ImageField(
-        upload_to='profile_pics/',
+        upload_to=profile_picture_path,
         blank=True,
         null=True,
         help_text="Employee's profile picture"
@@ -124,7 +130,15 @@ def save(self, *args, **kwargs):
         # Auto-generate username if not set (only for new users)
         if self.user and not self.user.username:
             self.user.username = self.email
+        face_changed = 'face_encoding' in self.tracked_changes() or (
+            self._state.adding and self.face_encoding
+        )
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+        if face_changed:
+            from .domain_events import FaceEncodingChanged, emit
+            emit(FaceEncodingChanged(employee_id=self.pk, registered=bool(self.face_encoding)))
     
     def get_face_encoding(self):
         """Get face encoding as numpy array"""
@@ -160,9 +174,11 @@ def has_registered_face(self):
         )
 
 
-class Attendance(models.Model):
+class Attendance(TrackedFieldsMixin, models.Model):
     """Attendance model for tracking employee check-ins"""
 
+    tracked_fields = ('check_out_time',)
+
     employee = models.ForeignKey(
         Employee,
         on_delete=models.CASCADE,
@@ -177,22 +193,30 @@ class Attendance(models.Model):
         help_text="Date of the check-in"
     )
     check_in_photo = models.ImageField(
-        upload_to='checkin_photos/',
+        upload_to=checkin_photo_path,
         blank=True,
         null=True,
         help_text="Photo taken during check-in for verification"
     )
+    check_in_photo_pending = models.BooleanField(
+        default=False,
+        help_text="Check-in photo is still being written by the background photo writer"
+    )
     check_out_time = models.DateTimeField(
         blank=True,
         null=True,
         help_text="Timestamp when employee checked out"
     )
     check_out_photo = models.ImageField(
-        upload_to='checkout_photos/',
+        upload_to=checkout_photo_path,
         blank=True,
         null=True,
         help_text="Photo taken during check-out for verification"
     )
+    check_out_photo_pending = models.BooleanField(
+        default=False,
+        help_text="Check-out photo is still being written by the background photo writer"
+    )
     check_in_latitude = models.DecimalField(
         max_digits=10,
         decimal_places=7,
@@ -232,10 +256,54 @@ class Meta:
         verbose_name_plural = 'Attendance Records'
         # Ensure only one check-in per employee per day
         unique_together = ['employee', 'date']
+        indexes = [
+            # Date-leading and covering for the daily/monthly count queries
+            # (date=, date__gte=, + check_out_time__isnull / half_day / employee)
+            models.Index(fields=['date', 'check_out_time', 'half_day', 'employee'], name='att_date_cover_idx'),
+            # Today's attendance, newest check-in first
+            models.Index(fields=['date', '-check_in_time'], name='att_date_checkin_idx'),
+            # Attendance list and per-employee history, keyset ordered
+            models.Index(fields=['-check_in_time', '-id'], name='att_checkin_idx'),
+            models.Index(fields=['employee', '-check_in_time', '-id'], name='att_emp_checkin_idx'),
+            # Photos still waiting for the background writer (reconcile_attendance_photos)
+            models.Index(
+                fields=['id'],
+                name='att_photo_pending_idx',
+                condition=models.Q(check_in_photo_pending=True) | models.Q(check_out_photo_pending=True),
+            ),
+        ]
 
     def __str__(self):
         return f"{self.employee.name} - {self.check_in_time.strftime('%Y-%m-%d %H:%M:%S')}"
 
+    def save(self, *args, **kwargs):
+        from .domain_events import AttendanceCheckedIn, AttendanceCheckedOut, emit
+
+        created = self._state.adding
+        checked_out = self.check_out_time is not None and (
+            created or 'check_out_time' in self.tracked_changes()
+        )
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+        if created:
+            emit(AttendanceCheckedIn(
+                attendance_id=self.pk,
+                employee_id=self.employee_id,
+                employee_name=self.employee.name,
+                date=self.date,
+                check_in_time=self.check_in_time,
+            ))
+        if checked_out:
+            emit(AttendanceCheckedOut(
+                attendance_id=self.pk,
+                employee_id=self.employee_id,
+                employee_name=self.employee.name,
+                date=self.date,
+                check_out_time=self.check_out_time,
+                half_day=self.half_day,
+            ))
+
     @property
     def duration(self):
         """Calculate duration between check-in and check-out"""
@@ -289,6 +357,42 @@ def has_checked_in_today(cls, employee):
         ).exists()
 
 
+class ClientFingerprint(models.Model):
+    """Distinct browser user agent / IP address pair seen on attendance attempts"""
+
+    key = models.CharField(
+        max_length=64,
+        unique=True,
+        help_text="SHA-256 of the user agent and IP address"
+    )
+    ua_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        help_text="SHA-256 of the user agent (same device across IP addresses)"
+    )
+    user_agent = models.TextField(
+        blank=True,
+        default='',
+        help_text="Browser user agent"
+    )
+    browser = models.CharField(max_length=50, blank=True, default='', help_text="Parsed browser family")
+    os = models.CharField(max_length=50, blank=True, default='', help_text="Parsed operating system family")
+    ip_address = models.GenericIPAddressField(
+        blank=True,
+        null=True,
+        help_text="IP address of the request"
+    )
+    first_seen = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Client Fingerprint'
+        verbose_name_plural = 'Client Fingerprints'
+
+    def __str__(self):
+        device = ' / '.join(part for part in (self.browser, self.os) if part) or 'Unknown device'
+        return f"{device} ({self.ip_address or 'no IP'})"
+
+
 class AttendanceLog(models.Model):
     """Log all attendance activities including successful and failed attempts"""
     
@@ -308,6 +412,10 @@ class AttendanceLog(models.Model):
         ('already_checked_out', 'Already Checked Out'),
         ('no_face_registered', 'Face Not Registered'),
         ('photo_required', 'Photo Required'),
+        ('location_not_provided', 'Location Not Provided'),
+        ('invalid_coordinates', 'Invalid Coordinates'),
+        ('outside_office_premises', 'Outside Office Premises'),
+        ('location_token_invalid', 'Location Check Expired or Invalid'),
         ('other', 'Other Error'),
     ]
     
@@ -323,7 +431,8 @@ class AttendanceLog(models.Model):
         help_text="Type of action attempted"
     )
     timestamp = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         help_text="When the action was attempted"
     )
     success = models.BooleanField(
@@ -342,15 +451,13 @@ class AttendanceLog(models.Model):
         null=True,
         help_text="Face recognition confidence percentage"
     )
-    ip_address = models.GenericIPAddressField(
-        blank=True,
-        null=True,
-        help_text="IP address of the request"
-    )
-    user_agent = models.TextField(
+    client = models.ForeignKey(
+        ClientFingerprint,
+        on_delete=models.SET_NULL,
         blank=True,
         null=True,
-        help_text="Browser user agent"
+        related_name='logs',
+        help_text="Browser user agent and IP address of the request"
     )
     notes = models.TextField(
         blank=True,
@@ -380,6 +487,14 @@ def __str__(self):
         status = "✓" if self.success else "✗"
         return f"{status} {self.employee.name} - {self.get_action_display()} at {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
     
+    @property
+    def ip_address(self):
+        return self.client.ip_address if self.client_id else None
+
+    @property
+    def user_agent(self):
+        return self.client.user_agent if self.client_id else None
+
     @property
     def status_badge(self):
         """Return Bootstrap badge class based on status"""
@@ -400,8 +515,10 @@ def action_icon(self):
         return icons.get(self.action, 'bx-time')
 
 
-class Ticket(models.Model):
+class Ticket(TrackedFieldsMixin, models.Model):
     """Support ticket system for employees to raise issues"""
+
+    tracked_fields = ('status', 'priority')
     
     PRIORITY_CHOICES = [
         ('low', 'Low'),
@@ -529,7 +646,30 @@ def save(self, *args, **kwargs):
             from django.utils import timezone
             self.resolved_at = timezone.now()
         
+        from .domain_events import TicketCreated, TicketStatusChanged, emit
+
+        created = self._state.adding
+        changes = self.tracked_changes()
         super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+        if created:
+            emit(TicketCreated(
+                ticket_id=self.pk,
+                ticket_number=self.ticket_number,
+                employee_id=self.employee_id,
+                status=self.status,
+                priority=self.priority,
+            ))
+        elif changes:
+            emit(TicketStatusChanged(
+                ticket_id=self.pk,
+                ticket_number=self.ticket_number,
+                old_status=changes.get('status', (self.status,))[0],
+                status=self.status,
+                old_priority=changes.get('priority', (self.priority,))[0],
+                priority=self.priority,
+            ))
     
     @property
     def status_color(self):
@@ -611,6 +751,18 @@ class Meta:
     
     def __str__(self):
         return f"Comment on {self.ticket.ticket_number} by {self.user.username}"
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created:
+            from .domain_events import TicketCommentAdded, emit
+            emit(TicketCommentAdded(
+                comment_id=self.pk,
+                ticket_id=self.ticket_id,
+                user_id=self.user_id,
+                is_internal=self.is_internal,
+            ))
     
     @property
     def is_admin(self):
@@ -693,3 +845,153 @@ def is_approved(self):
     @property
     def is_rejected(self):
         return self.status == 'rejected'
+
+
+class BackgroundTask(models.Model):
+    """Durable background job, claimed and run by `manage.py run_workers`"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100, help_text="Registered task name")
+    payload = models.JSONField(default=dict, blank=True, help_text="Keyword arguments for the task")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now, help_text="Earliest time the task may run")
+    locked_by = models.CharField(max_length=100, blank=True, default='', help_text="Worker holding the lease")
+    locked_until = models.DateTimeField(null=True, blank=True, help_text="Lease expiry of a running task")
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_after', 'id']
+        verbose_name = 'Background Task'
+        verbose_name_plural = 'Background Tasks'
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_status_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class MediaBlob(models.Model):
+    """File content stored once under its SHA-256 (see employees/storage.py)"""
+
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField(help_text="Size in bytes")
+    ref_count = models.PositiveIntegerField(default=0, help_text="Number of stored files using this content")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class StoredFile(models.Model):
+    """Media path as stored in file fields, mapped to its content blob"""
+
+    name = models.CharField(max_length=255, unique=True, help_text="Storage name used by file fields and URLs")
+    blob = models.ForeignKey(
+        MediaBlob,
+        on_delete=models.PROTECT,
+        related_name='files',
+    )
+    original_name = models.CharField(max_length=255, blank=True, default='', help_text="File name as uploaded")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Stored File'
+        verbose_name_plural = 'Stored Files'
+
+    def __str__(self):
+        return self.name
+
+
+class OfficeLocation(models.Model):
+    """Office site employees may check in from (see employees/office_index.py)"""
+
+    SHAPE_CIRCLE = 'circle'
+    SHAPE_POLYGON = 'polygon'
+    SHAPE_CHOICES = [
+        (SHAPE_CIRCLE, 'Circle'),
+        (SHAPE_POLYGON, 'Polygon'),
+    ]
+
+    name = models.CharField(max_length=100, unique=True)
+    shape = models.CharField(max_length=10, choices=SHAPE_CHOICES, default=SHAPE_CIRCLE)
+    latitude = models.DecimalField(
+        max_digits=10,
+        decimal_places=7,
+        help_text="Latitude of the site centre"
+    )
+    longitude = models.DecimalField(
+        max_digits=10,
+        decimal_places=7,
+        help_text="Longitude of the site centre"
+    )
+    radius_meters = models.PositiveIntegerField(
+        default=50,
+        help_text="Allowed distance from the centre (circle sites)"
+    )
+    polygon = models.JSONField(
+        default=list,
+        blank=True,
+        help_text='Polygon sites: boundary as [[latitude, longitude], ...] (at least 3 points)'
+    )
+    employees = models.ManyToManyField(
+        Employee,
+        blank=True,
+        related_name='office_locations',
+        help_text="Employees allowed to check in here; leave empty to allow everyone"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = 'Office Location'
+        verbose_name_plural = 'Office Locations'
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.shape != self.SHAPE_POLYGON:
+            return
+        points = self.polygon if isinstance(self.polygon, list) else []
+        try:
+            valid = len(points) >= 3 and all(
+                len(point) == 2 and -90 <= float(point[0]) <= 90 and -180 <= float(point[1]) <= 180
+                for point in points
+            )
+        except (TypeError, ValueError):
+            valid = False
+        if not valid:
+            raise ValidationError({'polygon': 'Enter at least 3 [latitude, longitude] points.'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .domain_events import OfficeLocationsChanged, emit
+        emit(OfficeLocationsChanged(office_location_id=self.pk))
+
+    def delete(self, *args, **kwargs):
+        office_location_id = self.pk
+        result = super().delete(*args, **kwargs)
+        from .domain_events import OfficeLocationsChanged, emit
+        emit(OfficeLocationsChanged(office_location_id=office_location_id))
+        return result
@@ -0,0 +1,112 @@
+"""
+Live office occupancy backed by the Django cache.
+
+For each attendance date the cache holds the set of employee ids that have
+checked in and the set that have checked out, plus a map of active employees.
+The sets are updated by domain event subscribers (``employees/subscribers.py``)
+after attendance changes commit, and a cold cache is rebuilt from a single
+query, so reading the board never recounts attendance. Present / left /
+not-yet-arrived lists are plain set differences.
+
+The default local-memory cache is per process; use a shared backend
+(Redis, Memcached) when running several workers. Entries expire after
+``ATTENDANCE_OCCUPANCY_TTL`` seconds, so a lost concurrent update heals on the
+next rebuild.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import Attendance, Employee
+
+ACTIVE_EMPLOYEES_KEY = 'occupancy:active-employees'
+
+
+def get_occupancy_ttl():
+    return int(getattr(settings, 'ATTENDANCE_OCCUPANCY_TTL', 300))
+
+
+def _day_key(day):
+    return f'occupancy:{day.isoformat()}'
+
+
+def get_active_employees():
+    """Map of active employee id -> name, cached."""
+    employees = cache.get(ACTIVE_EMPLOYEES_KEY)
+    if employees is None:
+        employees = dict(
+            Employee.objects.filter(user__is_active=True).values_list('id', 'name')
+        )
+        cache.set(ACTIVE_EMPLOYEES_KEY, employees, get_occupancy_ttl())
+    return employees
+
+
+def rebuild_day(day):
+    """Load the checked-in / checked-out id sets for a day with one query and cache them."""
+    checked_in, checked_out = set(), set()
+    for employee_id, check_out_time in Attendance.objects.filter(date=day).values_list(
+        'employee_id', 'check_out_time'
+    ):
+        checked_in.add(employee_id)
+        if check_out_time is not None:
+            checked_out.add(employee_id)
+    state = {'in': checked_in, 'out': checked_out}
+    cache.set(_day_key(day), state, get_occupancy_ttl())
+    return state
+
+
+def get_day_state(day):
+    """Cached {'in': set, 'out': set} of employee ids for a day, rebuilt on a miss."""
+    state = cache.get(_day_key(day))
+    if state is None:
+        state = rebuild_day(day)
+    return state
+
+
+def _update(day, employee_id, checked_out):
+    state = cache.get(_day_key(day))
+    if state is None:
+        # Cold cache: the rebuild already sees the committed row
+        rebuild_day(day)
+        return
+    state['in'].add(employee_id)
+    if checked_out:
+        state['out'].add(employee_id)
+    cache.set(_day_key(day), state, get_occupancy_ttl())
+
+
+def mark_checked_in(employee_id, day):
+    """Add an employee to a day's checked-in set."""
+    _update(day, employee_id, checked_out=False)
+
+
+def mark_checked_out(employee_id, day):
+    """Add an employee to a day's checked-out set."""
+    _update(day, employee_id, checked_out=True)
+
+
+def get_occupancy(day=None):
+    """
+    Current occupancy for a day.
+
+    Returns:
+        dict with 'present' (in the building), 'left' (checked out) and
+        'not_arrived' (active employees without a check-in) lists of
+        {'id', 'name'} dicts sorted by name
+    """
+    day = day or timezone.now().date()
+    state = get_day_state(day)
+    employees = get_active_employees()
+    active_ids = set(employees)
+
+    def listing(ids):
+        return sorted(
+            ({'id': employee_id, 'name': employees.get(employee_id, '')} for employee_id in ids),
+            key=lambda item: item['name'].lower(),
+        )
+
+    return {
+        'present': listing(state['in'] - state['out']),
+        'left': listing(state['out']),
+        'not_arrived': listing(active_ids - state['in']),
+    }
@@ -0,0 +1,225 @@
+"""
+In-process spatial index of office sites for geofence checks.
+
+Each active ``OfficeLocation`` becomes a ``Site`` with a cached bounding box:
+centre +/- radius for circles, the min/max of the points for polygons. The
+site is registered in every cell of a fixed latitude/longitude grid
+(``OFFICE_INDEX_CELL_DEGREES``, default 0.01 degrees, about 1.1 km) that its
+box overlaps. Matching a coordinate looks up that one cell in a dict and
+tests only the sites registered there: bounding box first, then the exact
+haversine or point-in-polygon test. Sites spanning more than
+``MAX_CELLS_PER_SITE`` cells are kept in a short list checked on every
+lookup instead.
+
+The index is built once per process and rebuilt when its version in the
+Django cache changes. Saving or deleting an ``OfficeLocation`` or changing
+its employees bumps the version (``employees/subscribers.py``). The default
+local-memory cache is per process, so the index is also rebuilt after
+``OFFICE_INDEX_TTL`` seconds; use a shared backend to make edits visible to
+every worker at once.
+
+The default office in ``geolocation_utils`` applies only while no
+``OfficeLocation`` row exists at all (or ``OFFICE_DEFAULT_FALLBACK`` is on);
+deactivating every site does not bring it back.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .geolocation_utils import haversine_distance
+
+VERSION_KEY = 'office-index:version'
+MAX_CELLS_PER_SITE = 4096
+METERS_PER_DEGREE = 111320.0
+
+_state = None
+_lock = threading.Lock()
+
+
+def get_cell_degrees():
+    return float(getattr(settings, 'OFFICE_INDEX_CELL_DEGREES', 0.01))
+
+
+def get_index_ttl():
+    return int(getattr(settings, 'OFFICE_INDEX_TTL', 300))
+
+
+def default_office_allowed():
+    """Whether the built-in default office applies when there is no active site."""
+    from .models import OfficeLocation
+
+    return bool(getattr(settings, 'OFFICE_DEFAULT_FALLBACK', False)) or not OfficeLocation.objects.exists()
+
+
+@dataclass(frozen=True)
+class Site:
+    id: int
+    name: str
+    shape: str
+    latitude: float
+    longitude: float
+    radius_meters: float
+    polygon: tuple
+    bbox: tuple  # (min latitude, min longitude, max latitude, max longitude)
+    employee_ids: frozenset  # empty: open to every employee
+
+    def allows(self, employee_id):
+        return not self.employee_ids or employee_id in self.employee_ids
+
+    def distance(self, latitude, longitude):
+        """Metres from the site centre."""
+        return haversine_distance(self.latitude, self.longitude, latitude, longitude)
+
+    def contains(self, latitude, longitude):
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (min_lat <= latitude <= max_lat and min_lon <= longitude <= max_lon):
+            return False
+        if self.shape == 'polygon':
+            return _point_in_polygon(latitude, longitude, self.polygon)
+        return self.distance(latitude, longitude) <= self.radius_meters
+
+
+def _point_in_polygon(latitude, longitude, points):
+    """Even-odd ray casting on (latitude, longitude) pairs."""
+    inside = False
+    previous_lat, previous_lon = points[-1]
+    for lat, lon in points:
+        if (lat > latitude) != (previous_lat > latitude):
+            crossing = lon + (latitude - lat) * (previous_lon - lon) / (previous_lat - lat)
+            if longitude < crossing:
+                inside = not inside
+        previous_lat, previous_lon = lat, lon
+    return inside
+
+
+def _bounding_box(shape, latitude, longitude, radius_meters, polygon):
+    if shape == 'polygon':
+        lats = [point[0] for point in polygon]
+        lons = [point[1] for point in polygon]
+        return min(lats), min(lons), max(lats), max(lons)
+    delta_lat = radius_meters / METERS_PER_DEGREE
+    delta_lon = radius_meters / (METERS_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+    return latitude - delta_lat, longitude - delta_lon, latitude + delta_lat, longitude + delta_lon
+
+
+class OfficeIndex:
+    """Grid bucket map from cell to the sites whose bounding box overlaps it."""
+
+    def __init__(self, sites, cell_degrees=None, version=None, use_default_office=False):
+        self.sites = tuple(sites)
+        self.use_default_office = use_default_office and not self.sites
+        self.cell_degrees = cell_degrees or get_cell_degrees()
+        self.version = version
+        self.built_at = time.monotonic()
+        self.cells = defaultdict(list)
+        self.wide = []
+        for site in self.sites:
+            min_lat, min_lon, max_lat, max_lon = site.bbox
+            (row_start, col_start), (row_end, col_end) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+            if (row_end - row_start + 1) * (col_end - col_start + 1) > MAX_CELLS_PER_SITE:
+                self.wide.append(site)
+                continue
+            for row in range(row_start, row_end + 1):
+                for col in range(col_start, col_end + 1):
+                    self.cells[(row, col)].append(site)
+        self.cells = dict(self.cells)
+
+    def cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    def candidates(self, latitude, longitude):
+        """Sites that may contain the point: its grid cell plus the oversized sites."""
+        found = self.cells.get(self.cell(latitude, longitude), ())
+        return [*found, *self.wide] if self.wide else found
+
+    def match(self, latitude, longitude, employee_id=None):
+        """
+        Site containing the point that the employee may use, closest centre first.
+
+        Returns:
+            (Site, distance in metres), or (None, None)
+        """
+        best, best_distance = None, None
+        for site in self.candidates(latitude, longitude):
+            if (employee_id is None or site.allows(employee_id)) and site.contains(latitude, longitude):
+                distance = site.distance(latitude, longitude)
+                if best is None or distance < best_distance:
+                    best, best_distance = site, distance
+        return best, best_distance
+
+    def nearest(self, latitude, longitude, employee_id=None):
+        """
+        Closest site the employee may use, for rejection messages (scans every site).
+
+        Returns:
+            (Site, distance in metres), or (None, None) if none is assigned
+        """
+        best, best_distance = None, None
+        for site in self.sites:
+            if employee_id is None or site.allows(employee_id):
+                distance = site.distance(latitude, longitude)
+                if best is None or distance < best_distance:
+                    best, best_distance = site, distance
+        return best, best_distance
+
+
+def load_sites():
+    """Sites for every active OfficeLocation, with assigned employee ids, in two queries."""
+    from .models import OfficeLocation
+
+    assigned = defaultdict(set)
+    through = OfficeLocation.employees.through
+    for location_id, employee_id in through.objects.filter(officelocation__is_active=True).values_list(
+        'officelocation_id', 'employee_id'
+    ):
+        assigned[location_id].add(employee_id)
+
+    sites = []
+    for location in OfficeLocation.objects.filter(is_active=True):
+        latitude, longitude = float(location.latitude), float(location.longitude)
+        polygon = tuple((float(lat), float(lon)) for lat, lon in location.polygon or ())
+        shape = 'polygon' if location.shape == OfficeLocation.SHAPE_POLYGON and len(polygon) >= 3 else 'circle'
+        sites.append(Site(
+            id=location.pk,
+            name=location.name,
+            shape=shape,
+            latitude=latitude,
+            longitude=longitude,
+            radius_meters=float(location.radius_meters),
+            polygon=polygon,
+            bbox=_bounding_box(shape, latitude, longitude, location.radius_meters, polygon),
+            employee_ids=frozenset(assigned.get(location.pk, ())),
+        ))
+    return sites
+
+
+def get_office_index():
+    """The process-wide OfficeIndex, rebuilt when sites were edited or it is older than the TTL."""
+    global _state
+    version = cache.get(VERSION_KEY, 0)
+    state = _state
+    if state is not None and state.version == version and time.monotonic() - state.built_at < get_index_ttl():
+        return state
+    with _lock:
+        state = _state
+        if state is None or state.version != version or time.monotonic() - state.built_at >= get_index_ttl():
+            sites = load_sites()
+            state = _state = OfficeIndex(
+                sites, version=version, use_default_office=not sites and default_office_allowed()
+            )
+    return state
+
+
+def invalidate_office_index():
+    """Make every process rebuild its index on the next lookup."""
+    global _state
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 1, None)
+    _state = None
@@ -0,0 +1,133 @@
+"""
+Keyset (cursor) pagination for large, append-mostly tables.
+
+Instead of OFFSET plus a full COUNT(*), each page is fetched with a range
+condition on the ordering key, e.g. ``(timestamp, id) < (last_ts, last_id)``,
+which the existing ``-timestamp`` indexes serve directly no matter how deep
+the page is. Cursors are opaque URL-safe tokens.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+def encode_cursor(values, direction, offset):
+    """Encode a cursor token for the given key values."""
+    payload = json.dumps({'k': values, 'd': direction, 'o': offset}, separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token, returning None when it is missing or malformed."""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload['d'] not in ('next', 'prev') or not isinstance(payload['k'], list):
+            return None
+        return payload
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+class KeysetPage:
+    """One page of keyset-paginated results."""
+
+    def __init__(self, object_list, per_page, offset, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.offset = offset
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def number(self):
+        return self.offset // self.per_page + 1
+
+    @property
+    def start_index(self):
+        return self.offset + 1 if self.object_list else 0
+
+    @property
+    def end_index(self):
+        return self.offset + len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Paginate a queryset by a descending two-column key (e.g. ``('timestamp', 'id')``).
+
+    Args:
+        queryset: queryset to paginate (its own ordering is replaced)
+        per_page: number of rows per page
+        key: tuple of (sort field, unique tie-breaker field), both ordered descending
+    """
+
+    def __init__(self, queryset, per_page, key=('timestamp', 'id')):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.key = key
+
+    def _key_values(self, obj):
+        return [getattr(obj, field) for field in self.key]
+
+    def _after(self, values, direction):
+        """Rows strictly after ``values`` in the requested direction."""
+        field, tie = self.key
+        op = 'lt' if direction == 'next' else 'gt'
+        return Q(**{f'{field}__{op}': values[0]}) | Q(**{field: values[0], f'{tie}__{op}': values[1]})
+
+    def get_page(self, cursor=None):
+        """Return the page addressed by an opaque cursor (first page when missing or invalid)."""
+        field, tie = self.key
+        payload = decode_cursor(cursor)
+        direction, offset = 'next', 0
+        rows = None
+
+        if payload is not None:
+            try:
+                direction, offset = payload['d'], max(int(payload.get('o', 0)), 0)
+                ordering = (f'-{field}', f'-{tie}') if direction == 'next' else (field, tie)
+                rows = list(
+                    self.queryset.filter(self._after(payload['k'], direction))
+                    .order_by(*ordering)[:self.per_page + 1]
+                )
+            except (ValidationError, ValueError, TypeError, IndexError):
+                # Tampered or stale cursor: fall back to the first page
+                payload, direction, offset = None, 'next', 0
+
+        if rows is None:
+            rows = list(self.queryset.order_by(f'-{field}', f'-{tie}')[:self.per_page + 1])
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == 'prev':
+            rows.reverse()
+            has_next = True
+            has_previous = has_more
+        else:
+            has_next = has_more
+            has_previous = payload is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = encode_cursor(self._key_values(rows[-1]), 'next', offset + len(rows))
+        if rows and has_previous:
+            previous_cursor = encode_cursor(self._key_values(rows[0]), 'prev', max(offset - self.per_page, 0))
+
+        return KeysetPage(rows, self.per_page, offset, has_next, has_previous, next_cursor, previous_cursor)
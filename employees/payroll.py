@@ -0,0 +1,197 @@
+"""
+Vectorized monthly payroll attendance computation.
+
+Pulls every attendance row of a month in one ``values_list`` query, turns the
+check-in/check-out timestamps into numpy arrays and derives per-employee
+metrics with ``np.bincount`` reductions against the working-day calendar.
+"""
+from datetime import datetime
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .attendance_matrix import HALF_DAY_THRESHOLD_SECONDS, holiday_mask, month_days
+from .models import Attendance, Employee
+
+PAYROLL_COLUMNS = [
+    'employee_id', 'name', 'full_name', 'email', 'account_number', 'ifsc_code', 'pan_card',
+    'working_days', 'present_days', 'half_days', 'incomplete_days', 'absent_days',
+    'payable_days', 'worked_hours', 'late_count', 'attendance_percentage',
+]
+
+
+def get_late_after(default='10:00'):
+    """Read the local check-in time after which an employee counts as late."""
+    value = getattr(settings, 'ATTENDANCE_LATE_AFTER', default)
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def _epoch(value):
+    return value.timestamp() if value is not None else np.nan
+
+
+def fetch_month_arrays(year, month, employee_range=None):
+    """
+    Load a month of attendance as parallel numpy arrays.
+
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        employee_range: optional (first_id, last_id) inclusive employee id range
+
+    Returns:
+        dict of arrays: employee_id, day_index, check_in, check_out (epoch seconds, NaN when missing), half_day
+    """
+    days = month_days(year, month)
+    records = Attendance.objects.filter(date__gte=days[0], date__lte=days[-1])
+    if employee_range:
+        records = records.filter(employee__id__range=employee_range)
+
+    rows = list(records.values_list('employee_id', 'date', 'check_in_time', 'check_out_time', 'half_day'))
+    count = len(rows)
+    return {
+        'employee_id': np.fromiter((r[0] for r in rows), dtype=np.int64, count=count),
+        'day_index': np.fromiter((r[1].day - 1 for r in rows), dtype=np.int64, count=count),
+        'check_in': np.fromiter((_epoch(r[2]) for r in rows), dtype=np.float64, count=count),
+        'check_out': np.fromiter((_epoch(r[3]) for r in rows), dtype=np.float64, count=count),
+        'half_day': np.fromiter((r[4] for r in rows), dtype=bool, count=count),
+    }
+
+
+def working_day_mask(year, month, today=None):
+    """Boolean mask of payable working days in the month (up to today for the running month)."""
+    if today is None:
+        today = timezone.now().date()
+    days = month_days(year, month)
+    elapsed = np.fromiter((d <= today for d in days), dtype=bool, count=len(days))
+    return elapsed & ~holiday_mask(days)
+
+
+def late_cutoffs(year, month, late_after=None):
+    """Epoch seconds of the late threshold for each day of the month, in the current timezone."""
+    late_after = late_after or get_late_after()
+    return np.array(
+        [timezone.make_aware(datetime.combine(day, late_after)).timestamp() for day in month_days(year, month)],
+        dtype=np.float64,
+    )
+
+
+def compute_payroll(year, month, employee_range=None, today=None, late_after=None):
+    """
+    Compute payroll attendance metrics for every employee in a month.
+
+    Args:
+        year: Calendar year
+        month: Calendar month (1-12)
+        employee_range: optional (first_id, last_id) inclusive employee id range
+        today: optional date limiting working days for the running month
+        late_after: optional datetime.time late threshold (defaults to ATTENDANCE_LATE_AFTER)
+
+    Returns:
+        list of dicts keyed by PAYROLL_COLUMNS, ordered by employee id
+    """
+    employees = Employee.objects.order_by('id')
+    if employee_range:
+        employees = employees.filter(id__range=employee_range)
+    info = list(employees.values_list(
+        'id', 'name', 'full_name', 'email', 'account_number', 'ifsc_code', 'pan_card',
+    ))
+    if not info:
+        return []
+
+    employee_ids = np.fromiter((row[0] for row in info), dtype=np.int64, count=len(info))
+    n = len(employee_ids)
+    working_days = int(working_day_mask(year, month, today=today).sum())
+
+    data = fetch_month_arrays(year, month, employee_range=employee_range)
+
+    # Rows of the attendance arrays -> position in the (sorted) employee id array
+    rows = np.searchsorted(employee_ids, data['employee_id'])
+    rows = np.clip(rows, 0, n - 1)
+    known = employee_ids[rows] == data['employee_id']
+    rows = rows[known]
+    check_in = data['check_in'][known]
+    check_out = data['check_out'][known]
+    half_flag = data['half_day'][known]
+    day_index = data['day_index'][known]
+
+    checked_out = ~np.isnan(check_out)
+    worked_seconds = np.where(checked_out, check_out - check_in, 0.0)
+    half = checked_out & (half_flag | (worked_seconds < HALF_DAY_THRESHOLD_SECONDS))
+    present = checked_out & ~half
+    late = check_in > late_cutoffs(year, month, late_after)[day_index]
+
+    present_days = np.bincount(rows, weights=present, minlength=n).astype(np.int64)
+    half_days = np.bincount(rows, weights=half, minlength=n).astype(np.int64)
+    incomplete_days = np.bincount(rows, weights=~checked_out, minlength=n).astype(np.int64)
+    late_count = np.bincount(rows, weights=late, minlength=n).astype(np.int64)
+    worked_hours = np.bincount(rows, weights=worked_seconds, minlength=n) / 3600
+
+    absent_days = np.maximum(working_days - (present_days + half_days), 0)
+    payable_days = present_days + half_days * 0.5
+    if working_days:
+        attendance_percentage = payable_days / working_days * 100
+    else:
+        attendance_percentage = np.zeros(n)
+
+    results = []
+    for i, (emp_id, name, full_name, email, account_number, ifsc_code, pan_card) in enumerate(info):
+        results.append({
+            'employee_id': emp_id,
+            'name': name,
+            'full_name': full_name,
+            'email': email,
+            'account_number': account_number,
+            'ifsc_code': ifsc_code,
+            'pan_card': pan_card,
+            'working_days': working_days,
+            'present_days': int(present_days[i]),
+            'half_days': int(half_days[i]),
+            'incomplete_days': int(incomplete_days[i]),
+            'absent_days': int(absent_days[i]),
+            'payable_days': float(payable_days[i]),
+            'worked_hours': round(float(worked_hours[i]), 2),
+            'late_count': int(late_count[i]),
+            'attendance_percentage': round(float(attendance_percentage[i]), 1),
+        })
+    return results
+
+
+def split_employee_ranges(parts):
+    """Split the employee id space into up to ``parts`` contiguous (first_id, last_id) ranges."""
+    ids = np.fromiter(Employee.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+    if not len(ids):
+        return []
+    return [(int(chunk[0]), int(chunk[-1])) for chunk in np.array_split(ids, max(parts, 1)) if len(chunk)]
+
+
+def _compute_payroll_worker(args):
+    from django.db import connections
+
+    year, month, employee_range, today, late_after = args
+    try:
+        return compute_payroll(year, month, employee_range=employee_range, today=today, late_after=late_after)
+    finally:
+        connections.close_all()
+
+
+def compute_payroll_parallel(year, month, workers, today=None, late_after=None):
+    """Compute payroll across ``workers`` processes, each handling one employee id range."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from django.db import connections
+
+    ranges = split_employee_ranges(workers)
+    if workers <= 1 or len(ranges) <= 1:
+        return compute_payroll(year, month, today=today, late_after=late_after)
+
+    # Forked children must not share the parent's database connection
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    jobs = [(year, month, employee_range, today, late_after) for employee_range in ranges]
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+        for chunk in pool.map(_compute_payroll_worker, jobs):
+            results.extend(chunk)
+    return results
@@ -0,0 +1,150 @@
+"""
+Recompression and thumbnails for check-in/check-out and profile photos.
+
+Uploaded photos are decoded once (``employees.image_decode``); the same RGB array feeds
+face recognition and is then stored as a JPEG no larger than
+``ATTENDANCE_PHOTO_MAX_DIMENSION`` pixels on its long side, plus one small
+JPEG per entry in ``ATTENDANCE_PHOTO_THUMBNAIL_SIZES``. Thumbnails live next
+to the original under ``thumbs/<size>/`` with the same stem, so no extra
+database columns are needed; templates use the ``thumbnail_url`` filter,
+which falls back to the original until ``manage.py process_photos`` has
+backfilled older media.
+"""
+import posixpath
+from io import BytesIO
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .image_decode import decode_image
+
+DEFAULT_THUMBNAIL_SIZES = {'small': 96, 'medium': 320}
+
+
+def get_max_dimension():
+    return int(getattr(settings, 'ATTENDANCE_PHOTO_MAX_DIMENSION', 1280))
+
+
+def get_quality():
+    return int(getattr(settings, 'ATTENDANCE_PHOTO_QUALITY', 82))
+
+
+def get_thumbnail_sizes():
+    return getattr(settings, 'ATTENDANCE_PHOTO_THUMBNAIL_SIZES', DEFAULT_THUMBNAIL_SIZES)
+
+
+def bounded_image(image_array, max_dimension=None):
+    """PIL image from an RGB array, downscaled so neither side exceeds ``max_dimension``."""
+    image = Image.fromarray(image_array) if isinstance(image_array, np.ndarray) else image_array
+    max_dimension = max_dimension or get_max_dimension()
+    if max(image.size) > max_dimension:
+        image = image.copy()
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return image
+
+
+def encode_jpeg(image, quality=None):
+    buffer = BytesIO()
+    image.save(buffer, format='JPEG', quality=quality or get_quality(), optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def thumbnail_name(name, size):
+    """Storage name of the ``size`` thumbnail for the photo stored as ``name``."""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, 'thumbs', size, f'{stem}.jpg')
+
+
+def jpeg_name(name):
+    return f'{posixpath.splitext(name)[0]}.jpg'
+
+
+def render_variants(image_array):
+    """
+    Encode the bounded original and every thumbnail from one decoded image.
+
+    Returns:
+        (original JPEG bytes, {size: JPEG bytes})
+    """
+    original = bounded_image(image_array)
+    thumbnails = {}
+    # Scale each thumbnail from the already-bounded image, largest first
+    source = original
+    for size, pixels in sorted(get_thumbnail_sizes().items(), key=lambda item: -item[1]):
+        source = bounded_image(source, pixels)
+        thumbnails[size] = encode_jpeg(source)
+    return encode_jpeg(original), thumbnails
+
+
+def write_thumbnails(name, thumbnails, storage=None):
+    storage = storage or default_storage
+    for size, data in thumbnails.items():
+        target = thumbnail_name(name, size)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(data))
+
+
+def delete_thumbnails(name, storage=None):
+    storage = storage or default_storage
+    for size in get_thumbnail_sizes():
+        storage.delete(thumbnail_name(name, size))
+
+
+def save_photo(field_file, image_array, name):
+    """
+    Store a recompressed photo and its thumbnails on an ImageField (without
+    saving the model instance).
+
+    Args:
+        field_file: e.g. ``attendance.check_in_photo``
+        image_array: decoded RGB array, as passed to face recognition
+        name: file name; the extension is replaced with ``.jpg``
+    """
+    original, thumbnails = render_variants(image_array)
+    field_file.save(jpeg_name(name), ContentFile(original), save=False)
+    write_thumbnails(field_file.name, thumbnails, field_file.storage)
+
+
+def process_stored_photo(name, recompress=True, force=False, storage=None):
+    """
+    Backfill one stored photo: recompress it if it is oversized or not a JPEG
+    and write missing thumbnails.
+
+    A recompressed original is saved under a new name; the old file is left
+    in place so the caller can delete it after updating the database.
+
+    Returns:
+        dict with 'name', 'new_name' (None if unchanged), 'bytes_before',
+        'bytes_after' and 'thumbnails' (number written)
+    """
+    storage = storage or default_storage
+    result = {'name': name, 'new_name': None, 'bytes_before': 0, 'bytes_after': 0, 'thumbnails': 0}
+    with storage.open(name, 'rb') as handle:
+        data = handle.read()
+    result['bytes_before'] = result['bytes_after'] = len(data)
+
+    with Image.open(BytesIO(data)) as probe:
+        needs_recompress = recompress and (
+            force or probe.format != 'JPEG' or max(probe.size) > get_max_dimension()
+        )
+    missing = force or any(
+        not storage.exists(thumbnail_name(name, size)) for size in get_thumbnail_sizes()
+    )
+    if not needs_recompress and not missing:
+        return result
+
+    image = decode_image(data, get_max_dimension())
+    original, thumbnails = render_variants(image)
+    target = name
+    if needs_recompress and len(original) < len(data):
+        target = storage.save(jpeg_name(name), ContentFile(original))
+        result['new_name'] = target
+        result['bytes_after'] = len(original)
+    write_thumbnails(target, thumbnails, storage)
+    result['thumbnails'] = len(thumbnails)
+    return result
@@ -0,0 +1,101 @@
+"""
+Background writer for check-in/check-out photos.
+
+Views commit the attendance row with ``check_in_photo_pending`` /
+``check_out_photo_pending`` set and hand the decoded image to a small thread
+pool once the transaction commits; the pool recompresses and stores the photo
+(``photo_pipeline.save_photo``), then links it and clears the flag with a
+single-row ``UPDATE``. The response never waits on storage.
+
+Image data only lives in memory, so a process that dies with writes queued
+leaves rows pending; ``manage.py reconcile_attendance_photos`` links files
+that were stored but never linked and clears the flag on the rest. Photos are
+named ``<kind>_<attendance id>.jpg`` so they can be found again.
+
+Set ``ATTENDANCE_PHOTO_SYNC = True`` to write photos inline (tests).
+"""
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Attendance
+from .photo_pipeline import save_photo
+
+logger = logging.getLogger(__name__)
+
+PHOTO_KINDS = {
+    'check_in_photo': 'checkin',
+    'check_out_photo': 'checkout',
+}
+
+_executor = None
+_lock = threading.Lock()
+
+
+def photo_name(field, attendance_id):
+    return f'{PHOTO_KINDS[field]}_{attendance_id}.jpg'
+
+
+def pending_field(field):
+    return f'{field}_pending'
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=int(getattr(settings, 'ATTENDANCE_PHOTO_WRITERS', 2)),
+                    thread_name_prefix='photo-writer',
+                )
+                # Finish queued writes on a clean shutdown
+                atexit.register(_executor.shutdown, wait=True)
+    return _executor
+
+
+def write_photo(attendance_id, field, image_array):
+    """Store, recompress and link one photo, then clear its pending flag."""
+    attendance = Attendance.objects.only('id', 'employee_id', 'date').get(pk=attendance_id)
+    field_file = getattr(attendance, field)
+    save_photo(field_file, image_array, photo_name(field, attendance_id))
+    Attendance.objects.filter(pk=attendance_id).update(**{field: field_file.name, pending_field(field): False})
+
+
+def _write_logged(attendance_id, field, image_array):
+    # The attendance row is already committed: a storage error must not undo
+    # the response; the row stays pending for reconcile_attendance_photos
+    try:
+        write_photo(attendance_id, field, image_array)
+    except Exception:
+        logger.exception('Writing %s for attendance #%s failed', field, attendance_id)
+
+
+def _write_in_background(attendance_id, field, image_array):
+    try:
+        _write_logged(attendance_id, field, image_array)
+    finally:
+        connection.close()
+
+
+def queue_photo(attendance, field, image_array):
+    """
+    Mark ``field`` pending on ``attendance`` and write the photo after the
+    current transaction commits.
+
+    Call inside ``transaction.atomic()`` before saving the attendance row, so
+    the flag is committed before the writer can clear it.
+    """
+    setattr(attendance, pending_field(field), True)
+
+    def submit():
+        if getattr(settings, 'ATTENDANCE_PHOTO_SYNC', False):
+            _write_logged(attendance.pk, field, image_array)
+        else:
+            _get_executor().submit(_write_in_background, attendance.pk, field, image_array)
+
+    transaction.on_commit(submit)
@@ -0,0 +1,190 @@
+"""
+Content-addressed media storage with de-duplication.
+
+``DedupFileSystemStorage`` keeps the names file fields already use
+(``checkin_photos/2026/...jpg``) but stores each distinct content once under
+``MEDIA_ROOT/blobs/ab/cd/<sha256>``. ``StoredFile`` rows map names to
+``MediaBlob`` rows, which count their references; the blob file is removed
+when the last name pointing at it is deleted.
+
+Names without a ``StoredFile`` row are plain files in ``MEDIA_ROOT`` (media
+written before this backend, not yet moved by ``manage.py dedupe_media``)
+and are read, listed and deleted exactly as ``FileSystemStorage`` would.
+URLs are unchanged; ``employees.views.protected_media`` resolves them.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def blob_name(sha256):
+    return posixpath.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def hash_file(path):
+    """SHA-256 hex digest and size of a file on disk."""
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@deconstructible
+class DedupFileSystemStorage(FileSystemStorage):
+    """FileSystemStorage that stores identical content once."""
+
+    def _mapping(self, name):
+        from .models import StoredFile
+        return StoredFile.objects.select_related('blob').filter(name=name).first()
+
+    def blob_path(self, sha256):
+        return super().path(blob_name(sha256))
+
+    def add_blob_reference(self, name, sha256, size, temp_path=None, original_name=''):
+        """
+        Point ``name`` at the blob ``sha256``, creating the blob from
+        ``temp_path`` if this content is new (otherwise ``temp_path`` is removed).
+
+        Returns:
+            True if the blob already existed (the content was a duplicate)
+        """
+        from .models import MediaBlob, StoredFile
+
+        with transaction.atomic():
+            blob, created = MediaBlob.objects.select_for_update().get_or_create(
+                sha256=sha256, defaults={'size': size}
+            )
+            target = self.blob_path(sha256)
+            if temp_path is not None:
+                if created or not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    os.replace(temp_path, target)
+                else:
+                    os.remove(temp_path)
+            MediaBlob.objects.filter(pk=sha256).update(ref_count=F('ref_count') + 1)
+            StoredFile.objects.create(name=name, blob=blob, original_name=original_name[:255])
+        return not created
+
+    def _save(self, name, content):
+        # Hash while copying to a temporary file next to the blobs, so the
+        # blob can be moved into place without a second pass
+        temp_dir = super().path(posixpath.join(BLOB_DIR, 'tmp'))
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=temp_dir, delete=False) as temp:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                if isinstance(chunk, str):
+                    chunk = chunk.encode()
+                digest.update(chunk)
+                temp.write(chunk)
+                size += len(chunk)
+        try:
+            self.add_blob_reference(
+                name, digest.hexdigest(), size, temp.name,
+                original_name=os.path.basename(getattr(content, 'name', None) or name),
+            )
+        except Exception:
+            if os.path.exists(temp.name):
+                os.remove(temp.name)
+            raise
+        return name
+
+    def _open(self, name, mode='rb'):
+        mapping = self._mapping(name)
+        if mapping is None:
+            return super()._open(name, mode)
+        return File(open(self.blob_path(mapping.blob_id), mode), name=name)
+
+    def delete(self, name):
+        from .models import MediaBlob, StoredFile
+
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        with transaction.atomic():
+            mapping = StoredFile.objects.select_for_update().filter(name=name).first()
+            if mapping is None:
+                return super().delete(name)
+            sha256 = mapping.blob_id
+            mapping.delete()
+            MediaBlob.objects.filter(pk=sha256).update(ref_count=F('ref_count') - 1)
+            if MediaBlob.objects.filter(pk=sha256, ref_count__lte=0).delete()[0]:
+                path = self.blob_path(sha256)
+                transaction.on_commit(lambda: _remove_file(path))
+
+    def rename(self, old_name, new_name):
+        """Move a stored name without touching its content. Returns the new name."""
+        from .models import StoredFile
+
+        new_name = self.get_available_name(new_name) if self.exists(new_name) else new_name
+        if not StoredFile.objects.filter(name=old_name).update(name=new_name):
+            old_path, new_path = super().path(old_name), super().path(new_name)
+            os.makedirs(os.path.dirname(new_path), exist_ok=True)
+            os.replace(old_path, new_path)
+        return new_name
+
+    def exists(self, name):
+        from .models import StoredFile
+        return StoredFile.objects.filter(name=name).exists() or super().exists(name)
+
+    def path(self, name):
+        mapping = self._mapping(name)
+        if mapping is None:
+            return super().path(name)
+        # Shared with every other name for the same content: read only
+        return self.blob_path(mapping.blob_id)
+
+    def size(self, name):
+        mapping = self._mapping(name)
+        return mapping.blob.size if mapping else super().size(name)
+
+    def listdir(self, path):
+        from .models import StoredFile
+
+        try:
+            directories, files = super().listdir(path)
+        except FileNotFoundError:
+            directories, files = [], []
+        directories, files = set(directories), set(files)
+        prefix = f"{path.rstrip('/')}/" if path else ''
+        for name in StoredFile.objects.filter(name__startswith=prefix).values_list('name', flat=True):
+            head, _, rest = name[len(prefix):].partition('/')
+            (directories if rest else files).add(head)
+        if not path:
+            directories.discard(BLOB_DIR)
+        return sorted(directories), sorted(files)
+
+    def _mapped_time(self, name, fallback):
+        mapping = self._mapping(name)
+        return mapping.created_at if mapping else fallback(name)
+
+    def get_modified_time(self, name):
+        return self._mapped_time(name, super().get_modified_time)
+
+    def get_created_time(self, name):
+        return self._mapped_time(name, super().get_created_time)
+
+    def get_accessed_time(self, name):
+        return self._mapped_time(name, super().get_accessed_time)
@@ -0,0 +1,85 @@
+"""
+Domain event subscribers that keep derived data in step with model changes.
+
+Imported from ``EmployeesConfig.ready()`` so they are registered once per
+process.
+"""
+import time
+
+from django.db.models.signals import m2m_changed
+
+from .domain_events import (
+    AttendanceCheckedIn,
+    AttendanceCheckedOut,
+    OfficeLocationsChanged,
+    TicketCreated,
+    TicketStatusChanged,
+    domain_bus,
+    emit,
+)
+from .models import OfficeLocation
+
+
+@domain_bus.subscribe(AttendanceCheckedIn)
+def occupancy_check_in(event):
+    from .occupancy import mark_checked_in
+    mark_checked_in(event.employee_id, event.date)
+
+
+@domain_bus.subscribe(AttendanceCheckedOut)
+def occupancy_check_out(event):
+    from .occupancy import mark_checked_out
+    mark_checked_out(event.employee_id, event.date)
+
+
+def _live(event_type, data):
+    from .live_events import bus
+    bus.publish(event_type, dict(data, ts=round(time.time(), 3)))
+
+
+@domain_bus.subscribe(AttendanceCheckedIn)
+def live_check_in(event):
+    _live('check_in', {'employee': event.employee_id, 'name': event.employee_name})
+
+
+@domain_bus.subscribe(AttendanceCheckedOut)
+def live_check_out(event):
+    _live('check_out', {'employee': event.employee_id, 'name': event.employee_name, 'half_day': event.half_day})
+
+
+@domain_bus.subscribe(TicketCreated)
+def live_ticket_created(event):
+    _live('ticket_created', {
+        'ticket': event.ticket_id,
+        'number': event.ticket_number,
+        'status': event.status,
+        'priority': event.priority,
+    })
+
+
+@domain_bus.subscribe(TicketStatusChanged)
+def live_ticket_status(event):
+    _live('ticket_status', {
+        'ticket': event.ticket_id,
+        'number': event.ticket_number,
+        'old_status': event.old_status,
+        'status': event.status,
+        'old_priority': event.old_priority,
+        'priority': event.priority,
+    })
+
+
+@domain_bus.subscribe(OfficeLocationsChanged)
+def office_index_invalidate(event):
+    from .office_index import invalidate_office_index
+    invalidate_office_index()
+
+
+def _office_employees_changed(sender, instance, action, pk_set=None, **kwargs):
+    # Assignments change through the m2m manager, which bypasses save()
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        office_location_id = instance.pk if isinstance(instance, OfficeLocation) else None
+        emit(OfficeLocationsChanged(office_location_id=office_location_id))
+
+
+m2m_changed.connect(_office_employees_changed, sender=OfficeLocation.employees.through)
@@ -0,0 +1,262 @@
+"""
+Small durable background task queue on the application database.
+
+Tasks are rows in ``BackgroundTask``. Workers (``manage.py run_workers``)
+claim a batch by taking a time-limited lease: with
+``select_for_update(skip_locked=True)`` on backends that support it
+(PostgreSQL, MySQL 8, Oracle), and with per-row compare-and-set ``UPDATE``
+statements on SQLite. A task whose lease expires (crashed worker) becomes
+claimable again. Failures are retried with exponential backoff until
+``max_attempts`` is reached.
+
+Register task functions with ``@task('name')`` in ``employees/background_jobs.py``
+and enqueue them with ``enqueue('name', **kwargs)``; payloads must be JSON
+serialisable. Set ``BACKGROUND_TASKS_EAGER = True`` to run tasks inline after
+commit instead (tests, local development without a worker).
+"""
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import BackgroundTask
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name, max_attempts=5):
+    """Register a function as a background task under ``name``."""
+    def register(func):
+        if name in _registry:
+            raise ValueError(f'Task {name} is already registered')
+        func.task_name = name
+        func.max_attempts = max_attempts
+        _registry[name] = func
+        return func
+    return register
+
+
+def get_task(name):
+    _load_tasks()
+    return _registry.get(name)
+
+
+def _load_tasks():
+    # Task functions live in background_jobs; importing registers them
+    from . import background_jobs  # noqa: F401
+
+
+def is_eager():
+    return bool(getattr(settings, 'BACKGROUND_TASKS_EAGER', False))
+
+
+def enqueue(name, run_after=None, **payload):
+    """
+    Queue a task. The row is part of the current transaction, so it only
+    becomes visible to workers if that transaction commits.
+
+    Returns:
+        BackgroundTask instance
+    """
+    func = get_task(name)
+    if func is None:
+        raise ValueError(f'Unknown background task: {name}')
+    background_task = BackgroundTask.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=func.max_attempts,
+        run_after=run_after or timezone.now(),
+    )
+    if is_eager():
+        transaction.on_commit(lambda: run_claimed(_claim_one(background_task.pk, 'eager')))
+    return background_task
+
+
+def backoff_seconds(attempts, base=None, cap=None):
+    """Exponential backoff with jitter for the given attempt number (1-based)."""
+    base = base if base is not None else getattr(settings, 'BACKGROUND_TASKS_RETRY_BASE', 10)
+    cap = cap if cap is not None else getattr(settings, 'BACKGROUND_TASKS_RETRY_CAP', 3600)
+    delay = min(cap, base * (2 ** max(attempts - 1, 0)))
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claimable(now):
+    return BackgroundTask.objects.filter(
+        Q(status='pending', run_after__lte=now) |
+        Q(status='running', locked_until__lt=now)
+    )
+
+
+def _lease_fields(worker_id, now, lease_seconds):
+    return {
+        'status': 'running',
+        'locked_by': worker_id,
+        'locked_until': now + timedelta(seconds=lease_seconds),
+        'started_at': now,
+    }
+
+
+def _claim_one(task_id, worker_id, lease_seconds=300):
+    now = timezone.now()
+    BackgroundTask.objects.filter(pk=task_id, status='pending').update(
+        attempts=F('attempts') + 1, **_lease_fields(worker_id, now, lease_seconds)
+    )
+    return list(BackgroundTask.objects.filter(pk=task_id, locked_by=worker_id, status='running'))
+
+
+def claim_tasks(worker_id, limit=10, lease_seconds=300):
+    """
+    Lease up to ``limit`` runnable tasks for ``worker_id``.
+
+    Returns:
+        list of claimed BackgroundTask instances
+    """
+    now = timezone.now()
+    fields = _lease_fields(worker_id, now, lease_seconds)
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(
+                _claimable(now).select_for_update(skip_locked=True)
+                .order_by('run_after', 'id').values_list('id', flat=True)[:limit]
+            )
+            if ids:
+                BackgroundTask.objects.filter(id__in=ids).update(attempts=F('attempts') + 1, **fields)
+    else:
+        # SQLite: no row locks; claim each candidate with a conditional UPDATE
+        ids = []
+        candidates = _claimable(now).order_by('run_after', 'id').values_list(
+            'id', 'status', 'locked_until'
+        )[:limit * 2]
+        for task_id, status, locked_until in candidates:
+            claimed = BackgroundTask.objects.filter(
+                pk=task_id, status=status, locked_until=locked_until
+            ).update(attempts=F('attempts') + 1, **fields)
+            if claimed:
+                ids.append(task_id)
+            if len(ids) >= limit:
+                break
+
+    if not ids:
+        return []
+    return list(BackgroundTask.objects.filter(id__in=ids, locked_by=worker_id).order_by('run_after', 'id'))
+
+
+def run_claimed(tasks):
+    """
+    Run claimed tasks and record their outcome.
+
+    Returns:
+        list of (task name, succeeded, queue latency seconds, run seconds) tuples
+    """
+    results = []
+    for background_task in tasks:
+        func = get_task(background_task.name)
+        started = time.perf_counter()
+        queued = (timezone.now() - background_task.run_after).total_seconds()
+        try:
+            if func is None:
+                raise LookupError(f'Unknown background task: {background_task.name}')
+            func(**background_task.payload)
+        except Exception:
+            error = traceback.format_exc()
+            logger.exception('Background task %s #%s failed', background_task.name, background_task.pk)
+            _record_failure(background_task, error)
+            results.append((background_task.name, False, queued, time.perf_counter() - started))
+        else:
+            BackgroundTask.objects.filter(pk=background_task.pk, locked_by=background_task.locked_by).update(
+                status='done', finished_at=timezone.now(), locked_until=None, last_error='',
+            )
+            results.append((background_task.name, True, queued, time.perf_counter() - started))
+    return results
+
+
+def _record_failure(background_task, error):
+    update = {'last_error': error[-4000:], 'locked_until': None}
+    if background_task.attempts >= background_task.max_attempts:
+        update.update(status='failed', finished_at=timezone.now())
+    else:
+        update.update(
+            status='pending',
+            run_after=timezone.now() + timedelta(seconds=backoff_seconds(background_task.attempts)),
+        )
+    BackgroundTask.objects.filter(pk=background_task.pk, locked_by=background_task.locked_by).update(**update)
+
+
+def default_worker_id(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+class TaskStats:
+    """Thread-safe per-task latency and throughput accumulator."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.monotonic()
+        self.by_name = {}
+
+    def add(self, results):
+        with self._lock:
+            for name, succeeded, queued, run in results:
+                entry = self.by_name.setdefault(name, {'ok': 0, 'failed': 0, 'queued': [], 'run': []})
+                entry['ok' if succeeded else 'failed'] += 1
+                entry['queued'].append(queued)
+                entry['run'].append(run)
+
+    def merge(self, by_name):
+        """Fold in another accumulator's ``by_name`` (e.g. from a worker process)."""
+        with self._lock:
+            for name, other in by_name.items():
+                entry = self.by_name.setdefault(name, {'ok': 0, 'failed': 0, 'queued': [], 'run': []})
+                for key in entry:
+                    entry[key] += other[key]
+
+    def report(self):
+        """Rows of (name, ok, failed, per second, mean queue s, mean run ms, p95 run ms)."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        rows = []
+        with self._lock:
+            for name, entry in sorted(self.by_name.items()):
+                runs = sorted(entry['run'])
+                count = len(runs)
+                rows.append((
+                    name, entry['ok'], entry['failed'], count / elapsed,
+                    sum(entry['queued']) / count,
+                    sum(runs) / count * 1e3,
+                    runs[min(int(count * 0.95), count - 1)] * 1e3,
+                ))
+        return rows
+
+
+def work(worker_id, stop_event, stats, batch_size=10, poll_interval=1.0, lease_seconds=300, max_tasks=None):
+    """
+    Claim and run tasks until ``stop_event`` is set (or ``max_tasks`` have run).
+    """
+    _load_tasks()
+    processed = 0
+    try:
+        while not stop_event.is_set():
+            tasks = claim_tasks(worker_id, limit=batch_size, lease_seconds=lease_seconds)
+            if not tasks:
+                if max_tasks is not None:
+                    break
+                stop_event.wait(poll_interval)
+                continue
+            stats.add(run_claimed(tasks))
+            processed += len(tasks)
+            if max_tasks is not None and processed >= max_tasks:
+                break
+    finally:
+        connection.close()
+    return processed
@@ -34,3 +34,31 @@ def duration_hours(check_out_time, check_in_time):
     delta = check_out_time - check_in_time
     hours = delta.total_seconds() / 3600
     return round(hours, 2)
+
+@register.filter
+def thumbnail_url(field_file, size='small'):
+    """URL of a stored photo's thumbnail, or of the photo itself until it is backfilled"""
+    from employees.photo_pipeline import thumbnail_name
+
+    if not field_file:
+        return ''
+    name = thumbnail_name(field_file.name, size)
+    if field_file.storage.exists(name):
+        return field_file.storage.url(name)
+    return field_file.url
+
+
+@register.simple_tag
+def img_srcset(field_file, size):
+    """src/srcset attributes for a media image shown at ``size`` CSS pixels, resized on demand"""
+    from django.urls import reverse
+    from django.utils.html import format_html
+    from employees.image_resize import srcset_sizes
+
+    if not field_file:
+        return format_html('src=""')
+    one, two = srcset_sizes(int(size))
+    src = reverse('media_thumbnail', args=[one, field_file.name])
+    if two == one:
+        return format_html('src="{}"', src)
+    return format_html('src="{}" srcset="{} 1x, {} 2x"', src, src, reverse('media_thumbnail', args=[two, field_file.name]))
@@ -1,3 +1,635 @@
-from django.test import TestCase
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import attendance_logger, live_events, task_queue
+from .attendance_logger import (
+    QUARANTINE_NAME, AttendanceEventLogger, build_log_record, log_attendance_event,
+    replay_orphaned_segments, replay_quarantine,
+)
+from .client_fingerprints import get_client_fingerprint_id
+from .domain_events import (
+    AttendanceCheckedIn, AttendanceCheckedOut, EventBus, OfficeLocationsChanged, TicketCreated, capture_events,
+)
+from .location_token import issue_token
+from .models import (
+    Attendance, AttendanceLog, BackgroundTask, ClientFingerprint, Employee, MediaBlob, OfficeLocation, StoredFile,
+)
+from .occupancy import get_day_state
+from .office_index import VERSION_KEY
+from .photo_pipeline import render_variants, save_photo, thumbnail_name, write_thumbnails
+from .storage import DedupFileSystemStorage
+from .task_queue import backoff_seconds, claim_tasks, enqueue, run_claimed
+from .pagination import KeysetPaginator, decode_cursor, encode_cursor
+
+
+def make_employee(username='emp', **fields):
+    """Employee with its own login account."""
+    user = User.objects.create_user(username=username, password='pw')
+    fields.setdefault('name', username.title())
+    fields.setdefault('full_name', f'{username.title()} Test')
+    fields.setdefault('email', f'{username}@example.com')
+    return Employee.objects.create(user=user, **fields)
+
+
+class KeysetPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.employee = make_employee()
+        base = timezone.now().replace(microsecond=0)
+        # Pairs of rows share a timestamp, so every page boundary falls on a tie
+        logs = [
+            AttendanceLog(employee=cls.employee, action='check_in_success', timestamp=base - timedelta(minutes=i // 2))
+            for i in range(11)
+        ]
+        AttendanceLog.objects.bulk_create(logs)
+        cls.expected = list(AttendanceLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def paginator(self, per_page=3):
+        return KeysetPaginator(AttendanceLog.objects.all(), per_page, key=('timestamp', 'id'))
+
+    def ids(self, page):
+        return [log.id for log in page]
+
+    def walk_forward(self, paginator):
+        pages = [paginator.get_page()]
+        while pages[-1].has_next:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        return pages
+
+    def test_cursor_round_trip(self):
+        token = encode_cursor(['2025-01-02 03:04:05+00:00', 7], 'prev', 20)
+        self.assertEqual(decode_cursor(token), {'k': ['2025-01-02 03:04:05+00:00', 7], 'd': 'prev', 'o': 20})
+
+    def test_forward_walk_covers_every_row_once_across_ties(self):
+        pages = self.walk_forward(self.paginator())
+        self.assertEqual([log_id for page in pages for log_id in self.ids(page)], self.expected)
+        self.assertEqual([page.number for page in pages], [1, 2, 3, 4])
+        self.assertFalse(pages[0].has_previous)
+        self.assertEqual((pages[-1].start_index, pages[-1].end_index), (10, 11))
+
+    def test_backward_walk_returns_the_same_pages(self):
+        paginator = self.paginator()
+        forward = self.walk_forward(paginator)
+        page = forward[-1]
+        backward = [page]
+        while page.has_previous:
+            page = paginator.get_page(page.previous_cursor)
+            backward.append(page)
+        self.assertEqual([self.ids(page) for page in reversed(backward)], [self.ids(page) for page in forward])
+        self.assertEqual(backward[-1].number, 1)
+        self.assertTrue(backward[-1].has_next)
+
+    def test_malformed_cursor_gives_first_page(self):
+        first = self.ids(self.paginator().get_page())
+        for token in ('not-base64!', 'e30', encode_cursor([1, 2], 'sideways', 0)):
+            with self.subTest(token=token):
+                self.assertIsNone(decode_cursor(token))
+                self.assertEqual(self.ids(self.paginator().get_page(token)), first)
+
+    def test_tampered_key_values_give_first_page(self):
+        page = self.paginator().get_page(encode_cursor(['not a date', 'x'], 'next', 3))
+        self.assertEqual(self.ids(page), self.expected[:3])
+        self.assertFalse(page.has_previous)
+        self.assertEqual(page.number, 1)
+
+    def test_short_key_list_gives_first_page(self):
+        page = self.paginator().get_page(encode_cursor([], 'next', 3))
+        self.assertEqual(self.ids(page), self.expected[:3])
+
+
+class AttendanceLogSpoolTests(TransactionTestCase):
+    """Spool, claim, quarantine and replay; real commits, since refused rows abort a wrapping transaction."""
+
+    def setUp(self):
+        self.employee = make_employee()
+        self.spool_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.spool_dir, ignore_errors=True)
+        # Fingerprint ids are cached per process and the table is flushed between tests
+        get_client_fingerprint_id.cache_clear()
+
+    def logger(self, **options):
+        # A long interval keeps the background flusher out of the way
+        options.setdefault('flush_interval', 3600)
+        return AttendanceEventLogger(spool_dir=self.spool_dir, **options)
+
+    def record(self, **fields):
+        fields.setdefault('action', 'check_in_success')
+        return build_log_record(employee=self.employee, user_agent='test-agent', ip_address='10.0.0.1', **fields)
+
+    def segments(self):
+        return sorted(name for name in os.listdir(self.spool_dir) if name != QUARANTINE_NAME)
+
+    def write_segment(self, name, records):
+        path = os.path.join(self.spool_dir, name)
+        with open(path, 'w', encoding='utf-8') as handle:
+            handle.write(''.join(attendance_logger._encode_record(record) + '\n' for record in records))
+        return path
+
+    @override_settings(ATTENDANCE_LOG_SYNC=True)
+    def test_sync_mode_writes_immediately(self):
+        log = log_attendance_event(employee=self.employee, action='check_in_failed', success=False,
+                                   failure_reason='photo_required', user_agent='test-agent', ip_address='10.0.0.1')
+        self.assertIsNotNone(log.pk)
+        self.assertEqual(AttendanceLog.objects.get().client.user_agent, 'test-agent')
+
+    def test_flush_writes_buffer_and_removes_segment(self):
+        logger = self.logger()
+        logger.log(self.record())
+        logger.log(self.record(action='check_out_success'))
+        self.assertEqual(len(self.segments()), 1)
+        self.assertEqual(AttendanceLog.objects.count(), 0)
+
+        self.assertEqual(logger.flush(), 2)
+        self.assertEqual(AttendanceLog.objects.count(), 2)
+        self.assertEqual(self.segments(), [])
+
+    def test_process_logger_flushes_at_exit(self):
+        with mock.patch.object(attendance_logger, '_logger_instance', None), \
+                mock.patch.object(attendance_logger.atexit, 'register') as register:
+            logger = attendance_logger.get_attendance_logger()
+        register.assert_called_once_with(logger.flush)
+
+    @skipIf(attendance_logger.fcntl is None, 'segment locks need fcntl')
+    def test_locked_segment_is_not_claimed(self):
+        path = self.write_segment('attendance-logs-1-live.jsonl', [self.record()])
+        with open(path, 'r', encoding='utf-8') as writer:
+            # Another open file holding the lock stands for a live writer process
+            attendance_logger.fcntl.flock(writer, attendance_logger.fcntl.LOCK_EX)
+            self.assertEqual(replay_orphaned_segments(self.spool_dir), (0, 0))
+            self.assertEqual(self.segments(), ['attendance-logs-1-live.jsonl'])
+        self.assertEqual(replay_orphaned_segments(self.spool_dir), (1, 1))
+        self.assertEqual(self.segments(), [])
+
+    def test_claimed_segment_is_written_once(self):
+        path = self.write_segment('attendance-logs-1-orphan.jsonl', [self.record(), self.record()])
+        claim = attendance_logger._claim_segment(path, self.spool_dir, include_live=True)
+        self.assertIsNotNone(claim)
+        claimed, handle = claim
+        self.addCleanup(handle.close)
+        self.assertFalse(os.path.exists(path))
+        # The claimed name belongs to this process and is held: a concurrent replay skips it
+        self.assertIsNone(attendance_logger._claim_segment(path, self.spool_dir, include_live=True))
+        if attendance_logger.fcntl is not None:
+            self.assertEqual(replay_orphaned_segments(self.spool_dir, include_live=True), (0, 0))
+        self.assertEqual(AttendanceLog.objects.count(), 0)
+
+    def test_poison_entry_is_quarantined_after_max_attempts(self):
+        logger = self.logger(max_attempts=2)
+        logger.log(self.record())
+        logger.log(self.record(action=None))  # NOT NULL violation
+        logger.log(self.record(action='check_out_success'))
+
+        with self.assertLogs('employees.attendance_logger', 'ERROR'):
+            self.assertEqual(logger.flush(), 0)
+        self.assertEqual(len(self.segments()), 1)
+
+        with self.assertLogs('employees.attendance_logger', 'ERROR'):
+            self.assertEqual(logger.flush(), 2)
+        self.assertEqual(set(AttendanceLog.objects.values_list('action', flat=True)),
+                         {'check_in_success', 'check_out_success'})
+        self.assertEqual(self.segments(), [])
+        quarantined = attendance_logger.read_segment(os.path.join(self.spool_dir, QUARANTINE_NAME))
+        self.assertEqual([record['action'] for record in quarantined], [None])
+
+        # Still refused: stays quarantined; later entries keep flowing
+        with self.assertLogs('employees.attendance_logger', 'ERROR'):
+            self.assertEqual(replay_quarantine(self.spool_dir), (0, 1))
+        logger.log(self.record())
+        self.assertEqual(logger.flush(), 1)
+
+    def test_replay_quarantine_writes_repaired_entries(self):
+        attendance_logger.quarantine_records([self.record()], self.spool_dir)
+        self.assertEqual(replay_quarantine(self.spool_dir), (1, 0))
+        self.assertEqual(AttendanceLog.objects.count(), 1)
+        self.assertFalse(os.listdir(self.spool_dir))
+
+    def test_stale_fingerprint_id_is_refreshed(self):
+        logger = self.logger()
+        logger.log(self.record())
+        logger.flush()
+        stale = AttendanceLog.objects.get().client_id
+        # Deleted (e.g. merged by a cleanup) while this process still caches its id
+        ClientFingerprint.objects.filter(pk=stale).delete()
+
+        logger.log(self.record())
+        self.assertEqual(logger.flush(), 1)
+        with override_settings(ATTENDANCE_LOG_SYNC=True):
+            log = log_attendance_event(employee=self.employee, action='check_out_success',
+                                       user_agent='test-agent', ip_address='10.0.0.1')
+        fresh = ClientFingerprint.objects.get()
+        self.assertNotEqual(fresh.pk, stale)
+        self.assertEqual(log.client_id, fresh.pk)
+        self.assertEqual(AttendanceLog.objects.filter(client=fresh).count(), 2)
+
+    def test_replay_after_crash(self):
+        # A worker spools an entry and dies before any flush
+        script = (
+            'import os, django; django.setup()\n'
+            'from employees.attendance_logger import log_attendance_event\n'
+            f'log_attendance_event(employee_id={self.employee.pk}, action="check_in_success", user_agent="crashed")\n'
+            'os._exit(1)\n'
+        )
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE='config.settings',
+                   ATTENDANCE_LOG_SPOOL_DIR=self.spool_dir, ATTENDANCE_LOG_SYNC='False')
+        subprocess.run([sys.executable, '-c', script], cwd=settings.BASE_DIR, env=env, check=False, timeout=60)
+        self.assertEqual(len(self.segments()), 1)
+
+        # The next flush of any logger replays it; a torn trailing line is skipped
+        with open(os.path.join(self.spool_dir, self.segments()[0]), 'a', encoding='utf-8') as handle:
+            handle.write('{"employee_id": 1, "acti')
+        with self.assertLogs('employees.attendance_logger', 'WARNING'):
+            self.assertEqual(self.logger().flush(), 0)
+        self.assertEqual(AttendanceLog.objects.get().client.user_agent, 'crashed')
+        self.assertEqual(self.segments(), [])
+
+
+class DomainEventTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = make_employee()
+
+    def check_in(self):
+        now = timezone.now()
+        return Attendance.objects.create(employee=self.employee, date=now.date(), check_in_time=now)
+
+    def test_events_are_dispatched_only_after_commit(self):
+        with capture_events() as events:
+            with self.captureOnCommitCallbacks() as callbacks:
+                attendance = self.check_in()
+                self.assertEqual(events, [])
+            self.assertEqual(events, [])
+            for callback in callbacks:
+                callback()
+        self.assertEqual([type(event) for event in events], [AttendanceCheckedIn])
+        self.assertEqual(events[0].attendance_id, attendance.pk)
+
+    def test_rolled_back_changes_emit_nothing(self):
+        with capture_events() as events, self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.check_in()
+                transaction.set_rollback(True)
+        self.assertEqual(events, [])
+
+    def test_check_out_emits_once(self):
+        attendance = self.check_in()
+        with capture_events() as events, self.captureOnCommitCallbacks(execute=True):
+            attendance.check_out_time = timezone.now()
+            attendance.save()
+            attendance.save()
+        self.assertEqual([type(event) for event in events], [AttendanceCheckedOut])
+
+    def test_subscribers_update_occupancy_and_live_events(self):
+        today = timezone.now().date()
+        self.assertEqual(get_day_state(today)['in'], set())  # warm cache, so only the subscriber can add to it
+        with mock.patch.object(live_events.bus, 'publish') as publish:
+            with capture_events(), self.captureOnCommitCallbacks(execute=True):
+                self.check_in()
+        self.assertEqual(get_day_state(today)['in'], {self.employee.pk})
+        publish.assert_called_once()
+        self.assertEqual(publish.call_args.args[0], 'check_in')
+        self.assertEqual(publish.call_args.args[1]['employee'], self.employee.pk)
+
+    def test_office_location_change_invalidates_index(self):
+        version = cache.get(VERSION_KEY, 0)
+        with capture_events() as events, self.captureOnCommitCallbacks(execute=True):
+            office = OfficeLocation.objects.create(name='HQ', latitude=1, longitude=1, radius_meters=100)
+            office.employees.add(self.employee)
+        self.assertEqual([type(event) for event in events], [OfficeLocationsChanged, OfficeLocationsChanged])
+        self.assertEqual(cache.get(VERSION_KEY), version + 2)
+
+    def test_deferred_subscribers_run_inline_and_failures_are_isolated(self):
+        bus = EventBus(max_workers=1)
+        seen = []
+        bus.subscribe(TicketCreated, seen.append, deferred=True, name='deferred')
+        bus.subscribe(TicketCreated, lambda event: 1 / 0, name='broken')
+        event = TicketCreated(ticket_id=1, ticket_number='T-1', employee_id=1, status='open', priority='low')
+        with capture_events(bus) as events, self.assertLogs('employees.domain_events', 'ERROR'):
+            with self.captureOnCommitCallbacks(execute=True):
+                bus.emit(event)
+        self.assertEqual(events, [event])
+        self.assertEqual(seen, [event])
+        metrics = bus.metrics()
+        self.assertEqual((metrics['deferred']['calls'], metrics['broken']['errors']), (1, 1))
+
+
+class MediaRootMixin:
+    """Run the test against an empty MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls = []
+        self.calls = calls
+
+        def record(**payload):
+            calls.append(payload)
+
+        def fail(**payload):
+            raise RuntimeError('boom')
+
+        record.max_attempts = fail.max_attempts = 2
+        registry = mock.patch.dict(task_queue._registry, {'tests.record': record, 'tests.fail': fail})
+        registry.start()
+        self.addCleanup(registry.stop)
+
+    def claim_paths(self):
+        """Both claim implementations: conditional UPDATEs (SQLite) and select_for_update(skip_locked)."""
+        for skip_locked in (False, True):
+            with self.subTest(skip_locked=skip_locked), \
+                    mock.patch.object(connection.features, 'has_select_for_update_skip_locked', skip_locked):
+                BackgroundTask.objects.all().delete()
+                yield
+
+    def test_claim_leases_due_tasks_once(self):
+        for _ in self.claim_paths():
+            due = [enqueue('tests.record', n=n) for n in range(3)]
+            enqueue('tests.record', run_after=timezone.now() + timedelta(hours=1))
+
+            first = claim_tasks('worker-a', limit=2)
+            self.assertEqual([t.pk for t in first], [due[0].pk, due[1].pk])
+            self.assertEqual({(t.status, t.locked_by, t.attempts) for t in first}, {('running', 'worker-a', 1)})
+            self.assertEqual([t.pk for t in claim_tasks('worker-b', limit=10)], [due[2].pk])
+            self.assertEqual(claim_tasks('worker-c'), [])
+
+    def test_expired_lease_is_reclaimed_and_the_old_worker_cannot_finish_it(self):
+        for _ in self.claim_paths():
+            enqueue('tests.record', n=1)
+            (stale,) = claim_tasks('worker-a')
+            BackgroundTask.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+            (reclaimed,) = claim_tasks('worker-b')
+            self.assertEqual((reclaimed.locked_by, reclaimed.attempts), ('worker-b', 2))
+            run_claimed([stale])  # the crashed worker wakes up
+            self.assertEqual(BackgroundTask.objects.get().status, 'running')
+            run_claimed([reclaimed])
+            self.assertEqual(BackgroundTask.objects.get().status, 'done')
+            self.assertEqual(self.calls[-2:], [{'n': 1}, {'n': 1}])
+
+    def test_failures_are_retried_with_backoff_until_max_attempts(self):
+        background_task = enqueue('tests.fail')
+        with self.assertLogs('employees.task_queue', 'ERROR'):
+            self.assertEqual(run_claimed(claim_tasks('worker'))[0][:2], ('tests.fail', False))
+        background_task.refresh_from_db()
+        self.assertEqual((background_task.status, background_task.attempts), ('pending', 1))
+        self.assertIn('RuntimeError: boom', background_task.last_error)
+        self.assertGreater(background_task.run_after, timezone.now())
+        self.assertEqual(claim_tasks('worker'), [])  # backing off
+
+        BackgroundTask.objects.filter(pk=background_task.pk).update(run_after=timezone.now())
+        with self.assertLogs('employees.task_queue', 'ERROR'):
+            run_claimed(claim_tasks('worker'))
+        background_task.refresh_from_db()
+        self.assertEqual((background_task.status, background_task.attempts), ('failed', 2))
+        self.assertIsNotNone(background_task.finished_at)
+
+    def test_backoff_grows_exponentially_with_jitter_up_to_the_cap(self):
+        for attempts, expected in ((1, 10), (3, 40), (20, 100)):
+            delay = backoff_seconds(attempts, base=10, cap=100)
+            self.assertTrue(expected * 0.8 <= delay <= expected * 1.2, (attempts, delay))
+
+    def test_enqueue_is_transactional_and_runs_after_commit_when_eager(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                enqueue('tests.record', n=1)
+                transaction.set_rollback(True)
+        self.assertFalse(BackgroundTask.objects.exists())
+
+        with override_settings(BACKGROUND_TASKS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            enqueue('tests.record', n=2)
+            self.assertEqual(self.calls, [])
+        self.assertEqual(self.calls, [{'n': 2}])
+        self.assertEqual(BackgroundTask.objects.get().status, 'done')
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            enqueue('tests.missing')
+
+
+class EmployeeDeleteTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.employee = make_employee()
+        image = np.zeros((60, 80, 3), dtype=np.uint8)
+        now = timezone.now()
+        self.attendance = Attendance(employee=self.employee, date=now.date(), check_in_time=now)
+        save_photo(self.attendance.check_in_photo, image, 'in.jpg')
+        save_photo(self.attendance.check_out_photo, image, 'out.jpg')
+        self.attendance.save()
+        self.employee.profile_picture.save('face.jpg', ContentFile(render_variants(image)[0]), save=True)
+        write_thumbnails(self.employee.profile_picture.name, render_variants(image)[1])
+        AttendanceLog.objects.create(employee=self.employee, action='check_in_success')
+
+        self.names = []
+        for name in (self.attendance.check_in_photo.name, self.attendance.check_out_photo.name,
+                     self.employee.profile_picture.name):
+            self.names += [name, thumbnail_name(name, 'small'), thumbnail_name(name, 'medium')]
+        self.assertTrue(all(default_storage.exists(name) for name in self.names))
+
+    def test_delete_view_deactivates_and_enqueues(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'pw')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('employees:employee_delete', args=[self.employee.pk]))
+        self.assertRedirects(response, reverse('employees:employee_list'), fetch_redirect_response=False)
+
+        self.assertFalse(User.objects.get(pk=self.employee.user_id).is_active)
+        self.assertTrue(Employee.objects.filter(pk=self.employee.pk).exists())
+        background_task = BackgroundTask.objects.get()
+        self.assertEqual((background_task.name, background_task.status), ('employees.delete_employee', 'pending'))
+        self.assertEqual(background_task.payload, {'employee_id': self.employee.pk, 'user_id': self.employee.user_id})
+
+    def test_delete_task_removes_rows_photos_and_thumbnails(self):
+        enqueue('employees.delete_employee', employee_id=self.employee.pk, user_id=self.employee.user_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            results = run_claimed(claim_tasks('worker'))
+        self.assertEqual([result[:2] for result in results], [('employees.delete_employee', True)])
+
+        self.assertFalse(Employee.objects.exists())
+        self.assertFalse(User.objects.filter(pk=self.employee.user_id).exists())
+        self.assertFalse(Attendance.objects.exists())
+        self.assertFalse(AttendanceLog.objects.exists())
+        self.assertEqual([name for name in self.names if default_storage.exists(name)], [])
+        self.assertFalse(MediaBlob.objects.exists())
+
+        # Safe to run again (a retried lease)
+        task_queue.get_task('employees.delete_employee')(employee_id=self.employee.pk, user_id=self.employee.user_id)
+
+
+@override_settings(ATTENDANCE_PHOTO_SYNC=True, ATTENDANCE_LOG_SYNC=True)
+class CheckInPhotoTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        get_client_fingerprint_id.cache_clear()  # ids from rolled-back tests
+        self.encoding = np.linspace(-0.2, 0.2, 128)
+        self.employee = make_employee(face_registered=True, profile_picture='profile_pics/face.jpg')
+        self.employee.set_face_encoding(self.encoding)
+        self.employee.save()
+        self.client.force_login(self.employee.user)
+
+    def check_in(self):
+        photo = SimpleUploadedFile('capture.jpg', render_variants(np.zeros((60, 80, 3), dtype=np.uint8))[0],
+                                   content_type='image/jpeg')
+        data = {
+            'check_in_photo': photo,
+            'location_token': issue_token(self.employee.pk, 'check_in', '26.8754010', '75.7530710'),
+        }
+        # Face detection is not under test: the capture "contains" the registered face
+        with mock.patch('employees.views.extract_face_encoding_from_array', return_value=self.encoding), \
+                self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('employees:check_in'), data)
+
+    def test_sync_write_links_photo_and_clears_pending_flag(self):
+        response = self.check_in()
+        self.assertRedirects(response, reverse('employees:employee_dashboard'), fetch_redirect_response=False)
+        attendance = Attendance.objects.get()
+        self.assertFalse(attendance.check_in_photo_pending)
+        self.assertTrue(attendance.check_in_photo.name.endswith(f'checkin_{attendance.pk}.jpg'))
+        self.assertTrue(default_storage.exists(attendance.check_in_photo.name))
+        self.assertTrue(default_storage.exists(thumbnail_name(attendance.check_in_photo.name, 'small')))
+        self.assertEqual(AttendanceLog.objects.get().action, 'check_in_success')
+
+    def test_storage_error_after_commit_keeps_the_check_in(self):
+        with mock.patch('employees.photo_writer.save_photo', side_effect=OSError('disk full')), \
+                self.assertLogs('employees.photo_writer', 'ERROR'):
+            response = self.check_in()
+        self.assertRedirects(response, reverse('employees:employee_dashboard'), fetch_redirect_response=False)
+        attendance = Attendance.objects.get()
+        self.assertTrue(attendance.check_in_photo_pending)
+        self.assertFalse(attendance.check_in_photo)
+
+
+class DedupStorageTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.storage = DedupFileSystemStorage()
+
+    def save(self, name, data=b'same bytes'):
+        return self.storage.save(name, ContentFile(data))
+
+    def blob_path(self):
+        return self.storage.blob_path(MediaBlob.objects.get().pk)
+
+    def test_identical_content_shares_one_blob(self):
+        first, second = self.save('a/one.jpg'), self.save('b/two.jpg')
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(set(StoredFile.objects.values_list('name', 'blob')), {(first, blob.pk), (second, blob.pk)})
+        self.assertEqual(self.storage.path(first), self.storage.path(second))
+        with self.storage.open(second) as handle:
+            self.assertEqual(handle.read(), b'same bytes')
+        self.assertEqual(self.storage.size(first), len(b'same bytes'))
+
+    def test_blob_is_removed_with_its_last_name(self):
+        first, second = self.save('a/one.jpg'), self.save('b/two.jpg')
+        path = self.blob_path()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(first)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+        self.assertTrue(os.path.exists(path))
+        self.assertFalse(self.storage.exists(first))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(second)
+            self.storage.delete(second)  # already gone: no-op
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_distinct_content_gets_distinct_blobs(self):
+        self.save('a/one.jpg', b'one')
+        self.save('a/two.jpg', b'two')
+        self.assertEqual(sorted(MediaBlob.objects.values_list('ref_count', flat=True)), [1, 1])
+
+    def test_taken_name_gets_an_alternative(self):
+        first, second = self.save('a/one.jpg'), self.save('a/one.jpg')
+        self.assertNotEqual(first, second)
+        self.assertEqual(MediaBlob.objects.get().ref_count, 2)
+
+    def test_rename_keeps_the_blob(self):
+        name = self.save('a/one.jpg')
+        renamed = self.storage.rename(name, 'c/moved.jpg')
+        self.assertEqual(renamed, 'c/moved.jpg')
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(StoredFile.objects.get().name, 'c/moved.jpg')
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+    def test_listdir_merges_mapped_and_plain_files(self):
+        self.save('photos/2026/one.jpg')
+        self.save('photos/two.jpg')
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, 'photos'), exist_ok=True)
+        with open(os.path.join(settings.MEDIA_ROOT, 'photos', 'legacy.jpg'), 'wb') as handle:
+            handle.write(b'legacy')
+        self.assertEqual(self.storage.listdir('photos'), (['2026'], ['legacy.jpg', 'two.jpg']))
+        self.assertEqual(self.storage.listdir('photos/2026'), ([], ['one.jpg']))
+
+        # Plain files are deleted like FileSystemStorage would
+        self.storage.delete('photos/legacy.jpg')
+        self.assertFalse(self.storage.exists('photos/legacy.jpg'))
+
+    def test_rolled_back_save_leaves_no_rows(self):
+        with transaction.atomic():
+            self.save('a/one.jpg')
+            transaction.set_rollback(True)
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(MediaBlob.objects.exists())
+        self.assertFalse(self.storage.exists('a/one.jpg'))
+
+
+class ProtectedMediaTests(MediaRootMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.employee = make_employee()
+        self.image = np.zeros((60, 80, 3), dtype=np.uint8)
+        self.employee.profile_picture.save('face.jpg', ContentFile(render_variants(self.image)[0]), save=True)
+        self.thumbnail = thumbnail_name(self.employee.profile_picture.name, 'small')
+        write_thumbnails(self.employee.profile_picture.name, render_variants(self.image)[1])
+        self.url = reverse('protected_media', args=[self.thumbnail])
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        if hasattr(response, 'streaming_content'):
+            b''.join(response.streaming_content)
+        return response
+
+    def test_replaced_thumbnail_is_revalidated(self):
+        self.client.force_login(self.employee.user)
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+        old_etag = response['ETag']
+        self.assertEqual(self.get(If_None_Match=old_etag).status_code, 304)
+
+        # Rewritten under the same name, as process_photos --force does
+        with self.captureOnCommitCallbacks(execute=True):
+            write_thumbnails(self.employee.profile_picture.name, render_variants(self.image + 255)[1])
+        response = self.get(If_None_Match=old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], old_etag)
+
+    def test_other_employees_get_404(self):
+        self.client.force_login(make_employee('other').user)
+        self.assertEqual(self.get().status_code, 404)
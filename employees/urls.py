@@ -36,14 +36,25 @@
     # Check-in URLs (Employee only)
     path('check-in/', views.check_in, name='check_in'),
     path('check-out/', views.check_out, name='check_out'),
+    path('api/location-precheck/', views.location_precheck, name='location_precheck'),
     path('api/check-in-status/', views.check_in_status, name='check_in_status'),
 
     # Attendance URLs
     path('attendance/', views.AttendanceListView.as_view(), name='attendance_list'),  # Admin only
+    path('attendance/export/', views.attendance_export, name='attendance_export'),  # Admin only - CSV/XLSX export
+    path('attendance/occupancy/', views.admin_occupancy, name='admin_occupancy'),  # Admin only - Live occupancy board (JSON)
+    path('live/events/', views.admin_live_events, name='admin_live_events'),  # Admin only - Server-Sent Events stream (ASGI)
+    path('live/counters/', views.admin_live_counters, name='admin_live_counters'),  # Admin only - Dashboard counters polled under WSGI (JSON)
+    path('live/event-metrics/', views.admin_event_metrics, name='admin_event_metrics'),  # Admin only - Domain event subscriber timings (JSON)
     path('my-attendance/', views.my_attendance_logs, name='my_attendance_logs'),  # Employee only
     path('attendance-logs/', views.admin_attendance_logs, name='admin_attendance_logs'),  # Admin only - All activity logs
+    path('attendance-logs/export/', views.admin_attendance_logs_export, name='admin_attendance_logs_export'),  # Admin only - CSV/XLSX export
+    path('attendance-logs/archive/', views.admin_attendance_logs_archive, name='admin_attendance_logs_archive'),  # Admin only - Archived logs export
+    path('location-audit/', views.admin_location_audit, name='admin_location_audit'),  # Admin only - Suspicious coordinates report
     path('attendance/calendar/', views.employee_attendance_calendar, name='attendance_calendar'),  # Employee - Calendar view
     path('attendance/admin-calendar/', views.admin_attendance_calendar, name='admin_attendance_calendar'),  # Admin - Calendar view
+    path('attendance/admin-calendar/day/<str:day>/', views.admin_attendance_calendar_day, name='admin_attendance_calendar_day'),  # Admin - Day drill-down (JSON)
+    path('attendance/admin-calendar/matrix/', views.admin_attendance_matrix, name='admin_attendance_matrix'),  # Admin - Heatmap data (JSON)
 
     # Face Recognition URLs
     path('face/register/', views.face_registration, name='face_register'),
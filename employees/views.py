@@ -6,7 +6,7 @@
 from django.views.generic import TemplateView, ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
 from django.utils.decorators import method_decorator
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
 from django.db.models import Q, Min, Max
 from django.utils import timezone
 from django.http import JsonResponse
@@ -14,21 +14,28 @@
 from web_project import TemplateLayout
 from web_project.template_helpers.theme import TemplateHelper
 
-import cv2
-import numpy as np
 import face_recognition
-from django.core.files.base import ContentFile
-from io import BytesIO
-from PIL import Image
-import base64
+import posixpath
 
 from .models import Employee, Attendance
 from django.contrib.auth.forms import PasswordChangeForm
 
 from .forms import EmployeeForm, EmployeeUpdateForm, SuperAdminProfileForm
+from .filters import filter_attendance, filter_attendance_logs
+from .pagination import KeysetPaginator
+from .image_decode import (
+    ImageDecodeError,
+    ImageTooLarge,
+    decode_image,
+    decode_upload,
+    get_capture_options,
+    read_image_upload,
+)
+from .photo_pipeline import get_max_dimension, save_photo
+from .photo_writer import queue_photo
 from .face_utils import (
     extract_face_encoding,
-    extract_face_encoding_from_file,
+    extract_face_encoding_from_array,
     compare_faces,
     get_match_tolerance,
     get_strict_match_tolerance,
@@ -39,7 +46,7 @@
 from django.contrib.auth.hashers import make_password
 from .models import PasswordResetRequest
 
-from datetime import datetime, date, timedelta
+from datetime import MAXYEAR, MINYEAR, datetime, date, timedelta
 
 
 def get_working_days(start_date: date, end_date: date) -> int:
@@ -186,10 +193,30 @@ def logout_view(request):
 
 
 # Dashboard Views
+def _live_counters(today):
+    """Dashboard counters kept current by the live stream or by polling"""
+    from employees.models import Ticket
+
+    return {
+        'today_checkins': Attendance.objects.filter(date=today).count(),
+        'today_checkouts': Attendance.objects.filter(date=today, check_out_time__isnull=False).count(),
+        'open_tickets': Ticket.objects.filter(status='open').count(),
+        'urgent_tickets': Ticket.objects.filter(priority='urgent', status__in=['open', 'in_progress']).count(),
+    }
+
+
+def _serves_event_streams(request):
+    """Whether this request is served over ASGI, where endless streaming responses work"""
+    from django.core.handlers.asgi import ASGIRequest
+
+    return isinstance(request, ASGIRequest)
+
+
 @login_required
 @user_passes_test(is_superadmin)
 def admin_dashboard(request):
     """Admin dashboard view with comprehensive statistics"""
+    from django.conf import settings
     from django.utils import timezone
     from django.db.models import Count, Q
     from datetime import timedelta
@@ -205,8 +232,9 @@ def admin_dashboard(request):
     active_employees = Employee.objects.filter(user__is_active=True).count()
     
     # Attendance Statistics
-    today_checkins = Attendance.objects.filter(date=today).count()
-    today_checkouts = Attendance.objects.filter(date=today, check_out_time__isnull=False).count()
+    counters = _live_counters(today)
+    today_checkins = counters['today_checkins']
+    today_checkouts = counters['today_checkouts']
     incomplete_today = today_checkins - today_checkouts
     
     # Weekly attendance trend
@@ -220,8 +248,8 @@ def admin_dashboard(request):
         })
     
     # Ticket Statistics
-    open_tickets = Ticket.objects.filter(status='open').count()
-    urgent_tickets = Ticket.objects.filter(priority='urgent', status__in=['open', 'in_progress']).count()
+    open_tickets = counters['open_tickets']
+    urgent_tickets = counters['urgent_tickets']
     resolved_today = Ticket.objects.filter(resolved_at__date=today).count()
     
     # Password Reset Requests
@@ -267,6 +295,9 @@ def admin_dashboard(request):
         'today_checkins': today_checkins,
         'today_checkouts': today_checkouts,
         'incomplete_today': incomplete_today,
+        # Server-Sent Events need ASGI; under WSGI the page polls admin_live_counters
+        'live_events_sse': _serves_event_streams(request),
+        'live_counters_poll_ms': int(getattr(settings, 'LIVE_COUNTERS_POLL_SECONDS', 15) * 1000),
         'open_tickets': open_tickets,
         'urgent_tickets': urgent_tickets,
         'resolved_today': resolved_today,
@@ -436,14 +467,13 @@ def my_attendance_logs(request):
     """Employee attendance logs view - shows detailed attendance history"""
     employee = request.user.employee_profile
     from django.utils import timezone
-    from django.core.paginator import Paginator
     
     # Get filter parameters
     month = request.GET.get('month')
     year = request.GET.get('year')
     
     # Base queryset
-    attendance_records = Attendance.objects.filter(employee=employee).order_by('-date')
+    attendance_records = Attendance.objects.filter(employee=employee).order_by('-check_in_time', '-id')
     
     filter_kwargs = {}
     if month:
@@ -454,10 +484,9 @@ def my_attendance_logs(request):
     if filter_kwargs:
         attendance_records = attendance_records.filter(**filter_kwargs)
 
-    # Pagination
-    paginator = Paginator(attendance_records, 20)  # 20 records per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on (check_in_time, id)
+    paginator = KeysetPaginator(attendance_records, 20, key=('check_in_time', 'id'))  # 20 records per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
 
     # Calculate statistics
     aggregated_metrics = {}
@@ -672,13 +701,16 @@ def get_context_data(self, **kwargs):
         })
         return context
 
-    def delete(self, request, *args, **kwargs):
-        employee = self.get_object()
-        # Delete associated user account
-        if employee.user:
-            employee.user.delete()
-        messages.success(request, 'Employee deleted successfully!')
-        return super().delete(request, *args, **kwargs)
+    def form_valid(self, form):
+        from .task_queue import enqueue
+
+        # Deactivate now; attendance history, files and the user account are
+        # removed by a background worker
+        with transaction.atomic():
+            User.objects.filter(pk=self.object.user_id).update(is_active=False)
+            enqueue('employees.delete_employee', employee_id=self.object.pk, user_id=self.object.user_id)
+        messages.success(self.request, f'Employee {self.object.name} has been deactivated and scheduled for deletion.')
+        return redirect(self.get_success_url())
 
 
 # Employee Status Toggle View (for super-admins to activate/deactivate employees)
@@ -845,11 +877,126 @@ def get_client_ip(request):
     return ip
 
 
+def _location_failure(request, employee, action, failure_reason, notes, attendance=None):
+    from employees.attendance_logger import log_attendance_event
+
+    log_attendance_event(
+        employee=employee,
+        action=f'{action}_failed',
+        success=False,
+        failure_reason=failure_reason,
+        ip_address=get_client_ip(request),
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        attendance=attendance,
+        notes=notes
+    )
+
+
+def _check_coordinates(request, employee, action, attendance=None):
+    """
+    Validate the posted latitude/longitude against the office premises,
+    logging failed attempts.
+
+    Returns:
+        (latitude, longitude, error message or None)
+    """
+    from employees.geolocation_utils import validate_coordinates, is_within_office_premises
+
+    label = 'check-in' if action == 'check_in' else 'check-out'
+    user_latitude = request.POST.get('latitude')
+    user_longitude = request.POST.get('longitude')
+
+    if not user_latitude or not user_longitude:
+        _location_failure(request, employee, action, 'location_not_provided',
+                          'Location coordinates were not provided', attendance)
+        return None, None, f'Location access is required for {label}. Please enable location services and try again.'
+
+    # Validate coordinate format
+    is_valid_coords, coord_message = validate_coordinates(user_latitude, user_longitude)
+    if not is_valid_coords:
+        _location_failure(request, employee, action, 'invalid_coordinates',
+                          f'Invalid coordinates: {coord_message}', attendance)
+        return None, None, f'Invalid location data: {coord_message}'
+
+    # Check if within office premises
+    is_within, distance, location_message = is_within_office_premises(
+        float(user_latitude),
+        float(user_longitude),
+        employee.pk
+    )
+    if not is_within:
+        _location_failure(request, employee, action, 'outside_office_premises',
+                          f'Location: {user_latitude}, {user_longitude}. {location_message}', attendance)
+        return None, None, location_message
+
+    return user_latitude, user_longitude, None
+
+
+def _verify_location(request, employee, action, attendance=None):
+    """
+    Coordinates for a check-in/check-out POST, taken from the signed
+    ``location_token`` issued by ``location_precheck``. POSTs without a token
+    are refused unless ``ATTENDANCE_LOCATION_TOKEN_REQUIRED`` is off, in which
+    case the posted latitude/longitude are validated as before.
+
+    Returns:
+        (latitude, longitude, error message or None)
+    """
+    from django.core import signing
+    from employees.location_token import read_token, token_required
+
+    token = request.POST.get('location_token')
+    if not token:
+        if not token_required():
+            return _check_coordinates(request, employee, action, attendance)
+        _location_failure(request, employee, action, 'location_token_invalid',
+                          'Location token was not provided', attendance)
+        return None, None, 'Your location could not be verified. Please try again.'
+    try:
+        user_latitude, user_longitude = read_token(token, employee.pk, action)
+    except signing.SignatureExpired:
+        _location_failure(request, employee, action, 'location_token_invalid',
+                          'Location token expired', attendance)
+        return None, None, 'Your location check has expired. Please try again.'
+    except signing.BadSignature:
+        _location_failure(request, employee, action, 'location_token_invalid',
+                          'Location token was invalid', attendance)
+        return None, None, 'Your location could not be verified. Please try again.'
+    return user_latitude, user_longitude, None
+
+
+@require_http_methods(["POST"])
+@login_required
+@user_passes_test(is_employee)
+def location_precheck(request):
+    """Validate the employee's location before the photo upload and issue a signed location token"""
+    from employees.location_token import ACTIONS, get_max_age, issue_token
+
+    action = request.POST.get('action')
+    if action not in ACTIONS:
+        return JsonResponse({'success': False, 'error': 'Unknown action.'}, status=400)
+
+    employee = request.user.employee_profile
+    attendance = None
+    if action == 'check_out':
+        attendance = Attendance.objects.filter(employee=employee, date=timezone.now().date()).first()
+
+    user_latitude, user_longitude, location_error = _check_coordinates(request, employee, action, attendance)
+    if location_error:
+        return JsonResponse({'success': False, 'error': location_error}, status=400)
+
+    return JsonResponse({
+        'success': True,
+        'location_token': issue_token(employee.pk, action, user_latitude, user_longitude),
+        'expires_in': get_max_age(),
+    })
+
+
 @login_required
 @user_passes_test(is_employee)
 def check_in(request):
     """Employee check-in view"""
-    from employees.models import AttendanceLog
+    from employees.attendance_logger import log_attendance_event
     employee = request.user.employee_profile
     today = timezone.now().date()
 
@@ -865,64 +1012,16 @@ def check_in(request):
         return redirect(face_register_url)
 
     if request.method == 'POST':
-        # Validate geolocation first
-        from employees.geolocation_utils import validate_coordinates, is_within_office_premises
-        
-        user_latitude = request.POST.get('latitude')
-        user_longitude = request.POST.get('longitude')
-        
-        if not user_latitude or not user_longitude:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_in_failed',
-                success=False,
-                failure_reason='location_not_provided',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                notes='Location coordinates were not provided'
-            )
-            messages.error(request, 'Location access is required for check-in. Please enable location services and try again.')
-            return redirect('employees:check_in')
-        
-        # Validate coordinate format
-        is_valid_coords, coord_message = validate_coordinates(user_latitude, user_longitude)
-        if not is_valid_coords:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_in_failed',
-                success=False,
-                failure_reason='invalid_coordinates',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                notes=f'Invalid coordinates: {coord_message}'
-            )
-            messages.error(request, f'Invalid location data: {coord_message}')
-            return redirect('employees:check_in')
-        
-        # Check if within office premises
-        is_within, distance, location_message = is_within_office_premises(
-            float(user_latitude), 
-            float(user_longitude)
-        )
-        
-        if not is_within:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_in_failed',
-                success=False,
-                failure_reason='outside_office_premises',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                notes=f'Location: {user_latitude}, {user_longitude}. {location_message}'
-            )
-            messages.error(request, location_message)
+        user_latitude, user_longitude, location_error = _verify_location(request, employee, 'check_in')
+        if location_error:
+            messages.error(request, location_error)
             return redirect('employees:check_in')
         
         # Require photo and face match
         check_in_photo = request.FILES.get('check_in_photo')
         if not check_in_photo:
             # Log failed attempt
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_in_failed',
                 success=False,
@@ -936,7 +1035,7 @@ def check_in(request):
 
         if not employee.has_registered_face:
             # Log failed attempt
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_in_failed',
                 success=False,
@@ -950,10 +1049,12 @@ def check_in(request):
 
         try:
             stored_encoding = employee.get_face_encoding()
-            checkin_encoding = extract_face_encoding_from_file(check_in_photo)
+            # Decode once; the same array is stored as the recompressed photo
+            checkin_image = decode_upload(check_in_photo)
+            checkin_encoding = extract_face_encoding_from_array(checkin_image) if checkin_image is not None else None
 
             if checkin_encoding is None:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_in_failed',
                     success=False,
@@ -966,7 +1067,7 @@ def check_in(request):
                 return redirect('employees:check_in')
 
             if stored_encoding is None:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_in_failed',
                     success=False,
@@ -982,7 +1083,7 @@ def check_in(request):
             result = compare_faces(stored_encoding, checkin_encoding, tolerance=tol)
 
             if not result['match']:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_in_failed',
                     success=False,
@@ -1003,7 +1104,7 @@ def check_in(request):
 
             if not match_info or match_info['employee'].pk != employee.pk:
                 matched_employee = match_info['employee'].full_name if match_info else None
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_in_failed',
                     success=False,
@@ -1019,22 +1120,23 @@ def check_in(request):
                     messages.error(request, 'Face verification failed. We could not uniquely match your face to your profile. Check-in denied.')
                 return redirect('employees:check_in')
 
-            # Passed verification, create attendance
-            attendance, created = Attendance.objects.get_or_create(
-                employee=employee,
-                date=today,
-                defaults={
-                    'check_in_time': timezone.now(),
-                }
-            )
-            # If already exists and has check_in_time, keep it but allow updating photo and location
-            attendance.check_in_photo.save(check_in_photo.name, check_in_photo, save=False)
-            attendance.check_in_latitude = user_latitude
-            attendance.check_in_longitude = user_longitude
-            attendance.save()
+            # Passed verification, create attendance; the photo is stored in the background
+            with transaction.atomic():
+                attendance, created = Attendance.objects.get_or_create(
+                    employee=employee,
+                    date=today,
+                    defaults={
+                        'check_in_time': timezone.now(),
+                    }
+                )
+                # If already exists and has check_in_time, keep it but allow updating photo and location
+                queue_photo(attendance, 'check_in_photo', checkin_image)
+                attendance.check_in_latitude = user_latitude
+                attendance.check_in_longitude = user_longitude
+                attendance.save(update_fields=['check_in_photo_pending', 'check_in_latitude', 'check_in_longitude'])
 
             # Log successful check-in
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_in_success',
                 success=True,
@@ -1050,7 +1152,7 @@ def check_in(request):
 
         except Exception as e:
             # Log exception
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_in_failed',
                 success=False,
@@ -1128,23 +1230,103 @@ def get_context_data(self, **kwargs):
         return context
 
     def get_queryset(self):
-        queryset = Attendance.objects.select_related('employee')
-        date_filter = self.request.GET.get('date')
-        employee_filter = self.request.GET.get('employee')
+        queryset = filter_attendance(Attendance.objects.select_related('employee'), self.request.GET)
+        return queryset.order_by('-check_in_time', '-id')
+
+    def paginate_queryset(self, queryset, page_size):
+        """Keyset pagination on (check_in_time, id) instead of OFFSET + COUNT(*)"""
+        paginator = KeysetPaginator(queryset, page_size, key=('check_in_time', 'id'))
+        page = paginator.get_page(self.request.GET.get('cursor'))
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+def _export_response(request, rows, filename_prefix, sheet_name):
+    """Stream export rows as CSV (default) or XLSX depending on ?format="""
+    from django.http import StreamingHttpResponse
+    from employees.exports import EXPORT_FORMATS, export_filename
+
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return JsonResponse({'success': False, 'error': 'Unsupported export format'}, status=400)
+
+    content_type, writer = EXPORT_FORMATS[export_format]
+    stream = writer(rows, sheet_name) if export_format == 'xlsx' else writer(rows)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(filename_prefix, export_format)}"'
+    return response
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def attendance_export(request):
+    """Stream attendance records matching the attendance list filters"""
+    from employees.exports import attendance_rows
+
+    queryset = filter_attendance(Attendance.objects.all(), request.GET)
+    return _export_response(request, attendance_rows(queryset), 'attendance', 'Attendance')
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def admin_occupancy(request):
+    """Who is in the office right now, who has left and who has not arrived yet (JSON)"""
+    from employees.occupancy import get_occupancy
+    from employees.payroll import get_late_after
+
+    today = timezone.now().date()
+    occupancy = get_occupancy(today)
+    late_after = get_late_after()
+    past_late_after = timezone.localtime().time() >= late_after
+
+    return JsonResponse({
+        'date': today.isoformat(),
+        'late_after': late_after.strftime('%H:%M'),
+        'past_late_after': past_late_after,
+        'counts': {name: len(items) for name, items in occupancy.items()},
+        **occupancy,
+    })
+
+
+@login_required
+@user_passes_test(is_superadmin)
+async def admin_live_events(request):
+    """Server-Sent Events stream of live attendance and ticket activity (ASGI only)"""
+    from django.http import HttpResponse, StreamingHttpResponse
+    from employees.live_events import EventStream, bus
+
+    if not _serves_event_streams(request):
+        # A WSGI worker would consume the endless stream before sending a byte;
+        # 204 tells EventSource not to reconnect
+        return HttpResponse(status=204)
+
+    response = StreamingHttpResponse(EventStream(bus.subscribe()), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-        if date_filter:
-            queryset = queryset.filter(date=date_filter)
-        if employee_filter:
-            queryset = queryset.filter(employee_id=employee_filter)
 
-        return queryset.order_by('-check_in_time')
+@login_required
+@user_passes_test(is_superadmin)
+def admin_live_counters(request):
+    """Current dashboard counters (JSON), polled instead of the event stream under WSGI"""
+    return JsonResponse(_live_counters(timezone.now().date()))
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def admin_event_metrics(request):
+    """Per-subscriber domain event timings for this process (JSON)"""
+    from employees.domain_events import domain_bus
+
+    return JsonResponse({'subscribers': domain_bus.metrics()})
 
 
 @login_required
 @user_passes_test(is_superadmin)
 def admin_attendance_logs(request):
     """Admin view for all attendance activity logs including failed attempts"""
-    from django.core.paginator import Paginator
+    from django.db.models import Count
+    from employees.log_archive import archived_years
     from employees.models import AttendanceLog
     
     # Get filter parameters
@@ -1154,49 +1336,32 @@ def admin_attendance_logs(request):
     date_from = request.GET.get('date_from')
     date_to = request.GET.get('date_to')
     
-    # Base queryset
-    logs = AttendanceLog.objects.select_related('employee', 'attendance').order_by('-timestamp')
-    
-    # Apply filters
-    if employee_id:
-        logs = logs.filter(employee_id=employee_id)
-    
-    if action:
-        logs = logs.filter(action=action)
-    
-    if status == 'success':
-        logs = logs.filter(success=True)
-    elif status == 'failed':
-        logs = logs.filter(success=False)
-    
-    if date_from:
-        from datetime import datetime
-        date_from_obj = datetime.strptime(date_from, '%Y-%m-%d')
-        logs = logs.filter(timestamp__date__gte=date_from_obj)
-    
-    if date_to:
-        from datetime import datetime
-        date_to_obj = datetime.strptime(date_to, '%Y-%m-%d')
-        logs = logs.filter(timestamp__date__lte=date_to_obj)
-    
-    # Calculate statistics
-    total_logs = logs.count()
-    successful_logs = logs.filter(success=True).count()
-    failed_logs = logs.filter(success=False).count()
-    
-    # Count by action type
-    check_in_attempts = logs.filter(action__contains='check_in').count()
-    check_out_attempts = logs.filter(action__contains='check_out').count()
+    # Base queryset with filters applied
+    logs = filter_attendance_logs(
+        AttendanceLog.objects.select_related('employee', 'attendance', 'client'),
+        request.GET,
+    ).order_by('-timestamp')
+    
+    # Calculate statistics in a single aggregate query (optional: ?count=0 skips it)
+    show_counts = request.GET.get('count', '1') != '0'
+    stats = {}
+    if show_counts:
+        stats = logs.order_by().aggregate(
+            total_logs=Count('id'),
+            successful_logs=Count('id', filter=Q(success=True)),
+            failed_logs=Count('id', filter=Q(success=False)),
+            check_in_attempts=Count('id', filter=Q(action__contains='check_in')),
+            check_out_attempts=Count('id', filter=Q(action__contains='check_out')),
+        )
     
     # Recent failed attempts (for security monitoring)
     recent_failures = AttendanceLog.objects.filter(
         success=False
     ).select_related('employee').order_by('-timestamp')[:10]
     
-    # Pagination
-    paginator = Paginator(logs, 50)  # 50 logs per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Keyset pagination on (timestamp, id)
+    paginator = KeysetPaginator(logs, 50, key=('timestamp', 'id'))  # 50 logs per page
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     
     # Get all employees for filter dropdown
     employees = Employee.objects.all().order_by('name')
@@ -1206,11 +1371,12 @@ def admin_attendance_logs(request):
         'layout_path': TemplateHelper.set_layout('layout_vertical.html', context),
         'page_obj': page_obj,
         'logs': page_obj.object_list,
-        'total_logs': total_logs,
-        'successful_logs': successful_logs,
-        'failed_logs': failed_logs,
-        'check_in_attempts': check_in_attempts,
-        'check_out_attempts': check_out_attempts,
+        'show_counts': show_counts,
+        'total_logs': stats.get('total_logs'),
+        'successful_logs': stats.get('successful_logs'),
+        'failed_logs': stats.get('failed_logs'),
+        'check_in_attempts': stats.get('check_in_attempts'),
+        'check_out_attempts': stats.get('check_out_attempts'),
         'recent_failures': recent_failures,
         'employees': employees,
         'selected_employee': employee_id,
@@ -1220,10 +1386,61 @@ def admin_attendance_logs(request):
         'selected_date_to': date_to,
         'action_choices': AttendanceLog.ACTION_CHOICES,
         'current_date': timezone.now().date(),
+        'archived_years': archived_years(),
     })
     return render(request, 'employees/admin_attendance_logs.html', context)
 
 
+@login_required
+@user_passes_test(is_superadmin)
+def admin_attendance_logs_export(request):
+    """Stream attendance logs matching the activity log filters"""
+    from employees.models import AttendanceLog
+    from employees.exports import attendance_log_rows
+
+    queryset = filter_attendance_logs(AttendanceLog.objects.all(), request.GET)
+    return _export_response(request, attendance_log_rows(queryset), 'attendance_logs', 'Attendance Logs')
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def admin_attendance_logs_archive(request):
+    """Stream archived (retention-expired) attendance logs matching the activity log filters"""
+    from employees.exports import archived_log_rows
+    from employees.log_archive import iter_archived_logs
+
+    rows = archived_log_rows(iter_archived_logs(request.GET))
+    return _export_response(request, rows, 'attendance_logs_archive', 'Archived Logs')
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def admin_location_audit(request):
+    """Admin report of suspicious check-in/check-out coordinates (outliers, impossible travel, shared points)"""
+    from employees.location_audit import audit_locations
+
+    today = timezone.localdate()
+    try:
+        date_from = datetime.strptime(request.GET.get('date_from', ''), '%Y-%m-%d').date()
+    except ValueError:
+        date_from = today - timedelta(days=30)
+    try:
+        date_to = datetime.strptime(request.GET.get('date_to', ''), '%Y-%m-%d').date()
+    except ValueError:
+        date_to = today
+
+    report = audit_locations(start=date_from, end=date_to, limit=50)
+
+    context = TemplateLayout.init(self={}, context={})
+    context.update({
+        'layout_path': TemplateHelper.set_layout('layout_vertical.html', context),
+        'report': report,
+        'selected_date_from': date_from,
+        'selected_date_to': date_to,
+    })
+    return render(request, 'employees/admin/location_audit.html', context)
+
+
 @require_http_methods(["GET", "POST"])
 @login_required
 @user_passes_test(is_employee)
@@ -1237,34 +1454,31 @@ def face_registration(request):
             'layout_path': TemplateHelper.set_layout('layout_vertical.html', context),
             'employee': employee,
             'has_registered_face': employee.has_registered_face,
+            **get_capture_options(),
         })
         return render(request, 'employees/face_register.html', context)
 
-    # POST: process uploaded image (base64 or file)
-    image_payload = request.POST.get('image') or request.POST.get('image_base64')
-    image_file = request.FILES.get('image_file') or request.FILES.get('upload_image')
+    # POST: raw image/jpeg body, multipart file, or (older clients) base64 field
+    try:
+        image_source = read_image_upload(
+            request,
+            file_fields=('image_file', 'upload_image'),
+            data_url_fields=('image', 'image_base64'),
+        )
+    except ImageTooLarge:
+        return JsonResponse({'success': False, 'error': 'The photo is too large. Please upload a smaller image.'}, status=413)
+    except ImageDecodeError:
+        return JsonResponse({'success': False, 'error': 'Unable to read the captured image. Please try again.'}, status=400)
 
-    if not image_payload and not image_file:
+    if image_source is None:
         return JsonResponse({'success': False, 'error': 'No image provided. Please capture or upload a clear photo.'}, status=400)
 
     try:
-        if image_file:
-            image_bytes = image_file.read()
-        else:
-            payload = image_payload
-            if 'base64,' in payload:
-                payload = payload.split('base64,', 1)[1]
-            try:
-                image_bytes = base64.b64decode(payload)
-            except (base64.binascii.Error, ValueError) as exc:
-                return JsonResponse({'success': False, 'error': 'Unable to read the captured image. Please try again.'}, status=400)
-
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        if img is None:
-            return JsonResponse({'success': False, 'error': 'Image format is not supported. Try retaking or uploading a JPG/PNG photo.'}, status=400)
+        rgb_img = decode_image(image_source, get_max_dimension())
+    except ImageDecodeError:
+        return JsonResponse({'success': False, 'error': 'Image format is not supported. Try retaking or uploading a JPG/PNG photo.'}, status=400)
 
-        rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    try:
         face_locations = face_recognition.face_locations(rgb_img)
 
         if not face_locations:
@@ -1296,12 +1510,8 @@ def face_registration(request):
 
         # Persist encoding and profile photo
         employee.set_face_encoding(face_encoding)
-        success, buffer = cv2.imencode('.jpg', img)
-        if not success:
-            return JsonResponse({'success': False, 'error': 'Unable to process image. Please try again.'}, status=400)
-
         file_name = f'profile_{employee.id}_{timezone.now().strftime("%Y%m%d_%H%M%S")}.jpg'
-        employee.profile_picture.save(file_name, ContentFile(buffer.tobytes()), save=False)
+        save_photo(employee.profile_picture, rgb_img, file_name)
         employee.save()
 
         return JsonResponse({
@@ -1317,18 +1527,18 @@ def mark_attendance(request):
     """
     View for marking attendance using face recognition
     """
-    if request.method == 'POST' and 'image' in request.POST:
+    if request.method == 'POST':
         try:
-            # Get the base64 image data
-            image_data = request.POST['image'].split('base64,')[1]
-            image_data = base64.b64decode(image_data)
-            
-            # Convert to numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            # Convert BGR to RGB
-            rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            image_source = read_image_upload(request)
+        except ImageTooLarge:
+            return JsonResponse({'success': False, 'error': 'Image too large'}, status=413)
+        except ImageDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid image'}, status=400)
+        if image_source is None:
+            return JsonResponse({'success': False, 'error': 'No image provided'}, status=400)
+
+        try:
+            rgb_img = decode_image(image_source, get_max_dimension())
             
             # Find face locations and encodings
             face_locations = face_recognition.face_locations(rgb_img)
@@ -1352,21 +1562,25 @@ def mark_attendance(request):
                     result = face_recognition.compare_faces([known_encoding], unknown_encoding, tolerance=0.6)
                     if result[0]:
                         # Face recognized, mark attendance
-                        attendance, created = Attendance.objects.get_or_create(
-                            employee=employee,
-                            date=timezone.now().date(),
-                            defaults={
-                                'check_in_time': timezone.now(),
-                                'check_in_photo': save_attendance_image(img, f"checkin_{employee.id}")
-                            }
-                        )
+                        with transaction.atomic():
+                            attendance, created = Attendance.objects.get_or_create(
+                                employee=employee,
+                                date=timezone.now().date(),
+                                defaults={
+                                    'check_in_time': timezone.now(),
+                                    'check_in_photo_pending': True,
+                                }
+                            )
+                            if created:
+                                queue_photo(attendance, 'check_in_photo', rgb_img)
                         
                         if not created:
                             # If already checked in, update check out
                             if not attendance.check_out_time:
                                 attendance.check_out_time = timezone.now()
-                                attendance.check_out_photo = save_attendance_image(img, f"checkout_{employee.id}")
-                                attendance.save()
+                                with transaction.atomic():
+                                    queue_photo(attendance, 'check_out_photo', rgb_img)
+                                    attendance.save(update_fields=['check_out_photo_pending', 'check_out_time'])
                                 return JsonResponse({
                                     'success': True,
                                     'message': f'Check out recorded for {employee.name}',
@@ -1380,7 +1594,7 @@ def mark_attendance(request):
                                     'error': f'Attendance already marked for today',
                                     'employee_name': employee.name
                                 })
-                        
+
                         return JsonResponse({
                             'success': True,
                             'message': f'Check in recorded for {employee.name}',
@@ -1397,22 +1611,6 @@ def mark_attendance(request):
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
 
-def save_attendance_image(image, prefix):
-    """Helper function to save attendance images"""
-    from django.core.files.base import ContentFile
-    from io import BytesIO
-    
-    # Convert numpy array to PIL Image
-    image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
-    
-    # Save to BytesIO
-    img_io = BytesIO()
-    image.save(img_io, format='JPEG')
-    
-    # Create ContentFile from BytesIO
-    return ContentFile(img_io.getvalue(), name=f"{prefix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.jpg")
-
-
 # API Views for AJAX requests
 @login_required
 @user_passes_test(is_employee)
@@ -1431,7 +1629,7 @@ def check_in_status(request):
 @user_passes_test(is_employee)
 def check_out(request):
     """Employee check-out view with face verification - handles POST requests only"""
-    from employees.models import AttendanceLog
+    from employees.attendance_logger import log_attendance_event
     employee = request.user.employee_profile
     today = timezone.now().date()
 
@@ -1441,7 +1639,7 @@ def check_out(request):
     # Validation 1: Must be checked in first
     if not attendance:
         # Log failed attempt
-        AttendanceLog.objects.create(
+        log_attendance_event(
             employee=employee,
             action='check_out_failed',
             success=False,
@@ -1456,7 +1654,7 @@ def check_out(request):
     # Validation 2: Cannot check out twice
     if attendance.check_out_time:
         # Log failed attempt
-        AttendanceLog.objects.create(
+        log_attendance_event(
             employee=employee,
             action='check_out_failed',
             success=False,
@@ -1471,67 +1669,16 @@ def check_out(request):
 
     # Only handle POST requests (from the embedded form in check_in.html)
     if request.method == 'POST':
-        # Validate geolocation first
-        from employees.geolocation_utils import validate_coordinates, is_within_office_premises
-        
-        user_latitude = request.POST.get('latitude')
-        user_longitude = request.POST.get('longitude')
-        
-        if not user_latitude or not user_longitude:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_out_failed',
-                success=False,
-                failure_reason='location_not_provided',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                attendance=attendance,
-                notes='Location coordinates were not provided'
-            )
-            messages.error(request, 'Location access is required for check-out. Please enable location services and try again.')
-            return redirect('employees:check_in')
-        
-        # Validate coordinate format
-        is_valid_coords, coord_message = validate_coordinates(user_latitude, user_longitude)
-        if not is_valid_coords:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_out_failed',
-                success=False,
-                failure_reason='invalid_coordinates',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                attendance=attendance,
-                notes=f'Invalid coordinates: {coord_message}'
-            )
-            messages.error(request, f'Invalid location data: {coord_message}')
-            return redirect('employees:check_in')
-        
-        # Check if within office premises
-        is_within, distance, location_message = is_within_office_premises(
-            float(user_latitude), 
-            float(user_longitude)
-        )
-        
-        if not is_within:
-            AttendanceLog.objects.create(
-                employee=employee,
-                action='check_out_failed',
-                success=False,
-                failure_reason='outside_office_premises',
-                ip_address=get_client_ip(request),
-                user_agent=request.META.get('HTTP_USER_AGENT', ''),
-                attendance=attendance,
-                notes=f'Location: {user_latitude}, {user_longitude}. {location_message}'
-            )
-            messages.error(request, location_message)
+        user_latitude, user_longitude, location_error = _verify_location(request, employee, 'check_out', attendance)
+        if location_error:
+            messages.error(request, location_error)
             return redirect('employees:check_in')
         
         # Validation 3: Photo is required
         check_out_photo = request.FILES.get('check_out_photo')
         if not check_out_photo:
             # Log failed attempt
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_out_failed',
                 success=False,
@@ -1547,7 +1694,7 @@ def check_out(request):
         # Validation 4: Face must be registered
         if not employee.has_registered_face:
             # Log failed attempt
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_out_failed',
                 success=False,
@@ -1562,10 +1709,11 @@ def check_out(request):
 
         try:
             stored_encoding = employee.get_face_encoding()
-            checkout_encoding = extract_face_encoding_from_file(check_out_photo)
+            checkout_image = decode_upload(check_out_photo)
+            checkout_encoding = extract_face_encoding_from_array(checkout_image) if checkout_image is not None else None
 
             if checkout_encoding is None:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_out_failed',
                     success=False,
@@ -1579,7 +1727,7 @@ def check_out(request):
                 return redirect('employees:check_in')
 
             if stored_encoding is None:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_out_failed',
                     success=False,
@@ -1596,7 +1744,7 @@ def check_out(request):
             result = compare_faces(stored_encoding, checkout_encoding, tolerance=strict_tol)
 
             if not result['match']:
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_out_failed',
                     success=False,
@@ -1618,7 +1766,7 @@ def check_out(request):
 
             if not match_info or match_info['employee'].pk != employee.pk:
                 matched_employee = match_info['employee'].full_name if match_info else None
-                AttendanceLog.objects.create(
+                log_attendance_event(
                     employee=employee,
                     action='check_out_failed',
                     success=False,
@@ -1635,9 +1783,8 @@ def check_out(request):
                     messages.error(request, 'Face verification failed. We could not uniquely match your face to your profile. Check-out denied.')
                 return redirect('employees:check_in')
 
-            # All validations passed - save check-out
+            # All validations passed - save check-out; the photo is stored in the background
             check_out_time = timezone.now()
-            attendance.check_out_photo.save(check_out_photo.name, check_out_photo, save=False)
             attendance.check_out_time = check_out_time
             attendance.check_out_latitude = user_latitude
             attendance.check_out_longitude = user_longitude
@@ -1645,10 +1792,16 @@ def check_out(request):
             HALF_DAY_THRESHOLD_SECONDS = int(4.5 * 60 * 60)
             time_worked = check_out_time - attendance.check_in_time
             attendance.half_day = time_worked.total_seconds() < HALF_DAY_THRESHOLD_SECONDS
-            attendance.save()
+            with transaction.atomic():
+                queue_photo(attendance, 'check_out_photo', checkout_image)
+                # Only the columns written here; a pending check-in photo may be linked concurrently
+                attendance.save(update_fields=[
+                    'check_out_photo_pending', 'check_out_time', 'check_out_latitude',
+                    'check_out_longitude', 'half_day',
+                ])
             
             # Log successful check-out
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_out_success',
                 success=True,
@@ -1664,7 +1817,7 @@ def check_out(request):
             
         except Exception as e:
             # Log exception
-            AttendanceLog.objects.create(
+            log_attendance_event(
                 employee=employee,
                 action='check_out_failed',
                 success=False,
@@ -2118,10 +2271,14 @@ def is_holiday(date_obj):
 @user_passes_test(is_superadmin)
 def admin_attendance_calendar(request):
     """Admin view for attendance calendar with detailed insights"""
-    from datetime import datetime, timedelta
-    from calendar import monthrange
+    from datetime import datetime
     import calendar
-    from django.db.models import Count, Q
+    from employees.attendance_matrix import (
+        build_attendance_matrix,
+        is_holiday,
+        STATUS_PRESENT,
+        STATUS_HALF_DAY,
+    )
     
     # Get year, month, and employee filter from query params
     current_date = timezone.now()
@@ -2137,57 +2294,20 @@ def admin_attendance_calendar(request):
         month = 1
         year += 1
     
-    # Get first and last day of the month
-    first_day = datetime(year, month, 1).date()
-    last_day = datetime(year, month, monthrange(year, month)[1]).date()
-    
     # Get all employees
-    all_employees = Employee.objects.all().order_by('name')
+    all_employees = Employee.objects.only('id', 'name').order_by('name')
     
     # Filter by employee if specified
     if employee_id:
         selected_employee = get_object_or_404(Employee, id=employee_id)
-        employees = [selected_employee]
+        employee_ids = [selected_employee.id]
     else:
         selected_employee = None
-        employees = all_employees
-    
-    # Get all attendance records for this month
-    attendance_records = Attendance.objects.filter(
-        date__gte=first_day,
-        date__lte=last_day
-    ).select_related('employee')
+        employee_ids = None
     
-    if employee_id:
-        attendance_records = attendance_records.filter(employee_id=employee_id)
-    
-    # Create attendance lookup by date and employee
-    attendance_by_date = {}
-    for record in attendance_records:
-        if record.date not in attendance_by_date:
-            attendance_by_date[record.date] = []
-        attendance_by_date[record.date].append(record)
-    
-    # Helper function to check if a date is a holiday
-    def is_holiday(date_obj):
-        """Check if date is a holiday (Sunday or 1st, 3rd, 5th Saturday)"""
-        # Sunday is weekday 6
-        if date_obj.weekday() == 6:
-            return True
-        
-        # Saturday is weekday 5
-        if date_obj.weekday() == 5:
-            # Count which Saturday of the month this is
-            saturday_count = 0
-            for d in range(1, date_obj.day + 1):
-                if datetime(date_obj.year, date_obj.month, d).weekday() == 5:
-                    saturday_count += 1
-            
-            # 1st, 3rd, 5th Saturday are holidays
-            if saturday_count in [1, 3, 5]:
-                return True
-        
-        return False
+    # Build the employees x days status matrix (one values_list query)
+    matrix = build_attendance_matrix(year, month, employee_ids=employee_ids, today=current_date.date())
+    day_totals = matrix.day_totals()
     
     # Generate calendar data (weeks start on Sunday)
     cal = calendar.Calendar(firstweekday=calendar.SUNDAY).monthdayscalendar(year, month)
@@ -2200,49 +2320,30 @@ def is_holiday(date_obj):
                 week_data.append(None)
             else:
                 date_obj = datetime(year, month, day).date()
-                day_attendance = attendance_by_date.get(date_obj, [])
-                is_holiday_day = is_holiday(date_obj)
-                
-                # Count statuses
-                checked_in_count = len([a for a in day_attendance if not a.check_out_time])
-                half_day_count = len([a for a in day_attendance if a.check_out_time and a.is_half_day])
-                checked_out_count = len([a for a in day_attendance if a.check_out_time and not a.is_half_day])
-                total_present = len(day_attendance)
-                
-                # Calculate absent (only for past working days, not holidays)
-                is_past_working_day = date_obj < current_date.date() and not is_holiday_day
-                total_employees = len(employees) if not employee_id else 1
-                absent_count = total_employees - total_present if is_past_working_day else 0
+                index = day - 1
+                checked_in_count = day_totals['checked-in'][index]
+                half_day_count = day_totals['halfday'][index]
+                checked_out_count = day_totals['present'][index]
                 
                 week_data.append({
                     'day': day,
                     'date': date_obj,
-                    'attendance_records': day_attendance,
                     'checked_in_count': checked_in_count,
                     'checked_out_count': checked_out_count,
                     'half_day_count': half_day_count,
-                    'total_present': total_present,
-                    'absent_count': absent_count,
+                    'total_present': checked_in_count + half_day_count + checked_out_count,
+                    'absent_count': day_totals['absent'][index],
                     'is_today': date_obj == current_date.date(),
                     'is_future': date_obj > current_date.date(),
-                    'is_holiday': is_holiday_day
+                    'is_holiday': is_holiday(date_obj)
                 })
         calendar_data.append(week_data)
     
     # Calculate monthly statistics (excluding holidays)
-    total_working_days = sum(1 for week in calendar_data for day in week 
-                            if day and not day['is_holiday'] and day['date'] <= current_date.date())
-
-    if employee_id:
-        employee_records = attendance_records.filter(employee_id=employee_id)
-        total_present = employee_records.filter(check_out_time__isnull=False, half_day=False).count()
-        total_half_days = employee_records.filter(check_out_time__isnull=False, half_day=True).count()
-        total_absent = total_working_days - employee_records.count()
-    else:
-        total_present = attendance_records.filter(check_out_time__isnull=False, half_day=False).count()
-        total_half_days = attendance_records.filter(check_out_time__isnull=False, half_day=True).count()
-        total_expected = total_working_days * len(employees)
-        total_absent = total_expected - attendance_records.count()
+    total_working_days = matrix.working_days
+    total_present = int(matrix.count(STATUS_PRESENT))
+    total_half_days = int(matrix.count(STATUS_HALF_DAY))
+    total_absent = total_working_days * len(matrix.employee_ids) - matrix.records_count()
     
     # Get month navigation
     prev_month = month - 1 if month > 1 else 12
@@ -2282,6 +2383,141 @@ def is_holiday(date_obj):
     
     return render(request, 'employees/attendance/admin_calendar.html', context)
 
+
+def _admin_day_attendance_queryset(request, day):
+    """Attendance records for a single calendar day, honouring the employee filter"""
+    records = Attendance.objects.filter(date=day)
+    employee_id = request.GET.get('employee')
+    if employee_id:
+        records = records.filter(employee_id=employee_id)
+    return records
+
+
+def _parse_employee_filter(request):
+    """True when the optional ?employee= filter is absent or a numeric id"""
+    employee_id = request.GET.get('employee')
+    return not employee_id or employee_id.isdigit()
+
+
+def _parse_calendar_day(day):
+    try:
+        return datetime.strptime(day, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def _admin_day_attendance_etag(request, day):
+    """ETag for the day drill-down based on the day's records and the requested page"""
+    day_obj = _parse_calendar_day(day)
+    if day_obj is None or not _parse_employee_filter(request):
+        return None
+    from django.db.models import Count
+    state = _admin_day_attendance_queryset(request, day_obj).aggregate(
+        total=Count('id'),
+        last_id=Max('id'),
+        last_check_in=Max('check_in_time'),
+        last_check_out=Max('check_out_time'),
+        checked_out=Count('check_out_time'),
+    )
+    return '"day-{}-{}-{}-{}"'.format(
+        day_obj.isoformat(),
+        request.GET.get('employee', ''),
+        request.GET.get('page', '1'),
+        '-'.join(str(value.timestamp() if hasattr(value, 'timestamp') else value) for value in state.values()),
+    )
+
+
+@login_required
+@user_passes_test(is_superadmin)
+@condition(etag_func=_admin_day_attendance_etag)
+def admin_attendance_calendar_day(request, day):
+    """Paginated JSON drill-down of one day's attendance records for the admin calendar"""
+    from django.core.paginator import Paginator
+    
+    day_obj = _parse_calendar_day(day)
+    if day_obj is None:
+        return JsonResponse({'success': False, 'error': 'Invalid date'}, status=400)
+    if not _parse_employee_filter(request):
+        return JsonResponse({'success': False, 'error': 'Invalid employee'}, status=400)
+    
+    records = _admin_day_attendance_queryset(request, day_obj).select_related('employee__user').only(
+        'id', 'date', 'check_in_time', 'check_out_time', 'half_day',
+        'employee__id', 'employee__name', 'employee__full_name', 'employee__user__username',
+    ).order_by('employee__name', 'id')
+    
+    paginator = Paginator(records, 50)  # 50 records per page
+    page_obj = paginator.get_page(request.GET.get('page'))
+    
+    data = []
+    for record in page_obj.object_list:
+        if record.check_out_time and record.is_half_day:
+            status = 'halfday'
+        elif record.check_out_time:
+            status = 'complete'
+        else:
+            status = 'pending'
+        data.append({
+            'employee': record.employee.name,
+            'employee_full_name': record.employee.full_name,
+            'employee_id': record.employee.user.username,
+            'checkin': timezone.localtime(record.check_in_time).strftime('%H:%M:%S'),
+            'checkout': timezone.localtime(record.check_out_time).strftime('%H:%M:%S') if record.check_out_time else None,
+            'duration': record.duration,
+            'status': status,
+        })
+    
+    return JsonResponse({
+        'success': True,
+        'date': day_obj.isoformat(),
+        'records': data,
+        'page': page_obj.number,
+        'num_pages': paginator.num_pages,
+        'total': paginator.count,
+        'has_next': page_obj.has_next(),
+    })
+
+
+@login_required
+@user_passes_test(is_superadmin)
+def admin_attendance_matrix(request):
+    """JSON endpoint serving the employees x days attendance matrix for the heatmap"""
+    from employees.attendance_matrix import build_attendance_matrix, STATUS_LABELS
+    
+    current_date = timezone.now()
+    try:
+        year = int(request.GET.get('year', current_date.year))
+        month = int(request.GET.get('month', current_date.month))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid year or month'}, status=400)
+    
+    if not 1 <= month <= 12 or not MINYEAR <= year <= MAXYEAR:
+        return JsonResponse({'success': False, 'error': 'Invalid year or month'}, status=400)
+    
+    employee_id = request.GET.get('employee')
+    if employee_id and not employee_id.isdigit():
+        return JsonResponse({'success': False, 'error': 'Invalid employee'}, status=400)
+    employee_ids = [get_object_or_404(Employee, id=employee_id).id] if employee_id else None
+    
+    matrix = build_attendance_matrix(year, month, employee_ids=employee_ids, today=current_date.date())
+    names = dict(Employee.objects.filter(id__in=matrix.employee_ids.tolist()).values_list('id', 'name'))
+    
+    return JsonResponse({
+        'success': True,
+        'year': year,
+        'month': month,
+        'days': [d.isoformat() for d in matrix.days],
+        'statuses': {str(code): label for code, label in STATUS_LABELS.items()},
+        'employees': [
+            {'id': int(emp_id), 'name': names.get(int(emp_id), '')}
+            for emp_id in matrix.employee_ids
+        ],
+        # One digit per day, see STATUS_LABELS for the code mapping
+        'rows': matrix.row_strings(),
+        'day_totals': matrix.day_totals(),
+        'employee_totals': matrix.employee_totals(),
+        'working_days': matrix.working_days,
+    })
+
 # Employee Password Reset Request (Public - No Login Required)
 def password_reset_request(request):
     """Employee submits password reset request"""
@@ -2426,4 +2662,63 @@ def employee_change_password(request, employee_id):
         'employee': employee,
     })
     
-    return render(request, 'employees/admin/change_employee_password.html', context)
\ No newline at end of file
+    return render(request, 'employees/admin/change_employee_password.html', context)
+
+
+@login_required
+def protected_media(request, path):
+    """Serve a media file to its owner or a superadmin (via nginx X-Accel-Redirect when configured)"""
+    from django.http import Http404
+    from .media_access import can_access, media_response
+
+    name = posixpath.normpath(path)
+    if name.startswith(('.', '/')) or not can_access(request.user, name):
+        # Same answer for missing and forbidden files
+        raise Http404('Media file not found')
+    response = media_response(request, name)
+    if response is None:
+        raise Http404('Media file not found')
+    return response
+
+
+@login_required
+def media_thumbnail(request, size, path):
+    """Serve a resized variant of a media image to its owner or a superadmin"""
+    from django.conf import settings
+    from django.core.files.storage import default_storage
+    from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+    from .image_resize import ResizeBusy, get_allowed_sizes, get_variant
+    from .media_access import can_access
+
+    name = posixpath.normpath(path)
+    if size not in get_allowed_sizes() or name.startswith(('.', '/')) or not can_access(request.user, name):
+        raise Http404('Media file not found')
+    if not default_storage.exists(name):
+        raise Http404('Media file not found')
+
+    image_format = 'webp' if 'image/webp' in request.headers.get('Accept', '') else 'jpeg'
+    try:
+        variant, key = get_variant(name, size, image_format)
+    except ResizeBusy:
+        response = HttpResponse('Busy resizing images, retry shortly', status=503, content_type='text/plain')
+        response['Retry-After'] = '2'
+        return response
+    except (OSError, ValueError):
+        # Not an image Pillow can decode
+        raise Http404('Media file not found')
+
+    etag = f'"{key}"'
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    elif getattr(settings, 'MEDIA_THUMB_ACCEL_REDIRECT', ''):
+        response = HttpResponse(content_type=f'image/{image_format}')
+        response['X-Accel-Redirect'] = (
+            f"{settings.MEDIA_THUMB_ACCEL_REDIRECT.rstrip('/')}/{key[:2]}/{key}.{image_format}"
+        )
+    else:
+        response = FileResponse(open(variant, 'rb'), content_type=f'image/{image_format}')
+    response['ETag'] = etag
+    # The URL names the source, not its version: revalidate (a 304 while unchanged)
+    response['Cache-Control'] = 'private, no-cache'
+    response['Vary'] = 'Accept, Cookie'
+    return response
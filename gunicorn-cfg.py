@@ -1,8 +1,58 @@
 # -*- encoding: utf-8 -*-
 
+import os
+import subprocess
+import sys
+import threading
+
 bind = '0.0.0.0:5005'
 workers = 1
 accesslog = '-'
 loglevel = 'debug'
 capture_output = True
 enable_stdio_inheritance = True
+
+# Background task worker (employees/task_queue.py, e.g. employee deletion).
+# The gunicorn master starts `manage.py run_workers` next to the app workers
+# and restarts it if it exits. Set BACKGROUND_TASKS_WORKER=external when the
+# worker runs as its own service, or BACKGROUND_TASKS_EAGER=True to run tasks
+# inline after commit instead.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TASK_WORKER_RESTART_DELAY = 5
+
+_task_worker = None
+_stopping = threading.Event()
+
+
+def _embedded_task_worker():
+    eager = os.environ.get('BACKGROUND_TASKS_EAGER', 'False').lower() in ('1', 'true', 'yes')
+    return not eager and os.environ.get('BACKGROUND_TASKS_WORKER', 'embedded') == 'embedded'
+
+
+def _supervise_task_worker(server):
+    global _task_worker
+    while not _stopping.is_set():
+        _task_worker = subprocess.Popen(
+            [sys.executable, 'manage.py', 'run_workers', '--report-every', '0'],
+            cwd=BASE_DIR,
+        )
+        server.log.info('Started background task worker (pid %s)', _task_worker.pid)
+        code = _task_worker.wait()
+        if not _stopping.is_set():
+            server.log.warning('Background task worker exited with %s; restarting', code)
+            _stopping.wait(TASK_WORKER_RESTART_DELAY)
+
+
+def on_starting(server):
+    if _embedded_task_worker():
+        threading.Thread(target=_supervise_task_worker, args=(server,), name='task-worker-supervisor', daemon=True).start()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _task_worker is not None and _task_worker.poll() is None:
+        _task_worker.terminate()
+        try:
+            _task_worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            _task_worker.kill()